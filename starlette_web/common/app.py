@@ -1,7 +1,9 @@
+import asyncio
 import inspect
 import logging
 import logging.config
-from typing import List, Union, Dict, Callable, Type, TypeVar
+from functools import partial
+from typing import List, Optional, Union, Dict, Callable, Type, TypeVar
 
 from sqlalchemy.orm import sessionmaker
 from starlette.applications import Starlette
@@ -13,7 +15,7 @@ from webargs_starlette import WebargsHTTPException
 from starlette_web.common.caches import caches
 from starlette_web.common.conf import settings
 from starlette_web.common.conf.app_manager import app_manager
-from starlette_web.common.database import make_session_maker
+from starlette_web.common.database import session_makers
 from starlette_web.common.http.exception_handlers import (
     BaseApplicationErrorHandler,
     WebargsHTTPExceptionHandler,
@@ -30,8 +32,6 @@ ExceptionHandlerType = Callable[[Request, Exception], BaseRenderer]
 class WebApp(Starlette):
     """Simple adaptation of Starlette APP. Small addons here."""
 
-    session_maker: sessionmaker
-
     def __init__(self, *args, **kwargs):
         use_pool = kwargs.pop("use_pool", True)
 
@@ -41,7 +41,38 @@ class WebApp(Starlette):
         }
         super().__init__(*args, **starlette_init_kwargs)
 
-        self.session_maker = make_session_maker(use_pool=use_pool)
+        self.use_pool = use_pool
+        self._session_maker: Optional[sessionmaker] = None
+        self._loop_session_maker: Optional[sessionmaker] = None
+        self._session_maker_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Middlewares and backends, which call get_session_maker(), follow use_pool of app
+        session_makers.configure(use_pool=use_pool)
+
+    @property
+    def session_maker(self) -> sessionmaker:
+        # Shared with other components (i.e. middlewares) of current event loop,
+        # looked up in registry once per loop, rather than on each request
+        if self._session_maker is not None:
+            return self._session_maker
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if self._loop_session_maker is None or self._session_maker_loop is not loop:
+            self._loop_session_maker = session_makers.get(use_pool=self.use_pool)
+            self._session_maker_loop = loop
+        return self._loop_session_maker
+
+    @session_maker.setter
+    def session_maker(self, value: Optional[sessionmaker]):
+        self._session_maker = value
+
+    def reset_session_maker(self) -> None:
+        """Forgets session maker of loop, i.e. once its engines have been disposed"""
+        self._loop_session_maker = None
+        self._session_maker_loop = None
 
 
 class BaseStarletteApplication:
@@ -94,6 +125,7 @@ class BaseStarletteApplication:
 
         self._setup_logging(app)
         self._setup_caches(app)
+        self._setup_database(app)
         self._manage_event_handlers(app)
 
         self.post_app_init(app)
@@ -104,7 +136,17 @@ class BaseStarletteApplication:
 
     def _setup_caches(self, app: AppClass):
         for conn_name in settings.CACHES:
-            _ = caches[conn_name]
+            cache = caches[conn_name]
+            self._event_handlers.append((cache.async_connect, cache.async_disconnect))
+
+    def _setup_database(self, app: AppClass):
+        async def disconnect():
+            await session_makers.async_disconnect()
+            app.reset_session_maker()
+
+        self._event_handlers.append(
+            (partial(session_makers.async_connect, use_pool=app.use_pool), disconnect)
+        )
 
     def _manage_event_handlers(self, app: AppClass):
         shutdown_handlers = []
@@ -1,7 +1,22 @@
-from typing import Type, Any, Optional, Dict, Sequence, AsyncContextManager, List
+import math
+import random
+import time
+from typing import (
+    Type,
+    Any,
+    Optional,
+    Dict,
+    Sequence,
+    AsyncContextManager,
+    List,
+    Callable,
+    Awaitable,
+)
 
-from starlette_web.common.http.exceptions import BaseApplicationError
-from starlette_web.common.utils import Singleton
+import anyio
+
+from starlette_web.common.http.exceptions import BaseApplicationError, ImproperlyConfigured
+from starlette_web.common.utils.importing import import_string
 from starlette_web.common.utils.serializers import BaseSerializer, PickleSerializer
 
 
@@ -13,47 +28,351 @@ class CacheLockError(CacheError):
     message = "Failed to lock or unlock a cache."
 
 
-class BaseCache(metaclass=Singleton):
+class _Flight:
+    # A single computation of value in async_get_or_set, awaited by concurrent callers
+    def __init__(self):
+        self.event = anyio.Event()
+        self.value: Any = None
+        self.is_done = False
+
+
+def default_key_func(key: str, key_prefix: str, version: Optional[int]) -> str:
+    # Keys are left intact, unless KEY_PREFIX or VERSION is configured.
+    # Empty prefix and version 0 are skipped, so that version 0 is the same
+    # as no version (see BaseCache.async_incr_version).
+    segments = [segment for segment in (key_prefix, version and str(version)) if segment]
+    return ":".join([*segments, key])
+
+
+class BaseCache:
+    """
+    Common options, supported by all backends:
+    - KEY_PREFIX - string, prepended to all keys of cache
+    - VERSION - default version of keys
+    - KEY_FUNCTION - function (or its import string) with signature (key, key_prefix, version),
+      which constructs raw keys of backend (default_key_func by default)
+    - REVERSE_KEY_FUNCTION - function (or its import string), which extracts key from raw key.
+      Only required for async_keys with custom KEY_FUNCTION, which does not prepend keys.
+    - SERIALIZER - serializer class (or its import string), serializer_class by default
+    """
+
     serializer_class: Type[BaseSerializer] = PickleSerializer
     serializer: BaseSerializer
+    # Called with number of entries, evicted by backend due to its size limits
+    eviction_callback: Optional[Callable[[int], None]] = None
 
     def __init__(self, options: Dict[str, Any]):
-        self.serializer = self.serializer_class()
+        self.serializer = self._import_option(options.get("SERIALIZER", self.serializer_class))()
+        self._flights: Dict[str, _Flight] = {}
+
+        self.key_prefix: str = options.get("KEY_PREFIX", "")
+        if set(self.key_prefix) & set("*?[]\\"):
+            raise ImproperlyConfigured(
+                details="KEY_PREFIX must not contain special characters of redis-like patterns"
+            )
 
-    async def async_get(self, key: str) -> Any:
+        self.version: Optional[int] = options.get("VERSION")
+        self.key_func: Callable[[str, str, Optional[int]], str] = self._import_option(
+            options.get("KEY_FUNCTION", default_key_func)
+        )
+        self.reverse_key_func: Optional[Callable[[str], str]] = self._import_option(
+            options.get("REVERSE_KEY_FUNCTION")
+        )
+
+    def make_key(self, key: str, version: Optional[int] = None) -> str:
+        return self.key_func(key, self.key_prefix, self.version if version is None else version)
+
+    def _reverse_key(self, raw_key: str, version: Optional[int] = None) -> str:
+        if self.reverse_key_func is not None:
+            return self.reverse_key_func(raw_key)
+
+        head = self.make_key("", version=version)
+        if head and raw_key.startswith(head):
+            return raw_key[len(head):]
+        return raw_key
+
+    def _get_clear_pattern(self) -> str:
+        # Pattern for raw keys of all versions of this cache
+        if self.key_func is default_key_func:
+            return f"{self.key_prefix}:*"
+        return f"{self.key_prefix}*"
+
+    @staticmethod
+    def _import_option(value: Any) -> Any:
+        if isinstance(value, str):
+            return import_string(value)
+        return value
+
+    async def async_get(self, key: str, version: Optional[int] = None) -> Any:
         raise NotImplementedError
 
-    async def async_set(self, key: str, value: Any, timeout: Optional[float] = 120) -> None:
+    async def async_set(
+        self,
+        key: str,
+        value: Any,
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> None:
         raise NotImplementedError
 
-    async def async_delete(self, key: str) -> None:
+    async def async_delete(self, key: str, version: Optional[int] = None) -> None:
         raise NotImplementedError
 
-    async def async_keys(self, pattern: str) -> List[str]:
+    async def async_keys(self, pattern: str, version: Optional[int] = None) -> List[str]:
         # Returns list of keys, matching redis-like pattern
         # See docs: https://redis.io/commands/keys/
         raise NotImplementedError
 
-    async def async_has_key(self, key: str) -> bool:
+    async def async_has_key(self, key: str, version: Optional[int] = None) -> bool:
         raise NotImplementedError
 
-    async def async_get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+    async def async_delete_pattern(self, pattern: str, version: Optional[int] = None) -> None:
+        # Deletes all keys, matching redis-like pattern
+        await self.async_delete_many(
+            await self.async_keys(pattern, version=version),
+            version=version,
+        )
+
+    async def async_get_many(
+        self,
+        keys: Sequence[str],
+        version: Optional[int] = None,
+    ) -> Dict[str, Any]:
         result = dict()
         for key in keys:
-            result[key] = await self.async_get(key)
+            result[key] = await self.async_get(key, version=version)
         return result
 
-    async def async_set_many(self, data: Dict[str, Any], timeout: Optional[float] = 120) -> None:
+    async def async_set_many(
+        self,
+        data: Dict[str, Any],
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> None:
         for key, value in data.items():
-            await self.async_set(key, value, timeout=timeout)
+            await self.async_set(key, value, timeout=timeout, version=version)
 
-    async def async_delete_many(self, keys: Sequence[str]) -> None:
+    async def async_delete_many(self, keys: Sequence[str], version: Optional[int] = None) -> None:
         for key in keys:
-            await self.async_delete(key)
+            await self.async_delete(key, version=version)
 
     async def async_clear(self) -> None:
         raise NotImplementedError
 
+    async def async_incr(
+        self,
+        key: str,
+        delta: int = 1,
+        timeout: Optional[float] = None,
+        version: Optional[int] = None,
+    ) -> int:
+        """
+        Atomically increments integer value of key by delta and returns the new value.
+        Missing key is created with value delta and expires after timeout (never, if None).
+        Timeout of existing key is left intact, so that counters of fixed windows
+        (i.e. for rate limiting) only need a single call.
+        """
+        raise NotImplementedError
+
+    async def async_decr(
+        self,
+        key: str,
+        delta: int = 1,
+        timeout: Optional[float] = None,
+        version: Optional[int] = None,
+    ) -> int:
+        return await self.async_incr(key, -delta, timeout=timeout, version=version)
+
+    async def async_touch(
+        self,
+        key: str,
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> bool:
+        # Sets new timeout for existing key (None - never expire)
+        # Returns False, if key does not exist
+        raise NotImplementedError
+
+    async def async_ttl(self, key: str, version: Optional[int] = None) -> Optional[float]:
+        # Returns remaining time to live of key in seconds,
+        # None if key never expires and 0 if key does not exist
+        raise NotImplementedError
+
+    async def async_incr_version(
+        self,
+        key: str,
+        delta: int = 1,
+        version: Optional[int] = None,
+    ) -> int:
+        """
+        Moves value of key to a new version with its remaining timeout
+        and returns the new version. Unversioned keys are treated as version 0.
+        """
+        version = self.version if version is None else version
+        timeout = await self.async_ttl(key, version=version)
+        value = await self.async_get(key, version=version)
+        if value is None or timeout == 0:
+            raise CacheError(details=f"Key '{key}' not found.")
+
+        new_version = (version or 0) + delta
+        await self.async_set(key, value, timeout=timeout, version=new_version)
+        await self.async_delete(key, version=version)
+        return new_version
+
+    async def async_decr_version(
+        self,
+        key: str,
+        delta: int = 1,
+        version: Optional[int] = None,
+    ) -> int:
+        return await self.async_incr_version(key, -delta, version=version)
+
+    async def async_get_version(self, key: str) -> int:
+        """
+        Returns value of version counter, which invalidates dependent entries
+        (i.e. cached results of a model), when it is bumped with async_bump_version.
+        Missing counters start from current time in microseconds, rather than 0,
+        so that counters, evicted from cache, never repeat versions of stale entries.
+        """
+        version = await self.async_get(key)
+        if version is None:
+            version = await self.async_incr(key, self._get_initial_version(), timeout=None)
+        return version
+
+    async def async_bump_version(self, key: str) -> int:
+        # Increments version counter, missing counter is started as in async_get_version
+        version = await self.async_incr(key, timeout=None)
+        if version == 1:
+            version = await self.async_incr(key, self._get_initial_version(), timeout=None)
+        return version
+
+    @staticmethod
+    def _get_initial_version() -> int:
+        return time.time_ns() // 1000
+
+    async def async_get_or_set(
+        self,
+        key: str,
+        async_factory: Callable[[], Awaitable[Any]],
+        timeout: Optional[float] = 120,
+        use_lock: bool = False,
+        lock_timeout: Optional[float] = 20,
+        early_refresh_beta: Optional[float] = None,
+    ) -> Any:
+        """
+        Returns cached value, or computes it with async_factory and stores it in cache.
+        Concurrent calls for the same key within a process await a single computation.
+
+        :param key: cache key
+        :param async_factory: coroutine function without arguments, which computes value.
+            Value None is never cached, same as for async_get.
+        :param timeout: timeout for computed value
+        :param use_lock: whether to compute value under self.lock(),
+            so that only one process computes it at a time (i.e. with RedisCache or FileCache)
+        :param lock_timeout: timeout for self.lock()
+        :param early_refresh_beta: if not None, enables probabilistic early refresh (XFetch).
+            Values are recomputed before expiration with probability, growing as
+            expiration approaches, scaled by computation time. Values are then stored
+            in cache within a wrapper, so such keys must only be read with async_get_or_set.
+            Common value is 1.0, values > 1.0 favor earlier recomputation.
+        """
+        while True:
+            stale_value = None
+            cached = await self.async_get(key)
+
+            if cached is not None:
+                if early_refresh_beta is None:
+                    return cached
+
+                if not self._should_refresh_early(
+                    cached["delta"], cached["expiry"], early_refresh_beta
+                ):
+                    return cached["value"]
+
+                stale_value = cached["value"]
+
+            flight = self._flights.get(key)
+            if flight is not None:
+                # Value is being refreshed by another task, stale one is still valid
+                if stale_value is not None:
+                    return stale_value
+
+                await flight.event.wait()
+                if flight.is_done:
+                    return flight.value
+
+                # Computation has failed in another task, so try to compute it here
+                continue
+
+            flight = self._flights[key] = _Flight()
+            try:
+                if use_lock:
+                    async with self.lock(f"{key}.get_or_set.lock", timeout=lock_timeout):
+                        flight.value = await self._compute_and_set(
+                            key,
+                            async_factory,
+                            timeout,
+                            early_refresh_beta,
+                            recheck=stale_value is None,
+                        )
+                else:
+                    flight.value = await self._compute_and_set(
+                        key, async_factory, timeout, early_refresh_beta
+                    )
+                flight.is_done = True
+                return flight.value
+            finally:
+                self._flights.pop(key, None)
+                flight.event.set()
+
+    async def _compute_and_set(
+        self,
+        key: str,
+        async_factory: Callable[[], Awaitable[Any]],
+        timeout: Optional[float],
+        early_refresh_beta: Optional[float],
+        recheck: bool = False,
+    ) -> Any:
+        if recheck:
+            # Value might have been computed by another process, while waiting for lock
+            cached = await self.async_get(key)
+            if cached is not None:
+                return cached if early_refresh_beta is None else cached["value"]
+
+        start_time = time.time()
+        value = await async_factory()
+        if value is None:
+            return value
+
+        if early_refresh_beta is None:
+            await self.async_set(key, value, timeout=timeout)
+        else:
+            await self.async_set(
+                key,
+                {
+                    "value": value,
+                    "delta": time.time() - start_time,
+                    "expiry": time.time() + timeout if timeout is not None else math.inf,
+                },
+                timeout=timeout,
+            )
+        return value
+
+    @staticmethod
+    def _should_refresh_early(delta: float, expiry: float, beta: float) -> bool:
+        # https://cseweb.ucsd.edu/~avattani/papers/cache_stampede.pdf
+        # 1.0 - random.random() lies in (0, 1], so that logarithm is always defined
+        return time.time() - delta * beta * math.log(1.0 - random.random()) >= expiry
+
+    async def async_connect(self) -> None:
+        # Called on application startup.
+        # To be redefined by caches, which run background tasks or hold persistent connections.
+        pass
+
+    async def async_disconnect(self) -> None:
+        # Called on application shutdown
+        pass
+
     def lock(
         self,
         name: str,
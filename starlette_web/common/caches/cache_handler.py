@@ -4,20 +4,27 @@ from typing import Dict, Type
 
 from starlette_web.common.conf import settings
 from starlette_web.common.caches.base import BaseCache, CacheError
+from starlette_web.common.caches.metrics import CacheMetrics, InstrumentedCache, cache_metrics
 from starlette_web.common.utils import import_string
 
 
 def _create_cache(alias: str) -> BaseCache:
     try:
         cache_class: Type[BaseCache] = import_string(settings.CACHES[alias]["BACKEND"])
-        return cache_class(settings.CACHES[alias]["OPTIONS"])
+        cache = cache_class(settings.CACHES[alias]["OPTIONS"])
     except (ImportError, KeyError) as exc:
         raise CacheError from exc
 
+    if settings.CACHES[alias].get("INSTRUMENT", False):
+        return InstrumentedCache(cache, alias, metrics=cache_metrics)
+    return cache
+
 
 class CacheHandler:
     def __init__(self):
         self._caches: Dict[str, BaseCache] = dict()
+        # Metrics of aliases with "INSTRUMENT": True, see CacheMetrics.snapshot
+        self.metrics: CacheMetrics = cache_metrics
 
     def __getitem__(self, alias):
         try:
@@ -1,55 +1,130 @@
 # Adapted from https://github.com/django/django/blob/main/django/core/cache/backends/locmem.py
 
+import heapq
+import itertools
 import math
 import re
-from typing import Any, Optional, Dict, Sequence, AsyncContextManager, List
+import sys
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Any, Optional, Dict, Sequence, AsyncContextManager, List, Tuple
 
 import anyio
 
 from starlette_web.common.caches.base import BaseCache, CacheError
 from starlette_web.common.http.exceptions import ImproperlyConfigured
 from starlette_web.common.utils.regex import redis_pattern_to_re_pattern
+from starlette_web.common.utils.serializers import NoopSerializer, ShallowCopySerializer
 
 
-_caches: Dict[str, Dict[str, Any]] = {}
+_caches: Dict[str, "OrderedDict[str, Any]"] = {}
 _expire_info: Dict[str, Dict[str, float]] = {}
+_expire_heaps: Dict[str, List[Tuple[float, str]]] = {}
+_sizes: Dict[str, Dict[str, int]] = {}
+_total_sizes: Dict[str, int] = {}
+_frequencies: Dict[str, Dict[str, int]] = {}
 _locks: Dict[str, anyio.Lock] = {}
 
 
 class LocalMemoryCache(BaseCache):
+    """
+    In-process cache, shared by all instances with the same option "name".
+
+    Supported options:
+    - MAX_ENTRIES - maximum number of stored keys (unbounded by default)
+    - MAX_BYTES - maximum total size of stored values (unbounded by default)
+    - EVICTION_POLICY - "lru" (default) or "lfu", which entries to evict, when limits are exceeded
+    - LOCK_FREE - skip acquiring manager lock for cache operations (False by default)
+    - COPY_STRATEGY - how values are copied on set/get: "pickle" (default, uses serializer_class),
+      "shallow" (copy.copy) or "none" (values are stored by reference)
+
+    Expired entries are purged by an incremental sweeper, which runs on every read/write
+    and pops a bounded number of entries from a deadline-ordered heap.
+    """
+
+    EVICTION_POLICIES = ("lru", "lfu")
+    COPY_STRATEGIES = ("pickle", "shallow", "none")
+    # Number of expired entries, purged by a single cache operation
+    _sweep_batch_size = 16
+    # Number of least recently used keys, sampled by "lfu" eviction policy
+    _lfu_sample_size = 8
+
     def __init__(self, options):
         self.name = options.get("name", None)
         if self.name is None:
             raise ImproperlyConfigured('LocalMemoryCache must be instantiated with option "name"')
 
+        self.max_entries: Optional[int] = options.get("MAX_ENTRIES")
+        self.max_bytes: Optional[int] = options.get("MAX_BYTES")
+        self.eviction_policy: str = options.get("EVICTION_POLICY", "lru")
+        if self.eviction_policy not in self.EVICTION_POLICIES:
+            raise ImproperlyConfigured(
+                details=f"Invalid EVICTION_POLICY {self.eviction_policy} for LocalMemoryCache"
+            )
+
+        self.copy_strategy: str = options.get("COPY_STRATEGY", "pickle")
+        if self.copy_strategy not in self.COPY_STRATEGIES:
+            raise ImproperlyConfigured(
+                details=f"Invalid COPY_STRATEGY {self.copy_strategy} for LocalMemoryCache"
+            )
+
         super().__init__(options)
-        self._manager_lock = anyio.Lock()
+        if self.copy_strategy == "shallow":
+            self.serializer = ShallowCopySerializer()
+        elif self.copy_strategy == "none":
+            self.serializer = NoopSerializer()
 
-        global _caches, _locks, _expire_info
-        self._cache = _caches.setdefault(self.name, {})
+        # All operations on dicts are synchronous and cannot interleave within an event loop,
+        # so the lock only matters, if the same cache is shared by several threads
+        self.lock_free: bool = options.get("LOCK_FREE", False)
+        self._manager_lock = nullcontext() if self.lock_free else anyio.Lock()
+
+        global _caches, _locks, _expire_info, _expire_heaps, _sizes, _frequencies
+        self._cache = _caches.setdefault(self.name, OrderedDict())
         self._expire_info = _expire_info.setdefault(self.name, {})
+        self._expire_heap = _expire_heaps.setdefault(self.name, [])
+        self._sizes = _sizes.setdefault(self.name, {})
+        self._frequencies = _frequencies.setdefault(self.name, {})
         self._lock = _locks.setdefault(self.name, anyio.Lock())
 
-    async def async_get(self, key: str) -> Any:
+    async def async_get(self, key: str, version: Optional[int] = None) -> Any:
+        key = self.make_key(key, version=version)
         async with self._manager_lock:
+            self._sweep_expired()
             if self._has_expired(key):
                 self._delete_key(key)
+            else:
+                self._touch_key(key)
 
             return self.serializer.deserialize(self._cache.get(key))
 
-    async def async_set(self, key: str, value: Any, timeout: Optional[float] = 120) -> None:
+    async def async_set(
+        self,
+        key: str,
+        value: Any,
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> None:
+        key = self.make_key(key, version=version)
         async with self._manager_lock:
-            deadline = anyio.current_time() + timeout if timeout is not None else math.inf
-            self._cache[key] = self.serializer.serialize(value)
-            self._expire_info[key] = deadline
+            self._sweep_expired()
+            self._set_key(key, self.serializer.serialize(value), timeout)
+            self._evict(protected_key=key)
 
-    async def async_delete(self, key: str) -> None:
+    async def async_delete(self, key: str, version: Optional[int] = None) -> None:
+        key = self.make_key(key, version=version)
         async with self._manager_lock:
             self._delete_key(key)
 
-    async def async_keys(self, pattern: str) -> List[str]:
+    async def async_keys(self, pattern: str, version: Optional[int] = None) -> List[str]:
+        return [
+            self._reverse_key(key, version=version)
+            for key in self._get_raw_keys(self.make_key(pattern, version=version))
+        ]
+
+    def _get_raw_keys(self, raw_pattern: str) -> List[str]:
         try:
-            re_pattern = redis_pattern_to_re_pattern(pattern)
+            re_pattern = redis_pattern_to_re_pattern(raw_pattern)
         except re.error as exc:
             raise CacheError(details=str(exc)) from exc
 
@@ -59,38 +134,234 @@ class LocalMemoryCache(BaseCache):
             if not self._has_expired(key) and re.fullmatch(re_pattern, key)
         ]
 
-    async def async_has_key(self, key: str) -> bool:
+    async def async_has_key(self, key: str, version: Optional[int] = None) -> bool:
+        key = self.make_key(key, version=version)
         async with self._manager_lock:
             if self._has_expired(key):
                 self._delete_key(key)
 
             return key in self._cache
 
+    async def async_incr(
+        self,
+        key: str,
+        delta: int = 1,
+        timeout: Optional[float] = None,
+        version: Optional[int] = None,
+    ) -> int:
+        key = self.make_key(key, version=version)
+        async with self._manager_lock:
+            self._sweep_expired()
+            if self._has_expired(key):
+                self._delete_key(key)
+                self._set_key(key, self.serializer.serialize(delta), timeout)
+                self._evict(protected_key=key)
+                return delta
+
+            value = self.serializer.deserialize(self._cache[key])
+            if type(value) is not int:
+                raise CacheError(details=f"Value of key '{key}' is not an integer.")
+
+            value += delta
+            self._replace_value(key, self.serializer.serialize(value))
+            return value
+
+    async def async_touch(
+        self,
+        key: str,
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> bool:
+        key = self.make_key(key, version=version)
+        async with self._manager_lock:
+            if self._has_expired(key):
+                self._delete_key(key)
+                return False
+
+            deadline = self._get_deadline(timeout)
+            self._expire_info[key] = deadline
+            if deadline != math.inf:
+                heapq.heappush(self._expire_heap, (deadline, key))
+            self._touch_key(key)
+            return True
+
+    async def async_ttl(self, key: str, version: Optional[int] = None) -> Optional[float]:
+        key = self.make_key(key, version=version)
+        async with self._manager_lock:
+            if self._has_expired(key):
+                self._delete_key(key)
+                return 0
+
+            deadline = self._expire_info[key]
+            return None if deadline == math.inf else deadline - anyio.current_time()
+
+    def _set_key(self, key: str, value: Any, timeout: Optional[float]) -> None:
+        deadline = self._get_deadline(timeout)
+        frequency = self._frequencies.get(key, 0) + 1
+        self._delete_key(key)
+
+        self._cache[key] = value
+        self._expire_info[key] = deadline
+        self._frequencies[key] = frequency
+        self._sizes[key] = self._get_value_size(value)
+        _total_sizes[self.name] = _total_sizes.get(self.name, 0) + self._sizes[key]
+
+        if deadline != math.inf:
+            heapq.heappush(self._expire_heap, (deadline, key))
+
+    def _replace_value(self, key: str, value: Any) -> None:
+        # Replaces value of existing key, keeping its deadline
+        size = self._get_value_size(value)
+        _total_sizes[self.name] = _total_sizes.get(self.name, 0) + size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+        self._cache[key] = value
+        self._touch_key(key)
+        self._evict(protected_key=key)
+
+    @staticmethod
+    def _get_deadline(timeout: Optional[float]) -> float:
+        return anyio.current_time() + timeout if timeout is not None else math.inf
+
+    def _touch_key(self, key: str) -> None:
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self._frequencies[key] = self._frequencies.get(key, 0) + 1
+
     def _delete_key(self, key: str) -> None:
         self._cache.pop(key, None)
         self._expire_info.pop(key, None)
+        self._frequencies.pop(key, None)
+        _total_sizes[self.name] = _total_sizes.get(self.name, 0) - self._sizes.pop(key, 0)
 
     def _has_expired(self, key) -> bool:
         return self._expire_info.get(key, -1) < anyio.current_time()
 
-    async def async_get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+    def _sweep_expired(self, max_count: Optional[int] = None) -> int:
+        """
+        Purges expired entries in deadline order. Heap items for keys, that have been
+        overwritten or deleted since, are stale and are silently skipped.
+        """
+        max_count = self._sweep_batch_size if max_count is None else max_count
+        now = anyio.current_time()
+        purged = 0
+
+        while self._expire_heap and purged < max_count and self._expire_heap[0][0] < now:
+            deadline, key = heapq.heappop(self._expire_heap)
+            if self._expire_info.get(key) == deadline:
+                self._delete_key(key)
+                purged += 1
+
+        # Stale heap items of frequently overwritten keys are compacted
+        # once they outnumber the live entries, which keeps heap size O(len(cache))
+        if len(self._expire_heap) > 2 * len(self._cache) + self._sweep_batch_size:
+            self._expire_heap[:] = [
+                (deadline, key)
+                for key, deadline in self._expire_info.items()
+                if deadline != math.inf
+            ]
+            heapq.heapify(self._expire_heap)
+
+        return purged
+
+    def _evict(self, protected_key: Optional[str] = None) -> None:
+        if not self._is_over_limits():
+            return
+
+        # Expired entries are always dropped first, before evicting the live ones
+        self._sweep_expired(max_count=len(self._expire_heap))
+
+        evicted = 0
+        while self._cache and self._is_over_limits():
+            self._delete_key(self._get_eviction_candidate(protected_key))
+            evicted += 1
+
+        if evicted and self.eviction_callback is not None:
+            self.eviction_callback(evicted)
+
+    def _is_over_limits(self) -> bool:
+        if self.max_entries is not None and len(self._cache) > self.max_entries:
+            return True
+
+        if self.max_bytes is not None and self._get_total_size() > self.max_bytes:
+            return True
+
+        return False
+
+    def _get_eviction_candidate(self, protected_key: Optional[str] = None) -> str:
+        # Just written key is only evicted, if it alone exceeds limits
+        candidates = (key for key in self._cache.keys() if key != protected_key)
+
+        if self.eviction_policy == "lfu":
+            # Approximated LFU (same as in Redis): least frequently used key
+            # among a fixed-size sample of least recently used keys
+            sample = list(itertools.islice(candidates, self._lfu_sample_size))
+            if sample:
+                return min(sample, key=lambda _key: self._frequencies.get(_key, 0))
+
+        return next(candidates, protected_key)
+
+    def _get_total_size(self) -> int:
+        return _total_sizes.get(self.name, 0)
+
+    @staticmethod
+    def _get_value_size(value: Any) -> int:
+        # Values, which are not serialized to bytes, are measured shallowly
+        if isinstance(value, (bytes, bytearray, memoryview, str)):
+            return len(value)
+        return sys.getsizeof(value)
+
+    async def async_get_many(
+        self,
+        keys: Sequence[str],
+        version: Optional[int] = None,
+    ) -> Dict[str, Any]:
         result = dict()
-        for key in keys:
-            result[key] = await self.async_get(key)
+        async with self._manager_lock:
+            self._sweep_expired()
+            for key in keys:
+                raw_key = self.make_key(key, version=version)
+                if self._has_expired(raw_key):
+                    self._delete_key(raw_key)
+                else:
+                    self._touch_key(raw_key)
+
+                result[key] = self.serializer.deserialize(self._cache.get(raw_key))
         return result
 
-    async def async_set_many(self, data: Dict[str, Any], timeout: Optional[float] = 120) -> None:
-        for key, value in data.items():
-            await self.async_set(key, value, timeout=timeout)
+    async def async_set_many(
+        self,
+        data: Dict[str, Any],
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> None:
+        async with self._manager_lock:
+            self._sweep_expired()
+            for key, value in data.items():
+                self._set_key(
+                    self.make_key(key, version=version),
+                    self.serializer.serialize(value),
+                    timeout,
+                )
+            self._evict()
 
-    async def async_delete_many(self, keys: Sequence[str]) -> None:
+    async def async_delete_many(self, keys: Sequence[str], version: Optional[int] = None) -> None:
         async with self._manager_lock:
             for key in keys:
-                self._delete_key(key)
+                self._delete_key(self.make_key(key, version=version))
 
     async def async_clear(self) -> None:
         async with self._manager_lock:
+            if self.key_prefix:
+                # Storage may be shared with caches with other prefixes
+                for key in self._get_raw_keys(self._get_clear_pattern()):
+                    self._delete_key(key)
+                return
+
             self._expire_info.clear()
+            self._expire_heap.clear()
+            self._sizes.clear()
+            self._frequencies.clear()
+            _total_sizes[self.name] = 0
             self._cache.clear()
 
     def lock(
@@ -0,0 +1,362 @@
+import logging
+import math
+import time
+from typing import Any, Optional, Dict, Sequence, AsyncContextManager, List, Callable, Awaitable
+
+from starlette_web.common.caches.base import BaseCache
+from starlette_web.common.conf import settings
+from starlette_web.common.http.exceptions import ImproperlyConfigured
+from starlette_web.common.utils import import_string
+from starlette_web.common.utils.serializers import BaseSerializer
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of latency histogram buckets in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, math.inf)
+
+
+class BaseCacheMetricsExporter:
+    """
+    Receives every recorded measurement, i.e. to push it to StatsD or Prometheus.
+    Exporters are configured with settings.CACHE_METRICS_EXPORTERS (list of import strings).
+    Methods are called synchronously within cache operations, so they must not block.
+    """
+
+    def observe_operation(
+        self,
+        alias: str,
+        operation: str,
+        duration: float,
+        hits: int = 0,
+        misses: int = 0,
+        error: bool = False,
+    ) -> None:
+        pass
+
+    def observe_bytes(self, alias: str, bytes_in: int = 0, bytes_out: int = 0) -> None:
+        pass
+
+    def observe_evictions(self, alias: str, count: int) -> None:
+        pass
+
+
+class OperationMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.hits = 0
+        self.misses = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def observe(self, duration: float, hits: int, misses: int, error: bool) -> None:
+        self.calls += 1
+        self.errors += int(error)
+        self.hits += hits
+        self.misses += misses
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+
+        for idx, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                self.buckets[idx] += 1
+                break
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_time": self.total_time,
+            "max_time": self.max_time,
+            "latency_buckets": dict(zip(LATENCY_BUCKETS, self.buckets)),
+        }
+
+
+class CacheMetrics:
+    """
+    In-process registry of cache metrics, grouped by alias and operation.
+    All updates are synchronous, so they do not interleave within an event loop.
+    """
+
+    def __init__(self):
+        self._operations: Dict[str, Dict[str, OperationMetrics]] = {}
+        self._totals: Dict[str, Dict[str, int]] = {}
+        self._exporters: Optional[List[BaseCacheMetricsExporter]] = None
+
+    @property
+    def exporters(self) -> List[BaseCacheMetricsExporter]:
+        # Settings are only read, once the first value is recorded
+        if self._exporters is None:
+            self._exporters = self._create_exporters(settings.CACHE_METRICS_EXPORTERS)
+        return self._exporters
+
+    def record_operation(
+        self,
+        alias: str,
+        operation: str,
+        duration: float,
+        hits: int = 0,
+        misses: int = 0,
+        error: bool = False,
+    ) -> None:
+        operations = self._operations.setdefault(alias, {})
+        operations.setdefault(operation, OperationMetrics()).observe(
+            duration, hits, misses, error
+        )
+        self._export("observe_operation", alias, operation, duration, hits, misses, error)
+
+    def record_bytes(self, alias: str, bytes_in: int = 0, bytes_out: int = 0) -> None:
+        totals = self._get_totals(alias)
+        totals["bytes_in"] += bytes_in
+        totals["bytes_out"] += bytes_out
+        self._export("observe_bytes", alias, bytes_in, bytes_out)
+
+    def record_evictions(self, alias: str, count: int) -> None:
+        self._get_totals(alias)["evictions"] += count
+        self._export("observe_evictions", alias, count)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns a copy of metrics, i.e.
+        {"default": {"hits": 2, "misses": 1, ..., "operations": {"get": {...}}}}
+        """
+        result = {}
+        for alias in set(self._operations) | set(self._totals):
+            operations = {
+                operation: metrics.as_dict()
+                for operation, metrics in self._operations.get(alias, {}).items()
+            }
+            result[alias] = {
+                "hits": sum(metrics["hits"] for metrics in operations.values()),
+                "misses": sum(metrics["misses"] for metrics in operations.values()),
+                **self._get_totals(alias),
+                "operations": operations,
+            }
+        return result
+
+    def reset(self) -> None:
+        self._operations.clear()
+        self._totals.clear()
+
+    def _get_totals(self, alias: str) -> Dict[str, int]:
+        return self._totals.setdefault(alias, {"bytes_in": 0, "bytes_out": 0, "evictions": 0})
+
+    def _export(self, method_name: str, *args) -> None:
+        for exporter in self.exporters:
+            try:
+                getattr(exporter, method_name)(*args)
+            except Exception as exc:  # noqa
+                # Metrics must never break cache operations
+                logger.warning("Cache metrics exporter %r has failed: %r", exporter, exc)
+
+    @staticmethod
+    def _create_exporters(import_strings: Sequence[str]) -> List[BaseCacheMetricsExporter]:
+        try:
+            return [import_string(exporter_class)() for exporter_class in import_strings]
+        except ImportError as exc:
+            raise ImproperlyConfigured(details="Invalid CACHE_METRICS_EXPORTERS") from exc
+
+
+cache_metrics = CacheMetrics()
+
+
+class MeteredSerializer(BaseSerializer):
+    # Measures size of values, written to and read from cache storage
+    def __init__(self, serializer: BaseSerializer, alias: str, metrics: CacheMetrics):
+        self.serializer = serializer
+        self.alias = alias
+        self.metrics = metrics
+
+    def serialize(self, content: Any) -> Any:
+        data = self.serializer.serialize(content)
+        self.metrics.record_bytes(self.alias, bytes_out=self._get_size(data))
+        return data
+
+    def deserialize(self, content: Any) -> Any:
+        self.metrics.record_bytes(self.alias, bytes_in=self._get_size(content))
+        return self.serializer.deserialize(content)
+
+    def serializes_to_bytes(self):
+        return self.serializer.serializes_to_bytes()
+
+    @staticmethod
+    def _get_size(data: Any) -> int:
+        # Values of in-process caches may be stored by reference, so they are not measured
+        if isinstance(data, (bytes, bytearray, memoryview, str)):
+            return len(data)
+        return 0
+
+
+class InstrumentedCache(BaseCache):
+    """
+    Proxy, which records calls, hits, misses and latency of cache operations to CacheMetrics.
+    Enabled by CacheHandler for aliases with "INSTRUMENT": True in settings.CACHES.
+    Other attributes and methods of wrapped cache are available as is.
+    """
+
+    def __init__(self, cache: BaseCache, alias: str, metrics: CacheMetrics = cache_metrics):
+        # BaseCache.__init__ is not called, since options belong to the wrapped cache
+        self.cache = cache
+        self.alias = alias
+        self.metrics = metrics
+
+        cache.serializer = MeteredSerializer(cache.serializer, alias, metrics)
+        cache.eviction_callback = self._record_evictions
+
+    def __getattr__(self, item):
+        if item == "cache":
+            raise AttributeError(item)
+        return getattr(self.cache, item)
+
+    async def async_get(self, key: str, version: Optional[int] = None) -> Any:
+        start_time = time.perf_counter()
+        value = await self._call("get", start_time, self.cache.async_get(key, version=version))
+        self._record_lookup("get", start_time, hits=int(value is not None))
+        return value
+
+    async def async_get_many(
+        self,
+        keys: Sequence[str],
+        version: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        start_time = time.perf_counter()
+        result = await self._call(
+            "get_many", start_time, self.cache.async_get_many(keys, version=version)
+        )
+        hits = sum(1 for value in result.values() if value is not None)
+        self._record_lookup("get_many", start_time, hits=hits, misses=len(result) - hits)
+        return result
+
+    async def async_has_key(self, key: str, version: Optional[int] = None) -> bool:
+        start_time = time.perf_counter()
+        value = await self._call(
+            "has_key", start_time, self.cache.async_has_key(key, version=version)
+        )
+        self._record_lookup("has_key", start_time, hits=int(value))
+        return value
+
+    async def async_get_or_set(
+        self,
+        key: str,
+        async_factory: Callable[[], Awaitable[Any]],
+        *args,
+        **kwargs,
+    ) -> Any:
+        computed = False
+
+        async def _factory():
+            nonlocal computed
+            computed = True
+            return await async_factory()
+
+        start_time = time.perf_counter()
+        value = await self._call(
+            "get_or_set",
+            start_time,
+            self.cache.async_get_or_set(key, _factory, *args, **kwargs),
+        )
+        self._record_lookup("get_or_set", start_time, hits=int(not computed))
+        return value
+
+    async def async_set(self, key: str, value: Any, *args, **kwargs) -> None:
+        await self._measure("set", self.cache.async_set(key, value, *args, **kwargs))
+
+    async def async_set_many(self, data: Dict[str, Any], *args, **kwargs) -> None:
+        await self._measure("set_many", self.cache.async_set_many(data, *args, **kwargs))
+
+    async def async_delete(self, key: str, *args, **kwargs) -> None:
+        await self._measure("delete", self.cache.async_delete(key, *args, **kwargs))
+
+    async def async_delete_many(self, keys: Sequence[str], *args, **kwargs) -> None:
+        await self._measure("delete_many", self.cache.async_delete_many(keys, *args, **kwargs))
+
+    async def async_delete_pattern(self, pattern: str, *args, **kwargs) -> None:
+        await self._measure(
+            "delete_pattern", self.cache.async_delete_pattern(pattern, *args, **kwargs)
+        )
+
+    async def async_keys(self, pattern: str, *args, **kwargs) -> List[str]:
+        return await self._measure("keys", self.cache.async_keys(pattern, *args, **kwargs))
+
+    async def async_clear(self) -> None:
+        await self._measure("clear", self.cache.async_clear())
+
+    async def async_incr(self, key: str, *args, **kwargs) -> int:
+        return await self._measure("incr", self.cache.async_incr(key, *args, **kwargs))
+
+    async def async_decr(self, key: str, *args, **kwargs) -> int:
+        return await self._measure("decr", self.cache.async_decr(key, *args, **kwargs))
+
+    async def async_incr_version(self, key: str, *args, **kwargs) -> int:
+        return await self._measure(
+            "incr_version", self.cache.async_incr_version(key, *args, **kwargs)
+        )
+
+    async def async_decr_version(self, key: str, *args, **kwargs) -> int:
+        return await self._measure(
+            "decr_version", self.cache.async_decr_version(key, *args, **kwargs)
+        )
+
+    async def async_get_version(self, key: str) -> int:
+        return await self._measure("get_version", self.cache.async_get_version(key))
+
+    async def async_bump_version(self, key: str) -> int:
+        return await self._measure("bump_version", self.cache.async_bump_version(key))
+
+    async def async_touch(self, key: str, *args, **kwargs) -> bool:
+        return await self._measure("touch", self.cache.async_touch(key, *args, **kwargs))
+
+    async def async_ttl(self, key: str, *args, **kwargs) -> Optional[float]:
+        return await self._measure("ttl", self.cache.async_ttl(key, *args, **kwargs))
+
+    async def async_connect(self) -> None:
+        await self.cache.async_connect()
+
+    async def async_disconnect(self) -> None:
+        await self.cache.async_disconnect()
+
+    def lock(
+        self,
+        name: str,
+        timeout: Optional[float] = 20.0,
+        blocking_timeout: Optional[float] = None,
+        **kwargs,
+    ) -> AsyncContextManager:
+        return self.cache.lock(name, timeout=timeout, blocking_timeout=blocking_timeout, **kwargs)
+
+    async def _measure(self, operation: str, coroutine: Awaitable[Any]) -> Any:
+        start_time = time.perf_counter()
+        result = await self._call(operation, start_time, coroutine)
+        self.metrics.record_operation(self.alias, operation, time.perf_counter() - start_time)
+        return result
+
+    async def _call(self, operation: str, start_time: float, coroutine: Awaitable[Any]) -> Any:
+        try:
+            return await coroutine
+        except Exception:
+            self.metrics.record_operation(
+                self.alias, operation, time.perf_counter() - start_time, error=True
+            )
+            raise
+
+    def _record_lookup(
+        self,
+        operation: str,
+        start_time: float,
+        hits: int = 0,
+        misses: Optional[int] = None,
+    ) -> None:
+        self.metrics.record_operation(
+            self.alias,
+            operation,
+            time.perf_counter() - start_time,
+            hits=hits,
+            misses=(1 - hits) if misses is None else misses,
+        )
+
+    def _record_evictions(self, count: int) -> None:
+        self.metrics.record_evictions(self.alias, count)
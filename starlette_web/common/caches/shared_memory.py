@@ -0,0 +1,429 @@
+import errno
+import hashlib
+import math
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Optional, Dict, AsyncContextManager, List, Tuple, Type, AsyncIterator
+
+import anyio
+
+from starlette_web.common.caches.base import BaseCache, CacheError, CacheLockError
+from starlette_web.common.conf import settings
+from starlette_web.common.files.filelock import FileLock
+from starlette_web.common.http.exceptions import ImproperlyConfigured
+from starlette_web.common.utils.regex import redis_pattern_to_re_pattern
+from starlette_web.common.utils.serializers import BytesSerializer, PickleSerializer
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class SharedMemoryCache(BaseCache):
+    """
+    Cache, shared by all processes on a host, which use the same option "name"
+    (i.e. workers of uvicorn/gunicorn), so that they keep a single copy of hot data.
+
+    Storage is a hash table of fixed-size slots in a memory-mapped file (in /dev/shm, if available).
+    Each key is stored in one of PROBE_LIMIT consecutive slots, starting at its hash.
+    Reads do not take locks: each slot has a sequence counter (seqlock), which is odd
+    while slot is being written, and reads are retried, if counter has changed meanwhile.
+    Writes take a POSIX byte-range lock (fcntl) on the probe window of key only.
+    Locks are taken without blocking and retried with async sleeps, so that a lock,
+    held by another process, never blocks event loop.
+    Entries, which do not fit into their window, evict the entry with the nearest deadline.
+
+    Supported options:
+    - name - name of shared storage (required)
+    - SLOT_COUNT - number of slots (4096 by default)
+    - SLOT_SIZE - size of slot in bytes, including key and serialized value (4096 by default)
+    - PROBE_LIMIT - number of slots, probed for a key (8 by default)
+    - PATH - path to storage file, overrides location derived from name
+
+    Storage size (SLOT_COUNT * SLOT_SIZE) is allocated once, so all processes
+    must use the same options. Setting values, which do not fit into a slot, raises CacheError.
+    Only POSIX systems are supported.
+    """
+
+    serializer_class: Type[BytesSerializer] = PickleSerializer
+    default_slot_count = 4096
+    default_slot_size = 4096
+    default_probe_limit = 8
+    read_retries = 64
+    lock_timeout = 10.0
+    min_lock_delay = 0.0005
+    max_lock_delay = 0.01
+
+    _magic = b"SWSHMC01"
+    # magic, slot count, slot size, probe limit
+    _file_header = struct.Struct("=8sIII")
+    # sequence counter, key hash, deadline (0 - empty slot), key length, value length
+    _slot_header = struct.Struct("=IQdHI")
+    _seq = struct.Struct("=I")
+
+    def __init__(self, options: Dict[str, Any]):
+        if fcntl is None:
+            raise ImproperlyConfigured(details="SharedMemoryCache requires a POSIX system")
+
+        self.name = options.get("name", None)
+        if self.name is None:
+            raise ImproperlyConfigured(
+                details='SharedMemoryCache must be instantiated with option "name"'
+            )
+
+        super().__init__(options)
+        if not self.serializer.serializes_to_bytes():
+            raise ImproperlyConfigured(
+                details="serializer_class must be instance of BytesSerializer"
+            )
+
+        self.slot_count: int = options.get("SLOT_COUNT", self.default_slot_count)
+        self.slot_size: int = options.get("SLOT_SIZE", self.default_slot_size)
+        self.probe_limit: int = min(
+            options.get("PROBE_LIMIT", self.default_probe_limit), self.slot_count
+        )
+        if self.slot_size <= self._slot_header.size:
+            raise ImproperlyConfigured(details="SLOT_SIZE is too small for SharedMemoryCache")
+
+        self.path: str = options.get("PATH") or self._get_default_path()
+        self._thread_lock = threading.Lock()
+        self._mmap, self._fd = self._open_storage()
+
+    async def async_get(self, key: str, version: Optional[int] = None) -> Any:
+        entry = self._find(self.make_key(key, version=version).encode("utf-8"))
+        if entry is None:
+            return None
+        return self.serializer.deserialize(entry[2])
+
+    async def async_set(
+        self,
+        key: str,
+        value: Any,
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> None:
+        raw_key = self.make_key(key, version=version).encode("utf-8")
+        data = self.serializer.serialize(value)
+        self._check_size(raw_key, data)
+
+        async with self._write_lock(raw_key):
+            self._write(raw_key, data, self._get_deadline(timeout))
+
+    async def async_delete(self, key: str, version: Optional[int] = None) -> None:
+        raw_key = self.make_key(key, version=version).encode("utf-8")
+        async with self._write_lock(raw_key):
+            entry = self._find(raw_key)
+            if entry is not None:
+                self._write_slot(entry[0], 0, 0.0, b"", b"")
+
+    async def async_has_key(self, key: str, version: Optional[int] = None) -> bool:
+        return self._find(self.make_key(key, version=version).encode("utf-8")) is not None
+
+    async def async_keys(self, pattern: str, version: Optional[int] = None) -> List[str]:
+        return [
+            self._reverse_key(raw_key, version=version)
+            for raw_key in self._get_raw_keys(self.make_key(pattern, version=version))
+        ]
+
+    async def async_clear(self) -> None:
+        if self.key_prefix:
+            # Storage may be shared with caches with other prefixes
+            for raw_key in self._get_raw_keys(self._get_clear_pattern()):
+                encoded_key = raw_key.encode("utf-8")
+                async with self._write_lock(encoded_key):
+                    entry = self._find(encoded_key)
+                    if entry is not None:
+                        self._write_slot(entry[0], 0, 0.0, b"", b"")
+            return
+
+        async with self._range_lock(0, self.slot_count):
+            for idx in range(self.slot_count):
+                self._write_slot(idx, 0, 0.0, b"", b"")
+
+    async def async_incr(
+        self,
+        key: str,
+        delta: int = 1,
+        timeout: Optional[float] = None,
+        version: Optional[int] = None,
+    ) -> int:
+        raw_key = self.make_key(key, version=version).encode("utf-8")
+        async with self._write_lock(raw_key):
+            entry = self._find(raw_key)
+            if entry is None:
+                value, deadline = delta, self._get_deadline(timeout)
+            else:
+                value, deadline = self.serializer.deserialize(entry[2]), entry[1]
+                if type(value) is not int:
+                    raise CacheError(details=f"Value of key '{key}' is not an integer.")
+                value += delta
+
+            data = self.serializer.serialize(value)
+            self._check_size(raw_key, data)
+            self._write(raw_key, data, deadline)
+            return value
+
+    async def async_touch(
+        self,
+        key: str,
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> bool:
+        raw_key = self.make_key(key, version=version).encode("utf-8")
+        async with self._write_lock(raw_key):
+            entry = self._find(raw_key)
+            if entry is None:
+                return False
+
+            self._write_slot(
+                entry[0], self._hash(raw_key), self._get_deadline(timeout), raw_key, entry[2]
+            )
+            return True
+
+    async def async_ttl(self, key: str, version: Optional[int] = None) -> Optional[float]:
+        entry = self._find(self.make_key(key, version=version).encode("utf-8"))
+        if entry is None:
+            return 0
+        if entry[1] == math.inf:
+            return None
+        return max(entry[1] - time.time(), 0)
+
+    async def async_connect(self) -> None:
+        if self._mmap is None:
+            self._mmap, self._fd = self._open_storage()
+
+    async def async_disconnect(self) -> None:
+        if self._mmap is None:
+            return
+
+        try:
+            self._mmap.close()
+        finally:
+            os.close(self._fd)
+            self._mmap, self._fd = None, None
+
+    def lock(
+        self,
+        name: str,
+        timeout: Optional[float] = 20.0,
+        blocking_timeout: Optional[float] = None,
+        **kwargs,
+    ) -> AsyncContextManager:
+        lock_hash = hashlib.md5(f"{self.path}:{self.make_key(name)}".encode()).hexdigest()
+        return FileLock(
+            name=os.path.join(tempfile.gettempdir(), f"{lock_hash}.lock"),
+            timeout=timeout,
+            blocking_timeout=blocking_timeout,
+        )
+
+    def _find(self, raw_key: bytes) -> Optional[Tuple[int, float, bytes]]:
+        # Returns slot index, deadline and serialized value of live key
+        key_hash = self._hash(raw_key)
+        start = self._get_window_start(key_hash)
+        now = time.time()
+
+        for idx in range(start, start + self.probe_limit):
+            slot = self._read_slot(idx, key_hash)
+            if slot is None:
+                continue
+
+            deadline, slot_key, data = slot
+            if slot_key == raw_key and deadline >= now:
+                return idx, deadline, data
+
+        return None
+
+    def _write(self, raw_key: bytes, data: bytes, deadline: float) -> None:
+        # Must be called under _write_lock of key
+        key_hash = self._hash(raw_key)
+        start = self._get_window_start(key_hash)
+        now = time.time()
+        target_idx, target_deadline = None, math.inf
+
+        for idx in range(start, start + self.probe_limit):
+            offset = self._get_offset(idx)
+            _, slot_hash, slot_deadline, key_len, _ = self._slot_header.unpack_from(
+                self._mmap, offset
+            )
+            key_start = offset + self._slot_header.size
+            if slot_hash == key_hash and self._mmap[key_start:key_start + key_len] == raw_key:
+                target_idx, target_deadline = idx, 0.0
+                break
+
+            # Empty and expired slots are reused first, then the one with the nearest deadline
+            if slot_deadline < now:
+                slot_deadline = 0.0
+            if target_idx is None or slot_deadline < target_deadline:
+                target_idx, target_deadline = idx, slot_deadline
+
+        self._write_slot(target_idx, key_hash, deadline, raw_key, data)
+        if target_deadline > 0 and self.eviction_callback is not None:
+            self.eviction_callback(1)
+
+    def _read_slot(self, idx: int, key_hash: int) -> Optional[Tuple[float, bytes, bytes]]:
+        offset = self._get_offset(idx)
+        data_start = offset + self._slot_header.size
+
+        for _ in range(self.read_retries):
+            seq, slot_hash, deadline, key_len, value_len = self._slot_header.unpack_from(
+                self._mmap, offset
+            )
+            if seq & 1:
+                # Slot is being written by another process
+                time.sleep(0)
+                continue
+
+            if slot_hash != key_hash or deadline == 0:
+                return None
+
+            key_end = data_start + key_len
+            slot_key = self._mmap[data_start:key_end]
+            data = self._mmap[key_end:key_end + value_len]
+            if self._seq.unpack_from(self._mmap, offset)[0] == seq:
+                return deadline, slot_key, data
+
+        return None
+
+    def _write_slot(
+        self,
+        idx: int,
+        key_hash: int,
+        deadline: float,
+        raw_key: bytes,
+        data: bytes,
+    ) -> None:
+        offset = self._get_offset(idx)
+        data_start = offset + self._slot_header.size
+        seq = self._seq.unpack_from(self._mmap, offset)[0]
+
+        self._seq.pack_into(self._mmap, offset, (seq + 1) & 0xFFFFFFFF)
+        self._mmap[data_start:data_start + len(raw_key) + len(data)] = raw_key + data
+        self._slot_header.pack_into(
+            self._mmap,
+            offset,
+            (seq + 1) & 0xFFFFFFFF,
+            key_hash,
+            deadline,
+            len(raw_key),
+            len(data),
+        )
+        self._seq.pack_into(self._mmap, offset, (seq + 2) & 0xFFFFFFFF)
+
+    def _get_raw_keys(self, raw_pattern: str) -> List[str]:
+        try:
+            re_pattern = re.compile(redis_pattern_to_re_pattern(raw_pattern))
+        except re.error as exc:
+            raise CacheError(details=str(exc)) from exc
+
+        now = time.time()
+        keys = []
+        for idx in range(self.slot_count):
+            key_hash = self._slot_header.unpack_from(self._mmap, self._get_offset(idx))[1]
+            slot = self._read_slot(idx, key_hash)
+            if slot is None or slot[0] < now:
+                continue
+
+            key = slot[1].decode("utf-8")
+            if re_pattern.fullmatch(key):
+                keys.append(key)
+        return keys
+
+    def _write_lock(self, raw_key: bytes) -> AsyncContextManager:
+        start = self._get_window_start(self._hash(raw_key))
+        return self._range_lock(start, start + self.probe_limit)
+
+    @asynccontextmanager
+    async def _range_lock(self, start_idx: int, end_idx: int) -> AsyncIterator[None]:
+        # fcntl locks are held by process, so threads of the same process (i.e. with
+        # other event loops) are serialized with a separate lock.
+        # Coroutines do not interleave, since writes never await under lock.
+        offset, length = self._get_offset(start_idx), (end_idx - start_idx) * self.slot_size
+        deadline = time.monotonic() + self.lock_timeout
+        delay = self.min_lock_delay
+
+        while not self._try_lock(offset, length):
+            if time.monotonic() > deadline:
+                raise CacheLockError(
+                    details=f"Could not lock {self.path} within {self.lock_timeout} seconds."
+                )
+            await anyio.sleep(delay)
+            delay = min(delay * 2, self.max_lock_delay)
+
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, length, offset)
+            self._thread_lock.release()
+
+    def _try_lock(self, offset: int, length: int) -> bool:
+        if not self._thread_lock.acquire(blocking=False):
+            return False
+
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, length, offset)
+            return True
+        except OSError as exc:
+            self._thread_lock.release()
+            if exc.errno in (errno.EACCES, errno.EAGAIN):
+                return False
+            raise
+
+    def _check_size(self, raw_key: bytes, data: bytes) -> None:
+        if self._slot_header.size + len(raw_key) + len(data) > self.slot_size:
+            raise CacheError(details=f"Value of key '{raw_key.decode()}' does not fit into slot.")
+
+    def _get_window_start(self, key_hash: int) -> int:
+        # Probe windows do not wrap around, so that each one is a single byte range
+        return key_hash % (self.slot_count - self.probe_limit + 1)
+
+    def _get_offset(self, idx: int) -> int:
+        return self._file_header.size + idx * self.slot_size
+
+    @staticmethod
+    def _hash(raw_key: bytes) -> int:
+        return int.from_bytes(hashlib.blake2b(raw_key, digest_size=8).digest(), "little")
+
+    @staticmethod
+    def _get_deadline(timeout: Optional[float]) -> float:
+        return time.time() + timeout if timeout is not None else math.inf
+
+    def _get_default_path(self) -> str:
+        base_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        project_hash = hashlib.md5(str(settings.SECRET_KEY).encode("utf-8")).hexdigest()
+        return os.path.join(base_dir, f"starlette_web_{project_hash}_{self.name}.cache")
+
+    def _open_storage(self) -> Tuple[mmap.mmap, int]:
+        size = self._file_header.size + self.slot_count * self.slot_size
+        header = self._file_header.pack(
+            self._magic, self.slot_count, self.slot_size, self.probe_limit
+        )
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        try:
+            # Storage is initialized by the first process, under lock of file header
+            fcntl.lockf(fd, fcntl.LOCK_EX, self._file_header.size, 0)
+            try:
+                existing_header = os.pread(fd, self._file_header.size, 0)
+                if existing_header[:len(self._magic)] != self._magic:
+                    # Zero-filled file is a table of empty slots
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, size)
+                    os.pwrite(fd, header, 0)
+                elif existing_header != header:
+                    raise ImproperlyConfigured(
+                        details=f"Storage {self.path} has been created with other options"
+                    )
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, self._file_header.size, 0)
+
+            return mmap.mmap(fd, size), fd
+        except BaseException:
+            os.close(fd)
+            raise
@@ -0,0 +1,355 @@
+import json
+import logging
+import uuid
+from typing import Any, Optional, Dict, Sequence, AsyncContextManager, List, Type
+
+import anyio
+from anyio._core._tasks import TaskGroup
+from anyio.abc import TaskStatus
+
+from starlette_web.common.caches.base import BaseCache
+from starlette_web.common.caches.cache_handler import caches
+from starlette_web.common.channels.base import Channel
+from starlette_web.common.channels.layers.base import BaseChannelLayer
+from starlette_web.common.http.exceptions import ImproperlyConfigured
+from starlette_web.common.utils import import_string
+
+
+logger = logging.getLogger(__name__)
+
+
+class TieredCache(BaseCache):
+    """
+    Two-tier (near) cache: a small short-living in-process L1 in front of any configured L2.
+
+    Supported options:
+    - L2 - alias of the underlying cache in settings.CACHES (required)
+    - L1 - dict with BACKEND and OPTIONS of in-process cache (bounded LocalMemoryCache by default)
+    - L1_TIMEOUT - max lifetime of L1 entries in seconds (5 by default)
+    - CHANNEL_LAYER - dict with BACKEND and OPTIONS of cross-process channel layer,
+      which is used to invalidate L1 entries in other processes
+    - INVALIDATION_GROUP - name of channel group for invalidation messages
+
+    Key prefix and version are applied by L1 and L2 backends, so KEY_PREFIX, VERSION
+    and KEY_FUNCTION must be configured in L2 options, not in options of TieredCache.
+
+    Invalidation messages are fire-and-forget, so L1_TIMEOUT is an upper bound
+    for a stale read in case a message has been lost.
+    Listener of invalidation messages reconnects to channel layer on errors,
+    and clears L1 on reconnect, since messages might have been lost meanwhile.
+    """
+
+    default_l1_max_entries = 1024
+    default_l1_timeout = 5.0
+    min_reconnect_delay = 0.5
+    max_reconnect_delay = 30.0
+
+    def __init__(self, options: Dict[str, Any]):
+        key_options = {"KEY_PREFIX", "VERSION", "KEY_FUNCTION", "REVERSE_KEY_FUNCTION"}
+        if key_options & set(options):
+            raise ImproperlyConfigured(
+                details=(
+                    "TieredCache does not support options KEY_PREFIX, VERSION, KEY_FUNCTION "
+                    "and REVERSE_KEY_FUNCTION. Configure them in options of L2 cache."
+                )
+            )
+
+        super().__init__(options)
+
+        l2_alias = options.get("L2")
+        if not l2_alias:
+            raise ImproperlyConfigured(details='TieredCache must be instantiated with option "L2"')
+
+        self.l2: BaseCache = caches[l2_alias]
+        self.l1: BaseCache = self._create_l1_cache(
+            options.get("L1")
+            or {
+                "BACKEND": "starlette_web.common.caches.local_memory.LocalMemoryCache",
+                "OPTIONS": {
+                    "name": f"tiered_{l2_alias}",
+                    "MAX_ENTRIES": self.default_l1_max_entries,
+                },
+            }
+        )
+        self.l1_timeout: float = options.get("L1_TIMEOUT", self.default_l1_timeout)
+        self.invalidation_group: str = options.get(
+            "INVALIDATION_GROUP",
+            f"starlette_web.caches.tiered.{l2_alias}",
+        )
+
+        self._channel_layer: Optional[BaseChannelLayer] = None
+        if options.get("CHANNEL_LAYER"):
+            self._channel_layer = self._create_channel_layer(options["CHANNEL_LAYER"])
+
+        self._sender_id = uuid.uuid4().hex
+        self._channel: Optional[Channel] = None
+        self._task_group: Optional[TaskGroup] = None
+
+    async def async_get(self, key: str, version: Optional[int] = None) -> Any:
+        version = self._resolve_version(version)
+        value = await self.l1.async_get(key, version=version)
+        if value is not None:
+            return value
+
+        value = await self.l2.async_get(key, version=version)
+        if value is not None:
+            await self.l1.async_set(key, value, timeout=self.l1_timeout, version=version)
+        return value
+
+    async def async_get_many(
+        self,
+        keys: Sequence[str],
+        version: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        version = self._resolve_version(version)
+        result = await self.l1.async_get_many(keys, version=version)
+        missing_keys = [key for key, value in result.items() if value is None]
+        if not missing_keys:
+            return result
+
+        l2_result = await self.l2.async_get_many(missing_keys, version=version)
+        found = {key: value for key, value in l2_result.items() if value is not None}
+        if found:
+            await self.l1.async_set_many(found, timeout=self.l1_timeout, version=version)
+
+        result.update(l2_result)
+        return result
+
+    async def async_set(
+        self,
+        key: str,
+        value: Any,
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> None:
+        version = self._resolve_version(version)
+        await self.l2.async_set(key, value, timeout=timeout, version=version)
+        await self.l1.async_set(
+            key, value, timeout=self._get_l1_timeout(timeout), version=version
+        )
+        await self._publish_invalidation(keys=[key], version=version)
+
+    async def async_set_many(
+        self,
+        data: Dict[str, Any],
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> None:
+        version = self._resolve_version(version)
+        await self.l2.async_set_many(data, timeout=timeout, version=version)
+        await self.l1.async_set_many(
+            data, timeout=self._get_l1_timeout(timeout), version=version
+        )
+        await self._publish_invalidation(keys=list(data.keys()), version=version)
+
+    async def async_delete(self, key: str, version: Optional[int] = None) -> None:
+        version = self._resolve_version(version)
+        await self.l2.async_delete(key, version=version)
+        await self.l1.async_delete(key, version=version)
+        await self._publish_invalidation(keys=[key], version=version)
+
+    async def async_delete_many(self, keys: Sequence[str], version: Optional[int] = None) -> None:
+        version = self._resolve_version(version)
+        await self.l2.async_delete_many(keys, version=version)
+        await self.l1.async_delete_many(keys, version=version)
+        await self._publish_invalidation(keys=list(keys), version=version)
+
+    async def async_incr(
+        self,
+        key: str,
+        delta: int = 1,
+        timeout: Optional[float] = None,
+        version: Optional[int] = None,
+    ) -> int:
+        version = self._resolve_version(version)
+        # Counters are always modified in L2, so that increments are atomic
+        value = await self.l2.async_incr(key, delta, timeout=timeout, version=version)
+        await self.l1.async_delete(key, version=version)
+        await self._publish_invalidation(keys=[key], version=version)
+        return value
+
+    async def async_incr_version(
+        self,
+        key: str,
+        delta: int = 1,
+        version: Optional[int] = None,
+    ) -> int:
+        version = self._resolve_version(version)
+        new_version = await self.l2.async_incr_version(key, delta, version=version)
+        await self.l1.async_delete(key, version=version)
+        await self.l1.async_delete(key, version=new_version)
+        await self._publish_invalidation(keys=[key], version=version)
+        await self._publish_invalidation(keys=[key], version=new_version)
+        return new_version
+
+    async def async_touch(
+        self,
+        key: str,
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> bool:
+        version = self._resolve_version(version)
+        touched = await self.l2.async_touch(key, timeout=timeout, version=version)
+        if timeout is not None:
+            await self.l1.async_touch(key, self._get_l1_timeout(timeout), version=version)
+        return touched
+
+    async def async_ttl(self, key: str, version: Optional[int] = None) -> Optional[float]:
+        return await self.l2.async_ttl(key, version=version)
+
+    async def async_keys(self, pattern: str, version: Optional[int] = None) -> List[str]:
+        return await self.l2.async_keys(pattern, version=version)
+
+    async def async_has_key(self, key: str, version: Optional[int] = None) -> bool:
+        version = self._resolve_version(version)
+        return (await self.l1.async_has_key(key, version=version)) or (
+            await self.l2.async_has_key(key, version=version)
+        )
+
+    async def async_clear(self) -> None:
+        await self.l2.async_clear()
+        await self.l1.async_clear()
+        await self._publish_invalidation(clear=True)
+
+    def lock(
+        self,
+        name: str,
+        timeout: Optional[float] = 20.0,
+        blocking_timeout: Optional[float] = None,
+        **kwargs,
+    ) -> AsyncContextManager:
+        return self.l2.lock(name, timeout=timeout, blocking_timeout=blocking_timeout, **kwargs)
+
+    async def async_connect(self) -> None:
+        if self._channel_layer is None or self._task_group is not None:
+            return
+
+        self._task_group = anyio.create_task_group()
+        await self._task_group.__aenter__()
+        await self._task_group.start(self._invalidation_listener)
+
+    async def async_disconnect(self) -> None:
+        if self._task_group is None:
+            return
+
+        self._task_group.cancel_scope.cancel()
+        try:
+            await self._task_group.__aexit__(None, None, None)
+        finally:
+            self._task_group = None
+            self._channel = None
+
+    async def _invalidation_listener(self, task_status: TaskStatus):
+        # Errors of channel layer must not fail task group of application lifespan,
+        # so listener reconnects with exponential backoff.
+        # Errors of initial connection are raised, so that misconfiguration fails startup.
+        is_started = False
+        reconnect_delay = self.min_reconnect_delay
+
+        while True:
+            try:
+                async with Channel(self._channel_layer) as channel:
+                    async with channel.subscribe(self.invalidation_group) as subscriber:
+                        self._channel = channel
+                        reconnect_delay = self.min_reconnect_delay
+                        if is_started:
+                            # Invalidation messages might have been lost while disconnected
+                            await self.l1.async_clear()
+                        else:
+                            is_started = True
+                            task_status.started()
+
+                        async for event in subscriber:
+                            await self._handle_invalidation(event.message)
+
+                logger.warning(
+                    "Listener of TieredCache invalidation has been closed, reconnecting in %s s",
+                    reconnect_delay,
+                )
+            except Exception as exc:  # noqa
+                if not is_started:
+                    raise
+
+                logger.exception(
+                    "Listener of TieredCache invalidation has failed, reconnecting in %s s: %r",
+                    reconnect_delay,
+                    exc,
+                )
+
+            self._channel = None
+            await anyio.sleep(reconnect_delay)
+            reconnect_delay = min(reconnect_delay * 2, self.max_reconnect_delay)
+
+    async def _handle_invalidation(self, raw_message: Any) -> None:
+        try:
+            message = json.loads(raw_message)
+        except (TypeError, ValueError):
+            message = None
+
+        if not isinstance(message, dict):
+            logger.warning("Invalid message for TieredCache invalidation: %r", raw_message)
+            return
+
+        try:
+            await self._invalidate_l1(message)
+        except Exception as exc:  # noqa
+            # A single bad message must not stop the listener
+            logger.exception("Failed to handle TieredCache invalidation %r: %r", message, exc)
+
+    async def _invalidate_l1(self, message: Dict[str, Any]) -> None:
+        if message.get("sender") == self._sender_id:
+            return
+
+        if message.get("clear"):
+            await self.l1.async_clear()
+        else:
+            await self.l1.async_delete_many(
+                message.get("keys", []),
+                version=self._resolve_version(message.get("version")),
+            )
+
+    def _resolve_version(self, version: Optional[int]) -> Optional[int]:
+        # Default version is held by L2, so that L1 entries of explicit default version
+        # and of omitted version are the same entries
+        return self.l2.version if version is None else version
+
+    async def _publish_invalidation(
+        self,
+        keys: Sequence[str] = (),
+        version: Optional[int] = None,
+        clear: bool = False,
+    ):
+        # Without channel layer (or before application startup)
+        # L1 entries of other processes expire after L1_TIMEOUT
+        if self._channel is None:
+            return
+
+        # Message is serialized to string, since some channel layers (i.e. PostgreSQL NOTIFY)
+        # only support string payloads
+        message = json.dumps(
+            {"sender": self._sender_id, "keys": list(keys), "version": version, "clear": clear}
+        )
+        await self._channel.publish(self.invalidation_group, message)
+
+    def _get_l1_timeout(self, timeout: Optional[float]) -> float:
+        if timeout is None:
+            return self.l1_timeout
+        return min(timeout, self.l1_timeout)
+
+    @staticmethod
+    def _create_l1_cache(config: Dict[str, Any]) -> BaseCache:
+        try:
+            cache_class: Type[BaseCache] = import_string(config["BACKEND"])
+            return cache_class(config.get("OPTIONS", {}))
+        except (ImportError, KeyError) as exc:
+            raise ImproperlyConfigured(details="Invalid L1 option for TieredCache") from exc
+
+    @staticmethod
+    def _create_channel_layer(config: Dict[str, Any]) -> BaseChannelLayer:
+        try:
+            layer_class: Type[BaseChannelLayer] = import_string(config["BACKEND"])
+            return layer_class(**config.get("OPTIONS", {}))
+        except (ImportError, KeyError) as exc:
+            raise ImproperlyConfigured(
+                details="Invalid CHANNEL_LAYER option for TieredCache"
+            ) from exc
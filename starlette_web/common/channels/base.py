@@ -56,6 +56,11 @@ class Channel:
             try:
                 event = await self._channel_layer.next_published()
             except ListenerClosed:
+                # Subscribers stop iterating, rather than wait for events forever
+                async with self._manager_lock:
+                    for send_streams in self._subscribers.values():
+                        for send_stream in send_streams:
+                            send_stream.close()
                 break
 
             async with self._manager_lock:
@@ -15,9 +15,35 @@ LANGUAGE_CODE = "en-us"
 
 # Database settings
 
-DB_ASYNC_SESSION_CLASS = "sqlalchemy.ext.asyncio.AsyncSession"
+# Subclass of sqlalchemy.ext.asyncio.AsyncSession. Caches of starlette_web are invalidated
+# after commit only with sessions, which implement on_commit() (see common.database.session)
+DB_ASYNC_SESSION_CLASS = "starlette_web.common.database.session.AsyncSession"
 DB_USE_CONNECTION_POOL_FOR_MANAGEMENT_COMMANDS = False
 DB_POOL_RECYCLE = 3600
+# Test connections for liveness on checkout (adds a round-trip per checkout)
+DB_POOL_PRE_PING = False
+# Number of pool connections, opened on application startup
+DB_POOL_PREWARM = 0
+# Raise max_overflow under load, i.e.
+# {"MAX_OVERFLOW": 32, "TARGET_WAIT": 0.05, "WINDOW": 100, "STEP": 2}. None to disable
+DB_POOL_ADAPTIVE_OVERFLOW = None
+
+# Named databases besides DATABASE_DSN (alias "default"), i.e.
+# {"replica": {"DSN": "postgresql+asyncpg://...", "REPLICA": True}}
+DATABASES = {}
+# "round_robin" or "least_connections"
+DB_REPLICA_POLICY = "round_robin"
+# Reads are sent to "default" database for this time after a write (replication lag)
+DB_REPLICA_STICKY_SECONDS = 1.0
+
+# Statistics of SQL statements per request / websocket task (request.state.query_profile)
+DB_PROFILE_QUERIES = False
+# Whether to add "Server-Timing: db;dur=..." header to profiled responses
+DB_PROFILER_SERVER_TIMING = False
+# Statements, repeated this number of times per profile, are logged as possible N+1 queries
+DB_PROFILER_REPEATED_STATEMENTS = 10
+# Statements, which took longer (in seconds), are logged. None to disable
+DB_SLOW_QUERY_THRESHOLD = None
 
 # Common.cache
 
@@ -30,6 +56,9 @@ CACHES = {
     },
 }
 
+# Import strings of starlette_web.common.caches.metrics.BaseCacheMetricsExporter subclasses
+CACHE_METRICS_EXPORTERS = []
+
 # Common.email
 
 # TODO: copy other email-relevant options in SMTPproto issue
@@ -55,3 +84,9 @@ AUTH_JWT_REFRESH_EXPIRES_IN = 30 * 24 * 3600  # 30 days
 AUTH_JWT_ALGORITHM = "HS512"
 AUTH_INVITE_LINK_EXPIRES_IN = 3 * 24 * 3600  # 3 day
 AUTH_RESET_PASSWORD_LINK_EXPIRES_IN = 3 * 3600  # 3 hours
+# Cache alias for active users of JWT sessions, so that authentication skips database.
+# None to disable
+AUTH_IDENTITY_CACHE = None
+AUTH_IDENTITY_CACHE_TIMEOUT = 30
+# Find active user and session of JWT with a single joined query
+AUTH_JOINED_QUERY = False
@@ -1,7 +1,15 @@
 # flake8: noqa
 
 from starlette_web.common.database.columns import EnumTypeColumn
+from starlette_web.common.database.filters import FilterOperator, filter_operators
+from starlette_web.common.database.lazy_session import LazySession
 from starlette_web.common.database.model_base import ModelBase
 from starlette_web.common.database.model_mixin import ModelMixin, DBModel
-from starlette_web.common.database.session_maker import make_session_maker
+from starlette_web.common.database.routing import DatabaseRouter, RoutingSession
+from starlette_web.common.database.session import AsyncSession, on_commit
+from starlette_web.common.database.session_maker import (
+    make_session_maker,
+    get_session_maker,
+    session_makers,
+)
 from starlette_web.common.database.types import ChoiceType
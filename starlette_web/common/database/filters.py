@@ -0,0 +1,167 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import not_
+
+
+LIKE_ESCAPE_CHAR = "/"
+
+
+def escape_like(value: str) -> str:
+    return (
+        value.replace(LIKE_ESCAPE_CHAR, LIKE_ESCAPE_CHAR * 2)
+        .replace("%", LIKE_ESCAPE_CHAR + "%")
+        .replace("_", LIKE_ESCAPE_CHAR + "_")
+    )
+
+
+class FilterOperator:
+    """
+    Criteria of ModelMixin filters, i.e. "gte" in User.async_filter(db_session, id__gte=10).
+
+    :param function: builds SQL expression of (column, value)
+    :param prepare: converts filter value before it is bound, i.e. escapes LIKE pattern
+    :param bind_value: whether value is passed as bound parameter (so that statement
+        is cached regardless of value) or rendered into SQL (for operators like IS,
+        which do not accept parameters; statement is then cached per value)
+    :param expanding: whether value is a list of parameters, as for IN
+    :param bind_count: number of bound parameters, i.e. 2 for bounds of BETWEEN.
+        If greater than 1, prepare must convert value into a tuple of bind_count items,
+        and function receives a tuple of values (or of bound parameters)
+    """
+
+    def __init__(
+        self,
+        function: Callable[[Any, Any], Any],
+        prepare: Optional[Callable[[Any], Any]] = None,
+        bind_value: bool = True,
+        expanding: bool = False,
+        bind_count: int = 1,
+    ):
+        self.function = function
+        self.prepare = prepare
+        self.bind_value = bind_value
+        self.expanding = expanding
+        self.bind_count = bind_count
+
+    def __call__(self, column, value):
+        return self.function(column, value)
+
+    def prepare_value(self, value: Any) -> Any:
+        if self.prepare is None:
+            return value
+        return self.prepare(value)
+
+
+def _prepare_range(value) -> Tuple[Any, Any]:
+    lower, upper = value
+    return lower, upper
+
+
+def _relation_exists(relation, value: bool):
+    # any() for one-to-many / many-to-many, has() for many-to-one relations
+    criterion = relation.any() if relation.property.uselist else relation.has()
+    return criterion if value else not_(criterion)
+
+
+class FilterOperatorRegistry:
+    """
+    Registry of filter operators, available to all models with ModelMixin.
+    Apps may register their own (i.e. dialect-specific) operators on startup:
+
+    filter_operators.register("trgm", FilterOperator(lambda column, value: column.op("%")(value)))
+    """
+
+    def __init__(self):
+        self._operators: Dict[str, FilterOperator] = {}
+        # Incremented on each change, so that cached statements are not reused
+        self.version = 0
+
+    def register(self, name: str, operator: FilterOperator) -> None:
+        self._operators[name] = operator
+        self.version += 1
+
+    def unregister(self, name: str) -> None:
+        self._operators.pop(name, None)
+        self.version += 1
+
+    def get(self, name: str) -> FilterOperator:
+        try:
+            return self._operators[name or "eq"]
+        except KeyError:
+            raise NotImplementedError(f"Unexpected criteria: {name}")
+
+    def __contains__(self, name: str) -> bool:
+        return (name or "eq") in self._operators
+
+
+filter_operators = FilterOperatorRegistry()
+
+filter_operators.register("eq", FilterOperator(lambda column, value: column == value))
+filter_operators.register("ne", FilterOperator(lambda column, value: column != value))
+filter_operators.register("gt", FilterOperator(lambda column, value: column > value))
+filter_operators.register("gte", FilterOperator(lambda column, value: column >= value))
+filter_operators.register("lt", FilterOperator(lambda column, value: column < value))
+filter_operators.register("lte", FilterOperator(lambda column, value: column <= value))
+filter_operators.register(
+    "in",
+    FilterOperator(lambda column, value: column.in_(value), expanding=True),
+)
+filter_operators.register(
+    "notin",
+    FilterOperator(lambda column, value: column.not_in(value), expanding=True),
+)
+filter_operators.register(
+    "range",
+    FilterOperator(
+        lambda column, value: column.between(value[0], value[1]),
+        prepare=_prepare_range,
+        bind_count=2,
+    ),
+)
+filter_operators.register(
+    "is",
+    FilterOperator(lambda column, value: column.is_(value), bind_value=False),
+)
+filter_operators.register(
+    "isnull",
+    FilterOperator(
+        lambda column, value: column.is_(None) if value else column.is_not(None),
+        bind_value=False,
+    ),
+)
+filter_operators.register(
+    "inarr",
+    FilterOperator(lambda column, value: column.contains([value]), bind_value=False),
+)
+# Prefix matching without leading wildcard may use btree index
+# (for PostgreSQL, with "C" collation or text_pattern_ops operator class)
+filter_operators.register(
+    "startswith",
+    FilterOperator(
+        lambda column, value: column.like(value, escape=LIKE_ESCAPE_CHAR),
+        prepare=lambda value: f"{escape_like(value)}%",
+    ),
+)
+filter_operators.register(
+    "istartswith",
+    FilterOperator(
+        lambda column, value: column.ilike(value, escape=LIKE_ESCAPE_CHAR),
+        prepare=lambda value: f"{escape_like(value)}%",
+    ),
+)
+filter_operators.register(
+    "contains",
+    FilterOperator(
+        lambda column, value: column.like(value, escape=LIKE_ESCAPE_CHAR),
+        prepare=lambda value: f"%{escape_like(value)}%",
+    ),
+)
+# Not escaped, for backward compatibility
+filter_operators.register(
+    "icontains",
+    FilterOperator(
+        lambda column, value: column.ilike(value),
+        prepare=lambda value: f"%{value}%",
+    ),
+)
+filter_operators.register("exists", FilterOperator(_relation_exists, bind_value=False))
@@ -0,0 +1,54 @@
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+
+class LazySession:
+    """
+    Proxy of AsyncSession, which is only created with session_maker(**session_kwargs)
+    on first access to any of its attributes (i.e. db_session.execute).
+
+    If session has not been created, commit(), rollback() and close() do nothing,
+    so that endpoints, which never touch database, do not check out pool connections.
+    """
+
+    def __init__(self, session_maker: sessionmaker, **session_kwargs):
+        self._session_maker = session_maker
+        self._session_kwargs = session_kwargs
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._session_maker(**self._session_kwargs)
+        return self._session
+
+    @property
+    def is_created(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, item):
+        if item.startswith("_"):
+            raise AttributeError(item)
+        return getattr(self.session, item)
+
+    async def __aenter__(self) -> "LazySession":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self._session is not None:
+            # Session is closed with its own __aexit__, which may be shielded from cancellation
+            session, self._session = self._session, None
+            await session.__aexit__(exc_type, exc_val, exc_tb)
+
+    async def commit(self) -> None:
+        if self._session is not None:
+            await self._session.commit()
+
+    async def rollback(self) -> None:
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        await self.__aexit__(None, None, None)
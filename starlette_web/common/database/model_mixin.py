@@ -1,15 +1,40 @@
-from typing import TypeVar, List, Optional
-
-from sqlalchemy import and_, select, update, delete
-from sqlalchemy.engine import ScalarResult
+import functools
+from typing import (
+    TypeVar,
+    List,
+    Optional,
+    Sequence,
+    Dict,
+    Any,
+    Tuple,
+    AsyncIterator,
+    Hashable,
+    Mapping,
+    Union,
+)
+
+from sqlalchemy import and_, or_, select, update, delete, insert, literal, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import ScalarResult, MappingResult
+from sqlalchemy.orm import defer as defer_column
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.inspection import inspect
 from sqlalchemy.sql import Select
 
+from starlette_web.common.database.filters import filter_operators
+from starlette_web.common.database.result_cache import execute_cached, invalidate_result_cache
+
+
+# Default number of rows per statement for bulk methods
+BULK_BATCH_SIZE = 1000
+# Default number of rows per fetch (or query) for iteration methods
+STREAM_YIELD_PER = 1000
+# Max number of statement templates, cached by ModelMixin._get_query_template
+QUERY_CACHE_SIZE = 1024
+
 
 class ModelMixin:
     # TODO: maybe rename "db_commit" to "commit" ?
-    # TODO: add bulk methods
     """
     Base model for Sqlalchemy's ORM
 
@@ -21,6 +46,10 @@ class ModelMixin:
 
     class Meta:
         order_by = ()
+        # Seconds to cache results of async_get / async_filter in caches[cache_alias]
+        # (None - disabled). Writes of model with ModelMixin methods invalidate them
+        cache_ttl = None
+        cache_alias = "default"
 
     @classmethod
     def prepare_query(
@@ -28,21 +57,24 @@ class ModelMixin:
         limit: int = None,
         offset: int = None,
         order_by=(),
+        fields: Sequence[str] = (),
+        defer: Sequence[str] = (),
         **filter_kwargs,
     ) -> Select:
-        _order_by = []
-
-        if order_by:
-            _order_by = [o for o in order_by]
-        else:
-            _order_by = [o for o in cls.Meta.order_by]
-
+        """
+        :param fields: select only these columns, rather than instances
+        :param defer: columns of instances not to load (accessing them raises error)
+        """
         _order_by = [
             getattr(cls, field.lstrip("-")).desc() if field.startswith("-") else getattr(cls, field)
-            for field in _order_by
+            for field in cls._get_order_fields(order_by)
         ]
 
-        query = select(cls).filter(cls._filter_criteria(filter_kwargs)).order_by(*_order_by)
+        query = (
+            cls._get_select(fields, defer)
+            .filter(cls._filter_criteria(filter_kwargs))
+            .order_by(*_order_by)
+        )
 
         if limit is not None:
             query = query.limit(limit)
@@ -52,18 +84,160 @@ class ModelMixin:
 
         return query
 
+    @classmethod
+    def prepare_query_with_params(
+        cls,
+        limit: int = None,
+        offset: int = None,
+        order_by=(),
+        fields: Sequence[str] = (),
+        defer: Sequence[str] = (),
+        **filter_kwargs,
+    ) -> Tuple[Select, Dict[str, Any]]:
+        """
+        Same as prepare_query, but returns statement with bound parameters and their values,
+        to be executed as db_session.execute(query, params).
+
+        Statement is cached per model and "shape" of arguments (filter names, order_by,
+        fields, defer, presence of limit/offset), so that repeated lookups only bind new values,
+        instead of parsing filters and building select() from scratch.
+        """
+        if cls._has_custom_query():
+            return cls.prepare_query(limit, offset, order_by, fields, defer, **filter_kwargs), {}
+
+        shape, params = [], {}
+        for idx, (filter_name, filter_value) in enumerate(filter_kwargs.items()):
+            operator = filter_operators.get(filter_name.partition("__")[2])
+            if operator.bind_value:
+                shape.append((filter_name,))
+                value = operator.prepare_value(filter_value)
+                if operator.bind_count == 1:
+                    params[f"filter_{idx}"] = value
+                else:
+                    params.update({f"filter_{idx}_{num}": item for num, item in enumerate(value)})
+            elif isinstance(filter_value, Hashable):
+                # Type is a part of shape, since equal values of different types
+                # (i.e. True, 1 and 1.0) have the same hash, but may render different SQL
+                shape.append((filter_name, filter_value, type(filter_value)))
+            else:
+                query = cls.prepare_query(limit, offset, order_by, fields, defer, **filter_kwargs)
+                return query, {}
+
+        if limit is not None:
+            params["limit"] = limit
+        if offset is not None:
+            params["offset"] = offset
+
+        query = cls._get_query_template(
+            tuple(shape),
+            tuple(order_by),
+            tuple(fields),
+            tuple(defer),
+            limit is not None,
+            offset is not None,
+            filter_operators.version,
+        )
+        return query, params
+
     @classmethod
     async def async_filter(
         cls, db_session: AsyncSession, limit: int = None, offset: int = None, **filter_kwargs
-    ) -> ScalarResult:
-        query = cls.prepare_query(limit=limit, offset=offset, **filter_kwargs)
-        result = await db_session.execute(query)
-        return result.scalars()
+    ) -> Union[ScalarResult, MappingResult]:
+        """
+        Returns instances, or mappings of columns (without ORM overhead),
+        if "fields" are passed, i.e. User.async_filter(db_session, fields=["id", "email"])
+        """
+        query, params = cls.prepare_query_with_params(limit=limit, offset=offset, **filter_kwargs)
+        result = await execute_cached(cls, db_session, query, params)
+        return result.mappings() if filter_kwargs.get("fields") else result.scalars()
+
+    @classmethod
+    async def async_stream(
+        cls,
+        db_session: AsyncSession,
+        yield_per: int = STREAM_YIELD_PER,
+        **filter_kwargs,
+    ) -> AsyncIterator["DBModel"]:
+        """
+        Iterates over entries with server-side cursor, fetching yield_per rows at once.
+        Cursor holds connection and transaction of session, till iteration is over.
+
+        :param db_session: active instance of AsyncSession
+        :param yield_per: number of rows, fetched from cursor at once
+        :param filter_kwargs: same as for prepare_query
+        """
+        query, params = cls.prepare_query_with_params(**filter_kwargs)
+        query = query.execution_options(yield_per=yield_per)
+        if filter_kwargs.get("fields"):
+            result = (await db_session.stream(query, params)).mappings()
+        else:
+            result = await db_session.stream_scalars(query, params)
+        try:
+            async for instance in result:
+                yield instance
+        finally:
+            await result.close()
+
+    @classmethod
+    async def async_iter(
+        cls,
+        db_session: AsyncSession,
+        page_size: int = STREAM_YIELD_PER,
+        order_by=(),
+        fields: Sequence[str] = (),
+        **filter_kwargs,
+    ) -> AsyncIterator["DBModel"]:
+        """
+        Iterates over entries with keyset (seek) pagination: each page is a separate query,
+        which continues after the last entry of previous page by order_by
+        (Meta.order_by by default) and primary keys. Unlike OFFSET,
+        cost of a page does not grow with its number, if there is a matching index.
+        Columns of order_by must not be nullable.
+
+        :param db_session: active instance of AsyncSession
+        :param page_size: number of entries per query
+        :param order_by: fields to order by, i.e. ("-created_at",)
+        :param fields: yield mappings of these columns, columns of order_by are always included
+        :param filter_kwargs: same as for prepare_query
+        """
+        order_fields = cls._get_order_fields(order_by)
+        order_fields += [
+            key.name
+            for key in inspect(cls).primary_key
+            if key.name not in [field.lstrip("-") for field in order_fields]
+        ]
+        if fields:
+            fields = list(fields) + [
+                field.lstrip("-") for field in order_fields if field.lstrip("-") not in fields
+            ]
+
+        last_instance = None
+        while True:
+            query = cls.prepare_query(
+                limit=page_size, order_by=order_fields, fields=fields, **filter_kwargs
+            )
+            if last_instance is not None:
+                query = query.where(cls._get_keyset_criteria(order_fields, last_instance))
+
+            result = await db_session.execute(query)
+            instances = (result.mappings() if fields else result.scalars()).all()
+            for instance in instances:
+                yield instance
+
+            if len(instances) < page_size:
+                break
+            last_instance = instances[-1]
 
     @classmethod
-    async def async_get(cls, db_session: AsyncSession, **filter_kwargs) -> "DBModel":
-        query = cls.prepare_query(**filter_kwargs)
-        result = await db_session.execute(query)
+    async def async_get(
+        cls,
+        db_session: AsyncSession,
+        **filter_kwargs,
+    ) -> Union["DBModel", Mapping[str, Any], None]:
+        query, params = cls.prepare_query_with_params(**filter_kwargs)
+        result = await execute_cached(cls, db_session, query, params)
+        if filter_kwargs.get("fields"):
+            return result.mappings().first()
         return result.scalars().first()
 
     @classmethod
@@ -81,6 +255,8 @@ class ModelMixin:
             .execution_options(synchronize_session="fetch")
         )
         await db_session.execute(query)
+        await invalidate_result_cache(cls, db_session)
+
         if db_commit:
             await db_session.commit()
 
@@ -92,6 +268,8 @@ class ModelMixin:
             .execution_options(synchronize_session="fetch")
         )
         await db_session.execute(query)
+        await invalidate_result_cache(cls, db_session)
+
         if db_commit:
             await db_session.commit()
 
@@ -103,6 +281,8 @@ class ModelMixin:
         # Explicit flush() to populate newly created instance with primary key (if autogenerated).
         await db_session.flush()
 
+        await invalidate_result_cache(cls, db_session)
+
         if db_commit:
             await db_session.commit()
         return instance
@@ -182,6 +362,127 @@ class ModelMixin:
             )
         return instance
 
+    @classmethod
+    async def async_bulk_create(
+        cls,
+        db_session: AsyncSession,
+        data: Sequence[Dict[str, Any]],
+        batch_size: int = BULK_BATCH_SIZE,
+        db_commit=False,
+    ) -> List["DBModel"]:
+        """
+        Creates entries with multi-row INSERT ... RETURNING, batch_size rows per statement.
+        Falls back to flushing instances, if dialect does not support RETURNING for executemany.
+
+        :param db_session: active instance of AsyncSession
+        :param data: list of dicts with values of new entries
+        :param batch_size: max number of rows per statement
+        :param db_commit: bool, whether to execute db_session.commit()
+        :returns: list of created instances in the same order as data
+        """
+        instances = []
+        for batch in cls._get_batches(data, batch_size):
+            instances.extend(await cls._bulk_insert(db_session, batch))
+
+        await invalidate_result_cache(cls, db_session)
+
+        if db_commit:
+            await db_session.commit()
+        return instances
+
+    @classmethod
+    async def async_bulk_update(
+        cls,
+        db_session: AsyncSession,
+        data: Sequence[Dict[str, Any]],
+        batch_size: int = BULK_BATCH_SIZE,
+        db_commit=False,
+    ):
+        """
+        Updates entries by primary key with executemany UPDATE, batch_size rows per statement.
+
+        :param db_session: active instance of AsyncSession
+        :param data: list of dicts, each with primary key(s) and values to update
+        :param batch_size: max number of rows per statement
+        :param db_commit: bool, whether to execute db_session.commit()
+        """
+        for batch in cls._get_batches(data, batch_size):
+            await db_session.execute(update(cls), batch)
+
+        await invalidate_result_cache(cls, db_session)
+
+        if db_commit:
+            await db_session.commit()
+
+    @classmethod
+    async def async_bulk_upsert(
+        cls,
+        db_session: AsyncSession,
+        data: Sequence[Dict[str, Any]],
+        index_elements: Optional[Sequence[str]] = None,
+        update_fields: Optional[Sequence[str]] = None,
+        batch_size: int = BULK_BATCH_SIZE,
+        db_commit=False,
+    ) -> List["DBModel"]:
+        """
+        Creates entries, or updates existing ones, which match by index_elements.
+        Uses INSERT ... ON CONFLICT DO UPDATE ... RETURNING for PostgreSQL and SQLite,
+        otherwise selects existing entries of each batch and updates or creates them.
+
+        :param db_session: active instance of AsyncSession
+        :param data: list of dicts with values of entries
+        :param index_elements: columns of unique index (primary keys by default)
+        :param update_fields: columns to update for existing entries
+            (all columns of data, except index_elements, by default)
+        :param batch_size: max number of rows per statement
+        :param db_commit: bool, whether to execute db_session.commit()
+        :returns: list of created and updated instances in the same order as data
+        """
+        if not data:
+            return []
+
+        if index_elements is None:
+            index_elements = [key.name for key in inspect(cls).primary_key]
+        if update_fields is None:
+            update_fields = [key for key in data[0] if key not in index_elements]
+
+        dialect = db_session.get_bind().dialect
+        insert_function = UPSERT_DIALECTS.get(dialect.name)
+        use_returning = insert_function is not None and dialect.insert_executemany_returning
+
+        instances = []
+        for batch in cls._get_batches(data, batch_size):
+            if use_returning:
+                # With nothing to update, index is set to itself,
+                # since DO NOTHING does not return existing rows
+                query = insert_function(cls)
+                query = query.on_conflict_do_update(
+                    index_elements=index_elements,
+                    set_={
+                        field: query.excluded[field]
+                        for field in (update_fields or index_elements[:1])
+                    },
+                )
+
+                result = await db_session.scalars(
+                    query.returning(cls, sort_by_parameter_order=True),
+                    batch,
+                    execution_options={"populate_existing": True},
+                )
+                instances.extend(result.all())
+            else:
+                instances.extend(
+                    await cls._bulk_upsert_fallback(
+                        db_session, batch, index_elements, update_fields
+                    )
+                )
+
+        await invalidate_result_cache(cls, db_session)
+
+        if db_commit:
+            await db_session.commit()
+        return instances
+
     async def update(self, db_session: AsyncSession, db_commit=False, **update_data):
         primary_keys_names = [key.name for key in inspect(self.__class__).primary_key]
         filter_kwargs = {key: getattr(self, key) for key in primary_keys_names}
@@ -196,6 +497,8 @@ class ModelMixin:
         await db_session.delete(self)
         await db_session.flush()
 
+        await invalidate_result_cache(self.__class__, db_session)
+
         if db_commit:
             await db_session.commit()
 
@@ -208,32 +511,187 @@ class ModelMixin:
 
         return res
 
+    @classmethod
+    @functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+    def _get_query_template(
+        cls,
+        shape: Tuple[Tuple, ...],
+        order_by: Tuple[str, ...],
+        fields: Tuple[str, ...],
+        defer: Tuple[str, ...],
+        has_limit: bool,
+        has_offset: bool,
+        operators_version: int,
+    ) -> Select:
+        # operators_version is only a part of cache key
+        filters = []
+        for idx, (filter_name, *literal_value) in enumerate(shape):
+            field, _, criteria = filter_name.partition("__")
+            operator = filter_operators.get(criteria)
+            if literal_value:
+                value = operator.prepare_value(literal_value[0])
+            elif operator.bind_count == 1:
+                value = bindparam(f"filter_{idx}", expanding=operator.expanding)
+            else:
+                value = tuple(
+                    bindparam(f"filter_{idx}_{num}", expanding=operator.expanding)
+                    for num in range(operator.bind_count)
+                )
+            filters.append(cls._make_criterion(field, criteria, value))
+
+        _order_by = [
+            getattr(cls, field.lstrip("-")).desc() if field.startswith("-") else getattr(cls, field)
+            for field in cls._get_order_fields(order_by)
+        ]
+        query = cls._get_select(fields, defer).filter(and_(True, *filters)).order_by(*_order_by)
+
+        if has_limit:
+            query = query.limit(bindparam("limit"))
+
+        if has_offset:
+            query = query.offset(bindparam("offset"))
+
+        return query
+
+    @classmethod
+    def _get_select(cls, fields: Sequence[str] = (), defer: Sequence[str] = ()) -> Select:
+        if fields:
+            return select(*[getattr(cls, field) for field in fields])
+
+        query = select(cls)
+        if defer:
+            # Deferred columns cannot be lazy-loaded with AsyncSession, so access raises error
+            query = query.options(
+                *[defer_column(getattr(cls, field), raiseload=True) for field in defer]
+            )
+        return query
+
+    @classmethod
+    def _has_custom_query(cls) -> bool:
+        # Subclasses, which build queries differently, are not cached
+        return (
+            cls.prepare_query.__func__ is not ModelMixin.prepare_query.__func__
+            or cls._filter_criteria.__func__ is not ModelMixin._filter_criteria.__func__
+            or cls._make_criterion.__func__ is not ModelMixin._make_criterion.__func__
+        )
+
+    @classmethod
+    def _get_order_fields(cls, order_by=()) -> List[str]:
+        return list(order_by or cls.Meta.order_by)
+
+    @classmethod
+    def _get_keyset_criteria(
+        cls,
+        order_fields: List[str],
+        last_row: Union["DBModel", Mapping[str, Any]],
+    ):
+        # (a, b) after (x, y) is "a > x OR (a = x AND b > y)", with < for descending fields
+        criteria = []
+        for idx, field in enumerate(order_fields):
+            column_name = field.lstrip("-")
+            column = getattr(cls, column_name)
+            # Typed literal, since operators like > are not allowed for plain True/False
+            value = literal(cls._get_row_value(last_row, column_name), column.type)
+            equals = [
+                getattr(cls, prev) == cls._get_row_value(last_row, prev)
+                for prev in [prev_field.lstrip("-") for prev_field in order_fields[:idx]]
+            ]
+            seek = column < value if field.startswith("-") else column > value
+            criteria.append(and_(*equals, seek))
+
+        return or_(*criteria)
+
+    @staticmethod
+    def _get_row_value(row: Union["DBModel", Mapping[str, Any]], field: str) -> Any:
+        if isinstance(row, Mapping):
+            return row[field]
+        return getattr(row, field)
+
+    @classmethod
+    async def _bulk_insert(
+        cls,
+        db_session: AsyncSession,
+        batch: List[Dict[str, Any]],
+    ) -> List["DBModel"]:
+        if not db_session.get_bind().dialect.insert_executemany_returning:
+            instances = [cls(**row) for row in batch]  # noqa
+            db_session.add_all(instances)
+            await db_session.flush()
+            return instances
+
+        result = await db_session.scalars(
+            insert(cls).returning(cls, sort_by_parameter_order=True),
+            batch,
+        )
+        return result.all()
+
+    @classmethod
+    async def _bulk_upsert_fallback(
+        cls,
+        db_session: AsyncSession,
+        batch: List[Dict[str, Any]],
+        index_elements: Sequence[str],
+        update_fields: Sequence[str],
+    ) -> List["DBModel"]:
+        def get_key(values) -> Tuple:
+            return tuple(values[field] for field in index_elements)
+
+        query = select(cls).where(
+            or_(
+                *[
+                    and_(*[getattr(cls, field) == row[field] for field in index_elements])
+                    for row in batch
+                ]
+            )
+        )
+        existing = {
+            get_key(instance.__dict__): instance
+            for instance in (await db_session.scalars(query)).all()
+        }
+
+        new_rows = [row for row in batch if get_key(row) not in existing]
+        created = iter(await cls._bulk_insert(db_session, new_rows) if new_rows else [])
+
+        instances = []
+        for row in batch:
+            instance = existing.get(get_key(row))
+            if instance is None:
+                instances.append(next(created))
+                continue
+
+            for field in update_fields:
+                setattr(instance, field, row[field])
+            instances.append(instance)
+
+        # Updates of existing instances are flushed with executemany
+        await db_session.flush()
+        return instances
+
+    @staticmethod
+    def _get_batches(
+        data: Sequence[Dict[str, Any]],
+        batch_size: int,
+    ) -> List[List[Dict[str, Any]]]:
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+        return [list(data[idx: idx + batch_size]) for idx in range(0, len(data), batch_size)]
+
     @classmethod
     def _filter_criteria(cls, filter_kwargs):
         filters = []
         for filter_name, filter_value in filter_kwargs.items():
             field, _, criteria = filter_name.partition("__")
-            if criteria in ("eq", ""):
-                filters.append(getattr(cls, field) == filter_value)
-            elif criteria == "gt":
-                filters.append(getattr(cls, field) > filter_value)
-            elif criteria == "lt":
-                filters.append(getattr(cls, field) < filter_value)
-            elif criteria == "is":
-                filters.append(getattr(cls, field).is_(filter_value))
-            elif criteria == "in":
-                filters.append(getattr(cls, field).in_(filter_value))
-            elif criteria == "inarr":
-                filters.append(getattr(cls, field).contains([filter_value]))
-            elif criteria == "icontains":
-                filters.append(getattr(cls, field).ilike(f"%{filter_value}%"))
-            elif criteria == "ne":
-                filters.append(getattr(cls, field) != filter_value)
-            else:
-                raise NotImplementedError(f"Unexpected criteria: {criteria}")
+            value = filter_operators.get(criteria).prepare_value(filter_value)
+            filters.append(cls._make_criterion(field, criteria, value))
 
         return and_(True, *filters)
 
+    @classmethod
+    def _make_criterion(cls, field: str, criteria: str, value: Any):
+        # Value is already prepared by operator, or is a bindparam
+        # See starlette_web.common.database.filters for available criteria
+        return filter_operators.get(criteria)(getattr(cls, field), value)
+
     @staticmethod
     def _object_needs_update(
         dict_original,
@@ -254,3 +712,9 @@ class ModelMixin:
 
 
 DBModel = TypeVar("DBModel", bound=ModelMixin)
+
+# Dialects, which support INSERT ... ON CONFLICT DO UPDATE
+UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
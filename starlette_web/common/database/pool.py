@@ -0,0 +1,202 @@
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import anyio
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveOverflowPolicy:
+    """
+    Raises max_overflow of pool by step (up to max_overflow), if average wait
+    for a checkout within window of checkouts exceeds target_wait,
+    and lowers it back (down to initial value), once overflow connections are not used.
+    """
+
+    def __init__(
+        self,
+        max_overflow: int,
+        target_wait: float = 0.05,
+        window: int = 100,
+        step: int = 1,
+    ):
+        self.max_overflow = max_overflow
+        self.target_wait = target_wait
+        self.window = window
+        self.step = step
+        self._min_overflow: Optional[int] = None
+
+    @classmethod
+    def from_options(cls, options: Optional[Dict[str, Any]]) -> Optional["AdaptiveOverflowPolicy"]:
+        if not options:
+            return None
+
+        return cls(
+            max_overflow=options["MAX_OVERFLOW"],
+            target_wait=options.get("TARGET_WAIT", 0.05),
+            window=options.get("WINDOW", 100),
+            step=options.get("STEP", 1),
+        )
+
+    def adjust(self, pool: "ObservedAsyncQueuePool", average_wait: float, peak_overflow: int):
+        if self._min_overflow is None:
+            self._min_overflow = pool._max_overflow
+
+        current = pool._max_overflow
+        if average_wait > self.target_wait:
+            new_value = min(self.max_overflow, current + self.step)
+        elif peak_overflow <= current - self.step:
+            new_value = max(self._min_overflow, current - self.step)
+        else:
+            new_value = current
+
+        if new_value != current:
+            logger.info(
+                "max_overflow of pool %s has been changed from %d to %d (average wait %.3f s)",
+                pool.observer.alias,
+                current,
+                new_value,
+                average_wait,
+            )
+            pool._max_overflow = new_value
+
+
+class PoolObserver:
+    """
+    Collects metrics of a connection pool: checked-out connections, overflow,
+    time to check out a connection and age of checked-out connections.
+    """
+
+    def __init__(self, alias: str = "", policy: Optional[AdaptiveOverflowPolicy] = None):
+        self.alias = alias
+        self.policy = policy
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_age = 0.0
+        self.max_age = 0.0
+        self._window_checkouts = 0
+        self._window_wait = 0.0
+        self._window_peak_overflow = 0
+
+    def observe_checkout(self, pool: "ObservedAsyncQueuePool", wait: float, age: float) -> None:
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.total_age += age
+        self.max_age = max(self.max_age, age)
+
+        if self.policy is None:
+            return
+
+        self._window_checkouts += 1
+        self._window_wait += wait
+        self._window_peak_overflow = max(self._window_peak_overflow, pool.overflow())
+
+        if self._window_checkouts >= self.policy.window:
+            self.policy.adjust(
+                pool,
+                self._window_wait / self._window_checkouts,
+                self._window_peak_overflow,
+            )
+            self._window_checkouts = 0
+            self._window_wait = 0.0
+            self._window_peak_overflow = 0
+
+    def observe_timeout(self) -> None:
+        self.timeouts += 1
+
+    def snapshot(self, pool: Pool) -> Dict[str, Any]:
+        return {
+            "alias": self.alias,
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            # Negative, while pool has not yet opened pool_size connections
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "average_wait": self.total_wait / self.checkouts if self.checkouts else 0.0,
+            "max_wait": self.max_wait,
+            "average_age": self.total_age / self.checkouts if self.checkouts else 0.0,
+            "max_age": self.max_age,
+        }
+
+
+class ObservedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool, which reports checkouts to PoolObserver (pool.observer).
+    Wait time includes pre-ping, if enabled.
+    """
+
+    observer: PoolObserver
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.observer = PoolObserver()
+
+    def connect(self):
+        start_time = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.observer.observe_timeout()
+            raise
+
+        age = time.time() - connection._connection_record.starttime
+        self.observer.observe_checkout(self, time.perf_counter() - start_time, age)
+        return connection
+
+    def recreate(self) -> "ObservedAsyncQueuePool":
+        # Engine.dispose() replaces pool, metrics and policy are kept
+        pool = super().recreate()
+        pool._max_overflow = self._max_overflow
+        pool.observer = self.observer
+        return pool
+
+
+def get_pool_metrics(engine: AsyncEngine) -> Optional[Dict[str, Any]]:
+    pool = engine.pool
+    if not isinstance(pool, ObservedAsyncQueuePool):
+        return None
+    return pool.observer.snapshot(pool)
+
+
+async def prewarm_pool(engine: AsyncEngine, count: int) -> None:
+    """
+    Opens count connections at once and returns them to pool,
+    so that first requests do not wait for connection handshakes.
+    """
+    if not isinstance(engine.pool, ObservedAsyncQueuePool):
+        return
+
+    # Connections above pool_size would be closed on return anyway
+    count = min(count, engine.pool.size())
+    if count < 1:
+        return
+
+    connected = 0
+    opened = anyio.Event()
+
+    async def open_connection():
+        nonlocal connected
+        async with engine.connect():
+            connected += 1
+            if connected == count:
+                opened.set()
+            # Connections are held till all of them are opened, so that pool does not reuse them
+            await opened.wait()
+
+    async with anyio.create_task_group() as task_group:
+        for _ in range(count):
+            task_group.start_soon(open_connection)
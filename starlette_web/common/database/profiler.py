@@ -0,0 +1,140 @@
+import heapq
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from starlette_web.common.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+_current_profile: ContextVar[Optional["QueryProfile"]] = ContextVar(
+    "current_query_profile", default=None
+)
+
+
+class QueryProfile:
+    """
+    Statistics of SQL statements, executed within profile_queries() block
+    (i.e. by a single request or websocket task).
+
+    Statements are recorded as sent to DBAPI, i.e. with placeholders instead of values,
+    so that repeated statements of the same shape (possible N+1 queries) are counted together.
+    """
+
+    def __init__(self, name: str = "", max_slowest: int = 5):
+        self.name = name
+        self.max_slowest = max_slowest
+        self.count = 0
+        self.total_time = 0.0
+        self.statements: Counter = Counter()
+        self._slowest: List[Tuple[float, int, str]] = []
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.statements[statement] += 1
+
+        # Min-heap of max_slowest statements, count is a tie-breaker
+        item = (duration, self.count, statement)
+        if len(self._slowest) < self.max_slowest:
+            heapq.heappush(self._slowest, item)
+        else:
+            heapq.heappushpop(self._slowest, item)
+
+    @property
+    def slowest(self) -> List[Tuple[str, float]]:
+        return [
+            (statement, duration)
+            for duration, _, statement in sorted(self._slowest, reverse=True)
+        ]
+
+    def get_repeated_statements(self, threshold: int) -> Dict[str, int]:
+        return {
+            statement: count
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        }
+
+    def get_server_timing(self) -> str:
+        # https://www.w3.org/TR/server-timing/
+        return f'db;dur={self.total_time * 1000:.2f};desc="{self.count} queries"'
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "count": self.count,
+            "total_time": self.total_time,
+            "slowest": self.slowest,
+            "repeated": self.get_repeated_statements(settings.DB_PROFILER_REPEATED_STATEMENTS),
+        }
+
+
+def get_current_query_profile() -> Optional[QueryProfile]:
+    return _current_profile.get()
+
+
+@contextmanager
+def profile_queries(name: str = "") -> Iterator[QueryProfile]:
+    """
+    Records statements, executed within block (in current context),
+    and logs possible N+1 queries on exit.
+    Engines must be created with settings.DB_PROFILE_QUERIES = True.
+    """
+    profile = QueryProfile(name)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        _log_repeated_statements(profile)
+
+
+def install_query_profiler(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, duration)
+
+    threshold = settings.DB_SLOW_QUERY_THRESHOLD
+    if threshold is not None and duration >= threshold:
+        logger.warning("Slow query (%.3f s): %s", duration, statement)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute is not called for failed statements
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start_time"):
+        connection.info["query_start_time"].pop()
+
+
+def _log_repeated_statements(profile: QueryProfile) -> None:
+    repeated = profile.get_repeated_statements(settings.DB_PROFILER_REPEATED_STATEMENTS)
+    for statement, count in repeated.items():
+        logger.warning(
+            "Statement has been executed %d times in %s (possible N+1 queries): %s",
+            count,
+            profile.name or "profiled block",
+            statement,
+        )
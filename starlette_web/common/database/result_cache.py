@@ -0,0 +1,131 @@
+import functools
+import hashlib
+import logging
+from typing import Any, Dict, Optional, Tuple, Type
+
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.loading import merge_frozen_result
+from sqlalchemy.sql import Select
+from sqlalchemy.util import LRUCache
+
+from starlette_web.common.caches import caches
+from starlette_web.common.caches.base import BaseCache, CacheError
+from starlette_web.common.database.session import on_commit
+
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_KEY_PREFIX = "model_cache:"
+
+# Key of session.info with models, written within session. Their results are not cached
+# for the rest of session, so that uncommitted data is never stored
+RESULT_CACHE_BYPASS_INFO = "result_cache_bypass"
+
+# Errors of cache backends, on which results are read from database
+CACHE_ERRORS = (CacheError, OSError)
+
+# SQL strings of statements by their structure (without values of parameters)
+_statement_strings = LRUCache(1024)
+
+
+def get_result_cache(model: Type) -> Optional[BaseCache]:
+    if getattr(model.Meta, "cache_ttl", None) is None:
+        return None
+    return caches[getattr(model.Meta, "cache_alias", "default")]
+
+
+async def execute_cached(
+    model: Type,
+    db_session: AsyncSession,
+    query: Select,
+    params: Dict[str, Any],
+) -> Result:
+    """
+    Executes query of model, or returns its result from cache (Meta.cache_ttl, Meta.cache_alias).
+    Results are keyed by SQL of statement with values of parameters and stored
+    with version of model, so that writes of model invalidate them.
+    Cached instances are merged into session without loading.
+    """
+    cache = get_result_cache(model)
+    if cache is None or not _is_cacheable_session(model, db_session):
+        return await db_session.execute(query, params)
+
+    cache_key = query._generate_cache_key()
+    if cache_key is None:
+        return await db_session.execute(query, params)
+
+    statement = cache_key.to_offline_string(_statement_strings, query, params)
+    key = (
+        f"{RESULT_CACHE_KEY_PREFIX}{model.__tablename__}:"
+        f"{hashlib.sha1(statement.encode()).hexdigest()}"
+    )
+
+    try:
+        entry, version = await _get_entry(cache, model, key)
+    except CACHE_ERRORS as exc:
+        # Unavailable cache must not break reads
+        logger.warning("Result cache of %s is not available: %r", model.__name__, exc)
+        return await db_session.execute(query, params)
+
+    if entry is not None and entry["version"] == version:
+        frozen_result = entry["result"]
+    else:
+        frozen_result = (await db_session.execute(query, params)).freeze()
+        try:
+            await cache.async_set(
+                key,
+                {"version": version, "result": frozen_result},
+                timeout=model.Meta.cache_ttl,
+            )
+        except CACHE_ERRORS as exc:
+            logger.warning("Result cache of %s is not available: %r", model.__name__, exc)
+
+    return merge_frozen_result(db_session.sync_session, query, frozen_result, load=False)()
+
+
+async def invalidate_result_cache(model: Type, db_session: Optional[AsyncSession] = None) -> None:
+    """
+    Bumps version of model, so that all its cached results become stale.
+    If db_session is passed, version is bumped after its transaction is committed
+    (so that concurrent sessions can't cache results, which precede the change),
+    and session reads model from database till it is closed.
+    """
+    cache = get_result_cache(model)
+    if cache is None:
+        return
+
+    if db_session is None:
+        await _bump_version(cache, model)
+        return
+
+    db_session.info.setdefault(RESULT_CACHE_BYPASS_INFO, set()).add(model)
+    await on_commit(
+        db_session,
+        functools.partial(_bump_version, cache, model),
+        key=(RESULT_CACHE_KEY_PREFIX, model),
+    )
+
+
+async def _get_entry(cache: BaseCache, model: Type, key: str) -> Tuple[Optional[dict], int]:
+    version_key = _get_version_key(model)
+    values = await cache.async_get_many([key, version_key])
+    entry, version = values[key], values[version_key]
+    if version is None:
+        version = await cache.async_get_version(version_key)
+    return entry, version
+
+
+async def _bump_version(cache: BaseCache, model: Type) -> None:
+    await cache.async_bump_version(_get_version_key(model))
+
+
+def _get_version_key(model: Type) -> str:
+    return f"{RESULT_CACHE_KEY_PREFIX}{model.__tablename__}:version"
+
+
+def _is_cacheable_session(model: Type, db_session: AsyncSession) -> bool:
+    # Merging cached instances would overwrite pending changes of session
+    if model in db_session.info.get(RESULT_CACHE_BYPASS_INFO, ()):
+        return False
+    return not (db_session.new or db_session.dirty or db_session.deleted)
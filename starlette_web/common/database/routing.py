@@ -0,0 +1,145 @@
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import Delete, Insert, Select, Update
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+from starlette_web.common.http.exceptions import ImproperlyConfigured
+
+
+DEFAULT_DB_ALIAS = "default"
+
+# Name of execution option (or key of session.info) to force database alias
+DB_ALIAS_OPTION = "db_alias"
+
+# Deadline (by time.monotonic) of sticky reads from primary database
+# of the current request or task (contexts of other requests are not affected)
+_sticky_until: ContextVar[float] = ContextVar("db_sticky_until", default=-float("inf"))
+
+
+class DatabaseRouter:
+    """
+    Holds engines of named databases and chooses one of read replicas
+    of "default" database for read-only statements.
+
+    Policies are "round_robin" and "least_connections" (by connections, checked out from pool).
+    Within sticky_seconds after a write has been committed in the current request
+    (or task, or any context, which inherits from it), all its reads are sent to primary
+    database, so that they do not miss data due to replication lag.
+    """
+
+    policies = ("round_robin", "least_connections")
+
+    def __init__(
+        self,
+        engines: Dict[str, AsyncEngine],
+        replicas: List[str],
+        policy: str = "round_robin",
+        sticky_seconds: float = 0,
+    ):
+        if DEFAULT_DB_ALIAS not in engines:
+            raise ImproperlyConfigured(details=f"Database {DEFAULT_DB_ALIAS!r} is not configured")
+
+        if policy not in self.policies:
+            raise ImproperlyConfigured(details=f"Unknown replica routing policy {policy!r}")
+
+        self.engines = engines
+        self.replicas = replicas
+        self.policy = policy
+        self.sticky_seconds = sticky_seconds
+        self._replicas_cycle = itertools.cycle(replicas)
+
+    def get_engine(self, alias: str) -> AsyncEngine:
+        try:
+            return self.engines[alias]
+        except KeyError as exc:
+            raise ImproperlyConfigured(details=f"Database {alias!r} is not configured") from exc
+
+    def get_read_alias(self) -> str:
+        if not self.replicas or self.is_sticky():
+            return DEFAULT_DB_ALIAS
+
+        if self.policy == "least_connections":
+            return min(self.replicas, key=self._get_checked_out_connections)
+
+        return next(self._replicas_cycle)
+
+    def mark_write(self) -> None:
+        _sticky_until.set(max(_sticky_until.get(), time.monotonic() + self.sticky_seconds))
+
+    def is_sticky(self) -> bool:
+        return time.monotonic() < _sticky_until.get()
+
+    def _get_checked_out_connections(self, alias: str) -> int:
+        # NullPool does not track connections
+        pool = self.engines[alias].pool
+        return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+
+class RoutingSession(Session):
+    """
+    Synchronous session, proxied by AsyncSession (via sync_session_class),
+    which sends read-only statements to replicas and all other work to "default" database.
+
+    Replica is chosen once per session (on its first read), so that reads of a session
+    see the same replication state and hold a single replica connection.
+    Once session has written anything, it sticks to "default" database till it is closed
+    or rolled back.
+    Database may be forced for session with session.info["db_alias"]
+    or for a single statement with .execution_options(db_alias=...).
+    """
+
+    def __init__(self, *args, router: DatabaseRouter, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.router = router
+        self._has_writes = False
+        self._read_alias: Optional[str] = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs) -> Engine:
+        return self.router.get_engine(self._get_alias(clause)).sync_engine
+
+    def commit(self) -> None:
+        super().commit()
+        if self._has_writes:
+            self.router.mark_write()
+
+    def rollback(self) -> None:
+        super().rollback()
+        # Rolled back writes do not need primary database (and sticky reads) anymore
+        self._has_writes = False
+
+    def close(self) -> None:
+        super().close()
+        self._has_writes = False
+        self._read_alias = None
+
+    def _get_alias(self, clause) -> str:
+        alias = self._get_forced_alias(clause)
+        if alias is not None:
+            return alias
+
+        if self._has_writes or self._flushing or not self._is_read_only(clause):
+            self._has_writes = True
+            return DEFAULT_DB_ALIAS
+
+        if self._read_alias is None:
+            self._read_alias = self.router.get_read_alias()
+        return self._read_alias
+
+    def _get_forced_alias(self, clause) -> Optional[str]:
+        if hasattr(clause, "get_execution_options"):
+            alias = clause.get_execution_options().get(DB_ALIAS_OPTION)
+            if alias is not None:
+                return alias
+        return self.info.get(DB_ALIAS_OPTION)
+
+    @staticmethod
+    def _is_read_only(clause) -> bool:
+        # Raw SQL (text) may write anything, so it is sent to primary database
+        if isinstance(clause, (Insert, Update, Delete)):
+            return False
+        return isinstance(clause, Select) and clause._for_update_arg is None
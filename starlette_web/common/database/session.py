@@ -0,0 +1,57 @@
+import logging
+from typing import Awaitable, Callable, Hashable, Optional
+
+from sqlalchemy.ext import asyncio as sa_asyncio
+
+
+logger = logging.getLogger(__name__)
+
+# Key of session.info with callbacks, waiting for commit of current transaction
+ON_COMMIT_INFO = "on_commit_callbacks"
+
+OnCommitCallback = Callable[[], Awaitable[None]]
+
+
+class AsyncSession(sa_asyncio.AsyncSession):
+    """
+    AsyncSession, which runs callbacks, registered with on_commit(), once transaction
+    is committed with commit(), and discards them on rollback() / close().
+    Allows to invalidate caches only after changes become visible to other sessions.
+    """
+
+    def on_commit(self, callback: OnCommitCallback, key: Optional[Hashable] = None) -> None:
+        """
+        :param key: callbacks with the same key are run once per transaction
+        """
+        callbacks = self.info.setdefault(ON_COMMIT_INFO, {})
+        callbacks.setdefault(key if key is not None else object(), callback)
+
+    async def commit(self) -> None:
+        await super().commit()
+
+        for callback in self.info.pop(ON_COMMIT_INFO, {}).values():
+            # Transaction is already committed, so failed callback must not fail the caller
+            try:
+                await callback()
+            except Exception as exc:  # noqa
+                logger.exception("On-commit callback %r has failed: %r", callback, exc)
+
+    async def rollback(self) -> None:
+        self.info.pop(ON_COMMIT_INFO, None)
+        await super().rollback()
+
+    async def close(self) -> None:
+        self.info.pop(ON_COMMIT_INFO, None)
+        await super().close()
+
+
+async def on_commit(
+    db_session: sa_asyncio.AsyncSession,
+    callback: OnCommitCallback,
+    key: Optional[Hashable] = None,
+) -> None:
+    # Sessions of other classes (see settings.DB_ASYNC_SESSION_CLASS) run callback at once
+    if hasattr(db_session, "on_commit"):
+        db_session.on_commit(callback, key=key)
+    else:
+        await callback()
@@ -1,49 +1,188 @@
-from typing import Type
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple, Type
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
 
 from starlette_web.common.conf import settings
+from starlette_web.common.database.pool import (
+    AdaptiveOverflowPolicy,
+    ObservedAsyncQueuePool,
+    PoolObserver,
+    prewarm_pool,
+)
+from starlette_web.common.database.profiler import install_query_profiler
+from starlette_web.common.database.routing import DatabaseRouter, RoutingSession, DEFAULT_DB_ALIAS
 from starlette_web.common.utils import import_string
 
+DEFAULT_CONNECT_ARGS = {"timeout": 20}
+
 
 def get_async_session_class() -> Type[AsyncSession]:
     return import_string(settings.DB_ASYNC_SESSION_CLASS)
 
 
-def make_session_maker(**kwargs) -> sessionmaker:
+def make_engine(dsn: str, alias: str = DEFAULT_DB_ALIAS, **kwargs) -> AsyncEngine:
     use_pool = kwargs.get("use_pool", True)
-    connect_args = kwargs.get("connect_args", {"timeout": 20})
+    connect_args = kwargs.get("connect_args", DEFAULT_CONNECT_ARGS)
 
     if use_pool:
         pool_size = settings.DATABASE["pool_min_size"]
         max_overflow = max(0, settings.DATABASE["pool_max_size"] - pool_size)
 
-        # If poolclass is None, uses one implemented by engine's method .get_pool_class()
-        # Namely, for asyncpg, sqlalchemy.pool.impl.AsyncAdaptedQueuePool
+        # AsyncAdaptedQueuePool (default for asyncpg), which collects metrics of checkouts
         create_async_engine_kw = dict(
-            poolclass=None,
+            poolclass=ObservedAsyncQueuePool,
             pool_size=pool_size,
             max_overflow=max_overflow,
             pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
         )
     else:
         create_async_engine_kw = dict(
             poolclass=NullPool,
         )
 
-    db_engine = create_async_engine(
-        settings.DATABASE_DSN,
+    engine = create_async_engine(
+        dsn,
         echo=settings.DB_ECHO,
         connect_args=connect_args,
         **create_async_engine_kw,
     )
 
+    if use_pool:
+        engine.pool.observer = PoolObserver(
+            alias,
+            policy=AdaptiveOverflowPolicy.from_options(settings.DB_POOL_ADAPTIVE_OVERFLOW),
+        )
+
+    if settings.DB_PROFILE_QUERIES or settings.DB_SLOW_QUERY_THRESHOLD is not None:
+        install_query_profiler(engine)
+
+    return engine
+
+
+def make_router(**kwargs) -> DatabaseRouter:
+    engines = {DEFAULT_DB_ALIAS: make_engine(settings.DATABASE_DSN, **kwargs)}
+    replicas = []
+
+    for alias, options in settings.DATABASES.items():
+        engines[alias] = make_engine(options["DSN"], alias=alias, **kwargs)
+        if options.get("REPLICA", False):
+            replicas.append(alias)
+
+    return DatabaseRouter(
+        engines,
+        replicas,
+        policy=settings.DB_REPLICA_POLICY,
+        sticky_seconds=settings.DB_REPLICA_STICKY_SECONDS,
+    )
+
+
+def get_engines(session_maker: sessionmaker) -> List[AsyncEngine]:
+    router = session_maker.kw.get("router")
+    if router is not None:
+        return list(router.engines.values())
+    return [session_maker.kw["bind"]]
+
+
+def make_session_maker(**kwargs) -> sessionmaker:
+    session_kwargs = {}
+
+    if settings.DATABASES:
+        # Statements are routed between databases by synchronous session, proxied by AsyncSession
+        router = make_router(**kwargs)
+        db_engine = router.get_engine(DEFAULT_DB_ALIAS)
+        session_kwargs = dict(sync_session_class=RoutingSession, router=router)
+    else:
+        db_engine = make_engine(settings.DATABASE_DSN, **kwargs)
+
     return sessionmaker(
         db_engine,
         expire_on_commit=False,
         class_=get_async_session_class(),
         autoflush=True,
         autocommit=False,
+        **session_kwargs,
     )
+
+
+class SessionMakerRegistry:
+    """
+    Process-wide session makers (and their engines), shared by app, middlewares and backends,
+    keyed by database configuration and options of make_session_maker.
+    Options, which are not passed to get(), are taken from configure()
+    (called by WebApp with its use_pool), so that all components of app share its engine.
+
+    Pooled engines are also keyed by running event loop, since asyncpg connections
+    may not be used outside of loop, which opened them. Engines of closed loops are forgotten.
+    """
+
+    def __init__(self):
+        self._session_makers: Dict[Tuple, sessionmaker] = {}
+        self.default_options: Dict[str, Any] = {}
+
+    def configure(self, **options) -> None:
+        self.default_options = options
+
+    def get(self, **kwargs) -> sessionmaker:
+        options = self._get_options(**kwargs)
+        key = self._get_key(options)
+        session_maker = self._session_makers.get(key)
+        if session_maker is None:
+            self._forget_closed_loops()
+            session_maker = self._session_makers[key] = make_session_maker(**options)
+        return session_maker
+
+    async def async_connect(self, **kwargs) -> None:
+        for engine in get_engines(self.get(**kwargs)):
+            await prewarm_pool(engine, settings.DB_POOL_PREWARM)
+
+    async def async_disconnect(self) -> None:
+        """Closes connections of engines, bound to current event loop, and forgets them"""
+        loop = self._get_running_loop()
+        for key, session_maker in list(self._session_makers.items()):
+            if key[-1] is not loop:
+                continue
+
+            del self._session_makers[key]
+            for engine in get_engines(session_maker):
+                await engine.dispose()
+
+    def _get_options(self, **kwargs) -> Dict[str, Any]:
+        return {
+            "use_pool": True,
+            "connect_args": DEFAULT_CONNECT_ARGS,
+            **self.default_options,
+            **kwargs,
+        }
+
+    @classmethod
+    def _get_key(cls, options: Dict[str, Any]) -> Tuple:
+        return (
+            settings.DATABASE_DSN,
+            repr(settings.DATABASES),
+            repr(sorted(options.items())),
+            cls._get_running_loop() if options["use_pool"] else None,
+        )
+
+    def _forget_closed_loops(self) -> None:
+        # Connections of closed loop may not be closed gracefully, so they are just dropped
+        for key in list(self._session_makers):
+            if key[-1] is not None and key[-1].is_closed():
+                del self._session_makers[key]
+
+    @staticmethod
+    def _get_running_loop() -> Optional[asyncio.AbstractEventLoop]:
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+
+session_makers = SessionMakerRegistry()
+
+
+def get_session_maker(**kwargs) -> sessionmaker:
+    return session_makers.get(**kwargs)
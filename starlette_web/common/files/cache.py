@@ -6,7 +6,17 @@ import pickle
 import re
 import tempfile
 import time
-from typing import AsyncContextManager, Optional, Sequence, Dict, Any, List, BinaryIO, Type
+from typing import (
+    AsyncContextManager,
+    Optional,
+    Sequence,
+    Dict,
+    Any,
+    List,
+    BinaryIO,
+    Type,
+    Tuple,
+)
 
 from anyio.lowlevel import checkpoint
 
@@ -38,32 +48,41 @@ class FileCache(BaseCache):
                 details="Invalid CACHE_DIR value for FileCache"
             )
 
-        self.serializer = self.serializer_class()
         if not self.serializer.serializes_to_bytes():
             raise ImproperlyConfigured(
                 details="serializer_class must be instance of BytesSerializer"
             )
 
-    async def async_get(self, key: str) -> Any:
+    async def async_get(self, key: str, version: Optional[int] = None) -> Any:
         async with self._get_manager_lock():
-            return self._sync_get(key)
+            return self._sync_get(self.make_key(key, version=version))
 
-    async def async_get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+    async def async_get_many(
+        self,
+        keys: Sequence[str],
+        version: Optional[int] = None,
+    ) -> Dict[str, Any]:
         async with self._get_manager_lock():
             results = {}
             for key in keys:
                 await checkpoint()
-                results[key] = self._sync_get(key)
+                results[key] = self._sync_get(self.make_key(key, version=version))
             return results
 
     def _sync_get(self, key: str) -> Any:
+        entry = self._sync_get_entry(key)
+        return entry[1] if entry is not None else None
+
+    def _sync_get_entry(self, key: str) -> Optional[Tuple[float, Any]]:
+        # Returns deadline and value of key, if it has not expired
         path = Path(self.base_dir) / self._key_name(key)
         if path.is_file():
             with open(path, "rb") as file:
-                if self._sync_get_deadline(file) < time.time():
+                deadline = self._sync_get_deadline(file)
+                if deadline < time.time():
                     return None
                 content = self.serializer.deserialize(file.read())
-                return content["data"]
+                return deadline, content["data"]
         return None
 
     def _sync_get_deadline(self, _file: BinaryIO) -> float:
@@ -80,15 +99,26 @@ class FileCache(BaseCache):
             _file.seek(0)
             return math.inf
 
-    async def async_set(self, key: str, value: Any, timeout: Optional[float] = 120) -> None:
+    async def async_set(
+        self,
+        key: str,
+        value: Any,
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> None:
         async with self._get_manager_lock():
-            self._sync_set(key, value, timeout)
+            self._sync_set(self.make_key(key, version=version), value, timeout)
 
-    async def async_set_many(self, data: Dict[str, Any], timeout: Optional[float] = 120) -> None:
+    async def async_set_many(
+        self,
+        data: Dict[str, Any],
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> None:
         async with self._get_manager_lock():
             for key, value in data.items():
                 await checkpoint()
-                self._sync_set(key, value, timeout)
+                self._sync_set(self.make_key(key, version=version), value, timeout)
 
     def _sync_set(self, key: str, value: Any, timeout: Optional[float] = 120) -> None:
         path = Path(self.base_dir) / self._key_name(key)
@@ -100,14 +130,62 @@ class FileCache(BaseCache):
                 file.write(self.timestamp_bom + pickle.dumps(deadline, protocol=4))
             file.write(self.serializer.serialize(content))
 
-    async def async_delete(self, key: str) -> None:
+    async def async_incr(
+        self,
+        key: str,
+        delta: int = 1,
+        timeout: Optional[float] = None,
+        version: Optional[int] = None,
+    ) -> int:
+        key = self.make_key(key, version=version)
         async with self._get_manager_lock():
-            self._sync_delete(key)
+            entry = self._sync_get_entry(key)
+            if entry is None:
+                self._sync_set(key, delta, timeout)
+                return delta
+
+            deadline, value = entry
+            if type(value) is not int:
+                raise CacheError(details=f"Value of key '{key}' is not an integer.")
+
+            value += delta
+            self._sync_set(key, value, self._get_remaining_timeout(deadline))
+            return value
 
-    async def async_delete_many(self, keys: Sequence[str]) -> None:
+    async def async_touch(
+        self,
+        key: str,
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> bool:
+        key = self.make_key(key, version=version)
+        async with self._get_manager_lock():
+            entry = self._sync_get_entry(key)
+            if entry is None:
+                return False
+
+            self._sync_set(key, entry[1], timeout)
+            return True
+
+    async def async_ttl(self, key: str, version: Optional[int] = None) -> Optional[float]:
+        async with self._get_manager_lock():
+            entry = self._sync_get_entry(self.make_key(key, version=version))
+            if entry is None:
+                return 0
+            return self._get_remaining_timeout(entry[0])
+
+    @staticmethod
+    def _get_remaining_timeout(deadline: float) -> Optional[float]:
+        return None if deadline == math.inf else max(deadline - time.time(), 0)
+
+    async def async_delete(self, key: str, version: Optional[int] = None) -> None:
+        async with self._get_manager_lock():
+            self._sync_delete(self.make_key(key, version=version))
+
+    async def async_delete_many(self, keys: Sequence[str], version: Optional[int] = None) -> None:
         async with self._get_manager_lock():
             for key in keys:
-                self._sync_delete(key)
+                self._sync_delete(self.make_key(key, version=version))
 
     def _sync_delete(self, key) -> None:
         path = Path(self.base_dir) / self._key_name(key)
@@ -115,6 +193,14 @@ class FileCache(BaseCache):
             path.unlink()
 
     async def async_clear(self) -> None:
+        if self.key_prefix:
+            # Directory may be shared with caches with other prefixes
+            raw_pattern = self._get_clear_pattern()
+            async with self._get_manager_lock():
+                for key in await self._get_raw_keys(raw_pattern, check_expiration=False):
+                    self._sync_delete(key)
+            return
+
         async with self._get_manager_lock():
             _manager_lock_name = self._get_manager_lock_name()
             for file in Path(self.base_dir).iterdir():
@@ -122,29 +208,39 @@ class FileCache(BaseCache):
                     continue
                 file.unlink()
 
-    async def async_keys(self, pattern: str) -> List[str]:
+    async def async_keys(self, pattern: str, version: Optional[int] = None) -> List[str]:
+        async with self._get_manager_lock():
+            return [
+                self._reverse_key(key, version=version)
+                for key in await self._get_raw_keys(self.make_key(pattern, version=version))
+            ]
+
+    async def _get_raw_keys(self, raw_pattern: str, check_expiration: bool = True) -> List[str]:
         try:
-            re_pattern = redis_pattern_to_re_pattern(pattern)
+            re_pattern = redis_pattern_to_re_pattern(raw_pattern)
         except re.error as exc:
             raise CacheError(details=str(exc)) from exc
 
         keys = []
-        async with self._get_manager_lock():
-            _manager_lock_name = self._get_manager_lock_name()
-            for file in Path(self.base_dir).iterdir():
-                await checkpoint()
-                if str(file) == _manager_lock_name:
-                    continue
-                key = base64.b32decode(file.name.replace("8", "=").encode()).decode()
-                # Check for expiration
+        _manager_lock_name = self._get_manager_lock_name()
+        for file in Path(self.base_dir).iterdir():
+            await checkpoint()
+            if str(file) == _manager_lock_name:
+                continue
+            key = base64.b32decode(file.name.replace("8", "=").encode()).decode()
+            if not re.fullmatch(re_pattern, key):
+                continue
+
+            if check_expiration:
                 with open(str(file), "rb") as file:
-                    deadline = self._sync_get_deadline(file)
-                if deadline >= time.time() and re.fullmatch(re_pattern, key):
-                    keys.append(key)
-            return keys
+                    if self._sync_get_deadline(file) < time.time():
+                        continue
+
+            keys.append(key)
+        return keys
 
-    async def async_has_key(self, key: str) -> bool:
-        return (await self.async_get(key)) is not None
+    async def async_has_key(self, key: str, version: Optional[int] = None) -> bool:
+        return (await self.async_get(key, version=version)) is not None
 
     def _get_manager_lock(self):
         return self.lock_class(
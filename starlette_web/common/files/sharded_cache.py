@@ -0,0 +1,447 @@
+import hashlib
+import math
+import os
+import re
+import shutil
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import AsyncContextManager, Optional, Sequence, Dict, Any, List, Tuple, Type
+
+import anyio
+
+from starlette_web.common.caches.base import BaseCache, CacheError
+from starlette_web.common.files.filelock import FileLock
+from starlette_web.common.http.exceptions import ImproperlyConfigured
+from starlette_web.common.utils.regex import redis_pattern_to_re_pattern
+from starlette_web.common.utils.serializers import BytesSerializer, PickleSerializer
+
+
+class ShardedFileCache(BaseCache):
+    """
+    File cache for large value sets, i.e. on a volume, shared by several processes.
+
+    Values are stored in files under hashed subdirectories (shards).
+    Files are written to a temporary file and atomically renamed, so that readers
+    never need a lock and never see partially written values.
+    Rename and update of index (as well as deletion) are done together under lock of shard,
+    so that concurrent writes and deletes never leave index and file with different deadlines.
+    Writes are not fsync-ed, since loss of recent entries on power failure is fine for a cache.
+
+    Expiration deadlines of keys are also kept in sqlite index (index.sqlite3 in CACHE_DIR),
+    so that async_keys and sweeps of expired entries do not open every file.
+    Note, that sqlite index requires a filesystem with working file locks (not NFS).
+
+    Supported options:
+    - CACHE_DIR - existing directory for cache files (required)
+    - SHARD_DEPTH - number of nested shard directories, 256 per level (2 by default)
+    - SWEEP_INTERVAL - min interval in seconds between sweeps of expired entries (60 by default)
+    - SWEEP_BATCH_SIZE - max number of expired entries, removed by a single sweep (1000 by default)
+    """
+
+    lock_class = FileLock
+    serializer_class: Type[BytesSerializer] = PickleSerializer
+    index_name = "index.sqlite3"
+    index_timeout = 10.0
+    default_shard_depth = 2
+    default_sweep_interval = 60.0
+    default_sweep_batch_size = 1000
+    _header = struct.Struct("!d")
+    _lock_blocking_timeout = 10.0
+    _lock_timeout = 1.0
+    _shard_dir_re = re.compile(r"[0-9a-f]{2}")
+
+    def __init__(self, options: Dict[str, Any]):
+        super().__init__(options)
+        self.base_dir = options.get("CACHE_DIR")
+        if self.base_dir is None or not Path(self.base_dir).is_dir():
+            raise ImproperlyConfigured(details="Invalid CACHE_DIR value for ShardedFileCache")
+        self.base_dir = Path(self.base_dir)
+
+        if not self.serializer.serializes_to_bytes():
+            raise ImproperlyConfigured(
+                details="serializer_class must be instance of BytesSerializer"
+            )
+
+        self.shard_depth: int = options.get("SHARD_DEPTH", self.default_shard_depth)
+        self.sweep_interval: float = options.get("SWEEP_INTERVAL", self.default_sweep_interval)
+        self.sweep_batch_size: int = options.get(
+            "SWEEP_BATCH_SIZE", self.default_sweep_batch_size
+        )
+
+        self._local = threading.local()
+        self._last_sweep = time.time()
+        self._sync_init_index()
+
+    async def async_get(self, key: str, version: Optional[int] = None) -> Any:
+        data = await anyio.to_thread.run_sync(
+            self._sync_read_data, self.make_key(key, version=version)
+        )
+        return self.serializer.deserialize(data)
+
+    async def async_get_many(
+        self,
+        keys: Sequence[str],
+        version: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        def _read_many():
+            return [self._sync_read_data(self.make_key(key, version=version)) for key in keys]
+
+        result = dict()
+        for key, data in zip(keys, await anyio.to_thread.run_sync(_read_many)):
+            result[key] = self.serializer.deserialize(data)
+        return result
+
+    async def async_set(
+        self,
+        key: str,
+        value: Any,
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> None:
+        await self.async_set_many({key: value}, timeout=timeout, version=version)
+
+    async def async_set_many(
+        self,
+        data: Dict[str, Any],
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> None:
+        if not data:
+            return
+
+        deadline = self._get_deadline(timeout)
+        entries = [
+            (self.make_key(key, version=version), self.serializer.serialize(value))
+            for key, value in data.items()
+        ]
+        await self._write_many(entries, deadline)
+        await self._maybe_sweep()
+
+    async def async_delete(self, key: str, version: Optional[int] = None) -> None:
+        await self.async_delete_many([key], version=version)
+
+    async def async_delete_many(self, keys: Sequence[str], version: Optional[int] = None) -> None:
+        await self._delete_many([self.make_key(key, version=version) for key in keys])
+
+    async def async_has_key(self, key: str, version: Optional[int] = None) -> bool:
+        entry = await anyio.to_thread.run_sync(
+            self._sync_read_entry, self.make_key(key, version=version), False
+        )
+        return entry is not None
+
+    async def async_keys(self, pattern: str, version: Optional[int] = None) -> List[str]:
+        raw_keys = await anyio.to_thread.run_sync(
+            self._sync_get_raw_keys, self.make_key(pattern, version=version)
+        )
+        return [self._reverse_key(key, version=version) for key in raw_keys]
+
+    async def async_clear(self) -> None:
+        if self.key_prefix:
+            # Directory may be shared with caches with other prefixes
+            raw_keys = await anyio.to_thread.run_sync(
+                self._sync_get_raw_keys, self._get_clear_pattern(), False
+            )
+            await self._delete_many(raw_keys)
+        else:
+            await anyio.to_thread.run_sync(self._sync_clear)
+
+    async def async_incr(
+        self,
+        key: str,
+        delta: int = 1,
+        timeout: Optional[float] = None,
+        version: Optional[int] = None,
+    ) -> int:
+        raw_key = self.make_key(key, version=version)
+        async with self._get_shard_lock(raw_key):
+            entry = await anyio.to_thread.run_sync(self._sync_read_entry, raw_key)
+            if entry is None:
+                value, deadline = delta, self._get_deadline(timeout)
+            else:
+                deadline, value = entry[0], self.serializer.deserialize(entry[1])
+                if type(value) is not int:
+                    raise CacheError(details=f"Value of key '{key}' is not an integer.")
+                value += delta
+
+            await self._write_many(
+                [(raw_key, self.serializer.serialize(value))], deadline, is_locked=True
+            )
+            return value
+
+    async def async_touch(
+        self,
+        key: str,
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> bool:
+        raw_key = self.make_key(key, version=version)
+        async with self._get_shard_lock(raw_key):
+            entry = await anyio.to_thread.run_sync(self._sync_read_entry, raw_key)
+            if entry is None:
+                return False
+
+            await self._write_many(
+                [(raw_key, entry[1])], self._get_deadline(timeout), is_locked=True
+            )
+            return True
+
+    async def async_ttl(self, key: str, version: Optional[int] = None) -> Optional[float]:
+        entry = await anyio.to_thread.run_sync(
+            self._sync_read_entry, self.make_key(key, version=version), False
+        )
+        if entry is None:
+            return 0
+        if entry[0] == math.inf:
+            return None
+        return max(entry[0] - time.time(), 0)
+
+    async def async_sweep(self, max_count: Optional[int] = None) -> int:
+        """
+        Removes expired entries, found by index, and returns their number.
+        Called automatically on writes, at most once per SWEEP_INTERVAL.
+        """
+        now = self._last_sweep = time.time()
+        raw_keys = await anyio.to_thread.run_sync(
+            self._sync_get_expired_keys, now, max_count or self.sweep_batch_size
+        )
+        await self._delete_many(raw_keys, expired_before=now)
+        return len(raw_keys)
+
+    def lock(
+        self,
+        name: str,
+        timeout: Optional[float] = 20.0,
+        blocking_timeout: Optional[float] = None,
+        **kwargs,
+    ) -> AsyncContextManager:
+        return self.lock_class(
+            name=str(self.base_dir / f"{self._hash(self.make_key(name))}.lock"),
+            timeout=timeout,
+            blocking_timeout=blocking_timeout,
+        )
+
+    async def _write_many(
+        self,
+        entries: List[Tuple[str, bytes]],
+        deadline: float,
+        is_locked: bool = False,
+    ) -> None:
+        # Values are written to temporary files without lock,
+        # only their renames and index rows are written under lock of shard.
+        # is_locked - whether lock of shard is already held (single entry only)
+        pending = await anyio.to_thread.run_sync(self._sync_write_temp_files, entries, deadline)
+        try:
+            if is_locked:
+                await anyio.to_thread.run_sync(self._sync_commit_many, pending, deadline)
+                return
+
+            shards: Dict[Path, List[Tuple[str, str]]] = {}
+            for raw_key, tmp_path in pending:
+                shards.setdefault(self._get_path(raw_key).parent, []).append((raw_key, tmp_path))
+
+            for shard_pending in shards.values():
+                async with self._get_shard_lock(shard_pending[0][0]):
+                    await anyio.to_thread.run_sync(
+                        self._sync_commit_many, shard_pending, deadline
+                    )
+        except BaseException:
+            with anyio.CancelScope(shield=True):
+                await anyio.to_thread.run_sync(
+                    self._sync_discard, [tmp_path for _, tmp_path in pending]
+                )
+            raise
+
+    async def _delete_many(
+        self,
+        raw_keys: Sequence[str],
+        expired_before: Optional[float] = None,
+    ) -> None:
+        # Index rows are deleted and files are unlinked under lock of shard, as they are written.
+        # expired_before - delete only entries, which have expired before this time
+        shards: Dict[Path, List[str]] = {}
+        for raw_key in raw_keys:
+            shards.setdefault(self._get_path(raw_key).parent, []).append(raw_key)
+
+        for shard_keys in shards.values():
+            async with self._get_shard_lock(shard_keys[0]):
+                await anyio.to_thread.run_sync(self._sync_delete_many, shard_keys, expired_before)
+
+    async def _maybe_sweep(self) -> None:
+        if time.time() - self._last_sweep >= self.sweep_interval:
+            await self.async_sweep()
+
+    def _get_shard_lock(self, raw_key: str) -> AsyncContextManager:
+        # Guards writes and deletes, reads are lock-free
+        shard_dir = self._get_path(raw_key).parent
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        return self.lock_class(
+            name=str(shard_dir / "shard.lock"),
+            timeout=self._lock_timeout,
+            blocking_timeout=self._lock_blocking_timeout,
+        )
+
+    def _get_path(self, raw_key: str) -> Path:
+        key_hash = self._hash(raw_key)
+        shards = [key_hash[idx * 2: idx * 2 + 2] for idx in range(self.shard_depth)]
+        return self.base_dir.joinpath(*shards, key_hash)
+
+    @staticmethod
+    def _hash(raw_key: str) -> str:
+        # Unlike FileCache, there is no limit on key length
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _get_deadline(timeout: Optional[float]) -> float:
+        return time.time() + timeout if timeout is not None else math.inf
+
+    # Synchronous methods below are run in worker threads
+
+    def _get_connection(self) -> sqlite3.Connection:
+        # sqlite connections may not be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                str(self.base_dir / self.index_name),
+                timeout=self.index_timeout,
+            )
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _sync_init_index(self) -> None:
+        connection = self._get_connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, deadline REAL) WITHOUT ROWID"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_deadline ON entries (deadline)"
+            )
+
+    def _sync_read_entry(
+        self,
+        raw_key: str,
+        read_data: bool = True,
+    ) -> Optional[Tuple[float, Optional[bytes]]]:
+        # Returns deadline and serialized value of key, if it has not expired
+        try:
+            with open(self._get_path(raw_key), "rb") as file:
+                (deadline,) = self._header.unpack(file.read(self._header.size))
+                if deadline < time.time():
+                    return None
+                return deadline, file.read() if read_data else None
+        except FileNotFoundError:
+            return None
+        except struct.error as exc:
+            raise CacheError(details=f"Corrupted cache file for key '{raw_key}'.") from exc
+
+    def _sync_read_data(self, raw_key: str) -> Optional[bytes]:
+        entry = self._sync_read_entry(raw_key)
+        return entry[1] if entry is not None else None
+
+    def _sync_write_temp_files(
+        self,
+        entries: List[Tuple[str, bytes]],
+        deadline: float,
+    ) -> List[Tuple[str, str]]:
+        # Returns pairs of raw key and path of its temporary file
+        header = self._header.pack(deadline)
+        pending = []
+        try:
+            for raw_key, data in entries:
+                path = self._get_path(raw_key)
+                path.parent.mkdir(parents=True, exist_ok=True)
+
+                fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+                pending.append((raw_key, tmp_path))
+                with os.fdopen(fd, "wb") as file:
+                    file.write(header)
+                    file.write(data)
+        except BaseException:
+            self._sync_discard([tmp_path for _, tmp_path in pending])
+            raise
+
+        return pending
+
+    def _sync_commit_many(self, pending: List[Tuple[str, str]], deadline: float) -> None:
+        # Called under lock of shard
+        connection = self._get_connection()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO entries (key, deadline) VALUES (?, ?)",
+                [
+                    (raw_key, None if deadline == math.inf else deadline)
+                    for raw_key, _ in pending
+                ],
+            )
+            for raw_key, tmp_path in pending:
+                os.replace(tmp_path, self._get_path(raw_key))
+
+    @staticmethod
+    def _sync_discard(tmp_paths: Sequence[str]) -> None:
+        for tmp_path in tmp_paths:
+            Path(tmp_path).unlink(missing_ok=True)
+
+    def _sync_delete_many(
+        self,
+        raw_keys: Sequence[str],
+        expired_before: Optional[float] = None,
+    ) -> None:
+        # Called under lock of shard
+        connection = self._get_connection()
+        with connection:
+            if expired_before is None:
+                connection.executemany(
+                    "DELETE FROM entries WHERE key = ?",
+                    [(raw_key,) for raw_key in raw_keys],
+                )
+            else:
+                # Keys may have been re-written since they were found expired,
+                # so both index row and file are re-checked
+                connection.executemany(
+                    "DELETE FROM entries WHERE key = ? AND deadline < ?",
+                    [(raw_key, expired_before) for raw_key in raw_keys],
+                )
+
+        for raw_key in raw_keys:
+            if expired_before is None or self._sync_read_entry(raw_key, read_data=False) is None:
+                self._get_path(raw_key).unlink(missing_ok=True)
+
+    def _sync_get_raw_keys(self, raw_pattern: str, check_expiration: bool = True) -> List[str]:
+        try:
+            re_pattern = re.compile(redis_pattern_to_re_pattern(raw_pattern))
+        except re.error as exc:
+            raise CacheError(details=str(exc)) from exc
+
+        if check_expiration:
+            rows = self._get_connection().execute(
+                "SELECT key FROM entries WHERE deadline IS NULL OR deadline >= ?",
+                (time.time(),),
+            )
+        else:
+            rows = self._get_connection().execute("SELECT key FROM entries")
+
+        return [key for (key,) in rows if re_pattern.fullmatch(key)]
+
+    def _sync_get_expired_keys(self, expired_before: float, max_count: int) -> List[str]:
+        rows = self._get_connection().execute(
+            "SELECT key FROM entries WHERE deadline < ? LIMIT ?",
+            (expired_before, max_count),
+        )
+        return [key for (key,) in rows]
+
+    def _sync_clear(self) -> None:
+        connection = self._get_connection()
+        with connection:
+            connection.execute("DELETE FROM entries")
+
+        # CACHE_DIR may contain other files and directories, only shards are removed
+        for path in self.base_dir.iterdir():
+            if path.is_dir() and self._shard_dir_re.fullmatch(path.name):
+                shutil.rmtree(path, ignore_errors=True)
@@ -9,6 +9,7 @@ from starlette.background import BackgroundTasks
 from starlette.exceptions import HTTPException
 from starlette.endpoints import HTTPEndpoint
 from starlette.requests import Request
+from starlette.responses import Response
 from webargs_starlette import WebargsHTTPException, StarletteParser
 
 from starlette_web.common.app import WebApp
@@ -25,8 +26,12 @@ from starlette_web.common.http.exceptions import (
     PermissionDeniedError,
 )
 from starlette_web.common.http.renderers import BaseRenderer, JSONRenderer
+from starlette_web.common.http.response_cache import ResponseCache
 from starlette_web.common.http.statuses import ResponseStatus
-from starlette_web.common.database import DBModel
+from starlette_web.common.conf import settings
+from starlette_web.common.database import DBModel, LazySession
+from starlette_web.common.database.profiler import profile_queries
+from starlette_web.common.database.routing import DB_ALIAS_OPTION
 
 
 logger = logging.getLogger(__name__)
@@ -47,6 +52,10 @@ class BaseHTTPEndpoint(HTTPEndpoint):
     permission_classes: ClassVar[List[PermissionType]] = []
     request_parser: ClassVar[Type[StarletteParser]] = StarletteParser
     response_renderer: ClassVar[Type[BaseRenderer]] = JSONRenderer
+    response_cache: ClassVar[Optional[ResponseCache]] = None
+    # Forces database alias (settings.DATABASES) for all statements of endpoint,
+    # i.e. "default" to never read from replicas
+    db_alias: ClassVar[Optional[str]] = None
 
     async def dispatch(self) -> None:
         """
@@ -57,16 +66,31 @@ class BaseHTTPEndpoint(HTTPEndpoint):
         self.request = Request(self.scope, receive=self.receive)
         self.app: WebApp = self.scope.get("app")
 
+        self.request.state.query_profile = None
+        if not settings.DB_PROFILE_QUERIES:
+            response = await self._get_response()
+        else:
+            with profile_queries(f"{self.request.method} {self.request.url.path}") as profile:
+                self.request.state.query_profile = profile
+                response = await self._get_response()
+                if settings.DB_PROFILER_SERVER_TIMING:
+                    response.headers.append("Server-Timing", profile.get_server_timing())
+
+        await response(self.scope, self.receive, self.send)
+
+    async def _get_response(self) -> Response:
         handler_name = "get" if self.request.method == "HEAD" else self.request.method.lower()
         handler = getattr(self, handler_name, self.method_not_allowed)
 
-        try:
-            session_maker = self.app.session_maker()
-            session = await session_maker.__aenter__()
-        except Exception as err:
-            msg_template = "Unexpected error handled: %r"
-            logger.exception(msg_template, err)
-            raise UnexpectedError(msg_template % (err,))
+        # Responses of public endpoints are served before opening DB session,
+        # others - only after authentication and permission checks
+        if self._use_response_cache() and not self._response_cache_requires_user():
+            response = await self.response_cache.fetch(self.request)
+            if response is not None:
+                return response
+
+        # Session (and pool connection) is only acquired, once handler uses it
+        session = LazySession(self.app.session_maker, **self._get_session_kwargs())
 
         try:
             self.request.state.db_session = session
@@ -75,8 +99,16 @@ class BaseHTTPEndpoint(HTTPEndpoint):
             await self._authenticate()
             await self._check_permissions()
 
-            response = await handler(self.request)  # noqa
-            await session.commit()
+            response = None
+            if self._use_response_cache() and self._response_cache_requires_user():
+                response = await self.response_cache.fetch(self.request)
+
+            if response is None:
+                response = await handler(self.request)  # noqa
+                await session.commit()
+
+                if self._use_response_cache():
+                    response = await self.response_cache.store(self.request, response)
 
         except (BaseApplicationError, WebargsHTTPException, HTTPException) as err:
             await session.rollback()
@@ -89,10 +121,28 @@ class BaseHTTPEndpoint(HTTPEndpoint):
             raise UnexpectedError(msg_template % (err,))
 
         finally:
-            await session_maker.__aexit__(*sys.exc_info())
+            await session.__aexit__(*sys.exc_info())
             self.request.state.db_session = None
 
-        await response(self.scope, self.receive, self.send)
+        return response
+
+    def _get_session_kwargs(self) -> Dict[str, Any]:
+        if self.db_alias is None:
+            return {}
+        return {"info": {DB_ALIAS_OPTION: self.db_alias}}
+
+    def _use_response_cache(self) -> bool:
+        return (
+            self.response_cache is not None
+            and self.response_cache.is_cacheable_request(self.request)
+        )
+
+    def _response_cache_requires_user(self) -> bool:
+        return (
+            self.response_cache.per_user
+            or self.auth_backend not in (None, NoAuthenticationBackend)
+            or bool(self.permission_classes)
+        )
 
     async def _authenticate(self):
         if self.auth_backend:
@@ -138,7 +188,7 @@ class BaseHTTPEndpoint(HTTPEndpoint):
 
     def _response(
         self,
-        data: Union[DBModel, Iterable[DBModel], dict] = None,
+        data: Union[DBModel, Iterable[DBModel], Mapping] = None,
         status_code: int = status.HTTP_200_OK,
         response_status: ResponseStatus = ResponseStatus.OK,
         headers: Mapping[str, str] = None,
@@ -150,7 +200,8 @@ class BaseHTTPEndpoint(HTTPEndpoint):
         """
         if (data is not None) and self.response_schema:
             schema_kwargs = {}
-            if isinstance(data, Iterable) and not isinstance(data, dict):
+            # Mappings (i.e. rows of ModelMixin.async_get(fields=...)) are single objects
+            if isinstance(data, Iterable) and not isinstance(data, Mapping):
                 schema_kwargs["many"] = True
 
             payload = self.response_schema(**schema_kwargs).dump(data)
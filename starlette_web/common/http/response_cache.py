@@ -0,0 +1,299 @@
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Optional, Iterable, Dict, List, Tuple, Callable, Union
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from starlette_web.common.caches import caches
+from starlette_web.common.caches.base import BaseCache
+
+
+TAG_KEY_PREFIX = "response_cache:tag:"
+
+TagsType = Union[Iterable[str], Callable[[Request], Iterable[str]]]
+
+
+class ResponseCache:
+    """
+    Caches rendered responses of safe requests in caches[alias].
+
+    Responses are keyed on method, path, query, values of vary_headers and, if per_user,
+    on id of authenticated user. Only 200 responses without cookies, background tasks
+    and "Cache-Control: private/no-store/no-cache" are stored.
+    Stored responses carry ETag and Last-Modified, so that conditional requests get 304.
+
+    Tags (static strings, formatted with request.path_params, or callable of request)
+    allow to invalidate groups of responses with invalidate_response_cache_tags.
+    """
+
+    cacheable_methods = ("GET", "HEAD")
+    cacheable_status_codes = (200,)
+    uncacheable_directives = ("private", "no-store", "no-cache")
+
+    def __init__(
+        self,
+        timeout: Optional[float] = 60,
+        alias: str = "default",
+        vary_headers: Iterable[str] = ("accept", "accept-encoding", "accept-language"),
+        per_user: bool = False,
+        tags: TagsType = (),
+        key_prefix: str = "response_cache",
+        max_size: int = 1024 * 1024,
+    ):
+        self.timeout = timeout
+        self.alias = alias
+        self.vary_headers = [header.lower() for header in vary_headers]
+        self.per_user = per_user
+        self.tags = tags
+        self.key_prefix = key_prefix
+        self.max_size = max_size
+
+    @property
+    def cache(self) -> BaseCache:
+        return caches[self.alias]
+
+    def is_cacheable_request(self, request: Request) -> bool:
+        return request.method in self.cacheable_methods
+
+    def is_cacheable_response(self, response: Response) -> bool:
+        if response.status_code not in self.cacheable_status_codes:
+            return False
+
+        if getattr(response, "background", None) is not None:
+            return False
+
+        if "set-cookie" in response.headers:
+            return False
+
+        cache_control = response.headers.get("cache-control", "").lower()
+        if any(directive in cache_control for directive in self.uncacheable_directives):
+            return False
+
+        return len(getattr(response, "body", b"")) <= self.max_size
+
+    def get_cache_key(self, request: Request) -> str:
+        # HEAD requests share entries with GET
+        parts = [
+            "GET" if request.method == "HEAD" else request.method,
+            request.url.path,
+            "&".join(sorted(request.url.query.split("&"))),
+        ]
+        parts.extend(request.headers.get(header, "") for header in self.vary_headers)
+        if self.per_user:
+            parts.append(str(getattr(request.scope.get("user"), "id", None)))
+
+        key_hash = hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}:{key_hash}"
+
+    def get_tags(self, request: Request) -> List[str]:
+        if callable(self.tags):
+            return list(self.tags(request))
+        return [tag.format(**request.path_params) for tag in self.tags]
+
+    async def fetch(self, request: Request) -> Optional[Response]:
+        """
+        Returns cached response (or 304 Not Modified) for request, if it is still valid.
+        """
+        entry = await self.cache.async_get(self.get_cache_key(request))
+        if entry is None:
+            return None
+
+        if entry["tags"]:
+            versions = await self.cache.async_get_many(list(entry["tags"]))
+            if versions != entry["tags"]:
+                return None
+
+        if self._is_not_modified(request, entry["etag"], entry["last_modified"]):
+            return self._get_not_modified_response(entry["headers"])
+
+        response = Response(content=entry["body"], status_code=entry["status_code"])
+        response.raw_headers = [
+            (name.encode("latin-1"), value.encode("latin-1")) for name, value in entry["headers"]
+        ]
+        return response
+
+    async def store(self, request: Request, response: Response) -> Response:
+        """
+        Stores rendered response and returns it, with ETag and Last-Modified headers.
+        Returns 304 Not Modified instead, if request is conditional and matches response.
+        """
+        if not self.is_cacheable_request(request) or not self.is_cacheable_response(response):
+            return response
+
+        etag, last_modified = self._set_validators(response)
+        entry = {
+            "status_code": response.status_code,
+            "headers": [
+                (name.decode("latin-1"), value.decode("latin-1"))
+                for name, value in response.raw_headers
+            ],
+            "body": response.body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "tags": await self._get_tag_versions(self.get_tags(request)),
+        }
+        await self.cache.async_set(self.get_cache_key(request), entry, timeout=self.timeout)
+
+        if self._is_not_modified(request, etag, last_modified):
+            return self._get_not_modified_response(entry["headers"])
+        return response
+
+    async def invalidate(self, *tags: str) -> None:
+        await invalidate_response_cache_tags(*tags, alias=self.alias)
+
+    async def _get_tag_versions(self, tags: List[str]) -> Dict[str, int]:
+        if not tags:
+            return {}
+
+        tag_keys = [TAG_KEY_PREFIX + tag for tag in tags]
+        versions = await self.cache.async_get_many(tag_keys)
+        for tag_key, version in versions.items():
+            if version is None:
+                versions[tag_key] = await self.cache.async_get_version(tag_key)
+        return versions
+
+    def _set_validators(self, response: Response) -> Tuple[str, str]:
+        etag = response.headers.get("etag")
+        if etag is None:
+            etag = f'"{hashlib.sha1(response.body).hexdigest()}"'
+            response.headers["etag"] = etag
+
+        last_modified = response.headers.get("last-modified")
+        if last_modified is None:
+            last_modified = formatdate(usegmt=True)
+            response.headers["last-modified"] = last_modified
+
+        if self.vary_headers:
+            vary = [value.strip() for value in response.headers.get("vary", "").split(",")]
+            response.headers["vary"] = ", ".join(
+                [value for value in vary if value]
+                + [header for header in self.vary_headers if header not in vary]
+            )
+
+        return etag, last_modified
+
+    @staticmethod
+    def _is_not_modified(request: Request, etag: str, last_modified: str) -> bool:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 7232, section 6)
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            if if_none_match.strip() == "*":
+                return True
+            candidates = [value.strip().removeprefix("W/") for value in if_none_match.split(",")]
+            return etag.removeprefix("W/") in candidates
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(
+                    if_modified_since
+                )
+            except (TypeError, ValueError):
+                return False
+
+        return False
+
+    @staticmethod
+    def _get_not_modified_response(headers: List[Tuple[str, str]]) -> Response:
+        # https://httpwg.org/specs/rfc9110.html#status.304
+        allowed_headers = (
+            "cache-control",
+            "content-location",
+            "date",
+            "etag",
+            "expires",
+            "last-modified",
+            "vary",
+        )
+        response = Response(status_code=304)
+        response.raw_headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers
+            if name.lower() in allowed_headers
+        ]
+        return response
+
+
+async def invalidate_response_cache_tags(*tags: str, alias: str = "default") -> None:
+    # Bumps versions of tags, so that all responses, stored with them, become stale
+    cache = caches[alias]
+    for tag in tags:
+        await cache.async_bump_version(TAG_KEY_PREFIX + tag)
+
+
+class ResponseCacheMiddleware:
+    """
+    Caches responses of all safe anonymous requests (without cookies and Authorization header).
+    Arguments are passed to ResponseCache, i.e.
+
+    Middleware(ResponseCacheMiddleware, alias="default", timeout=60)
+
+    For endpoints, which require authentication, use BaseHTTPEndpoint.response_cache instead.
+    """
+
+    def __init__(self, app: ASGIApp, **kwargs) -> None:
+        self.app = app
+        self.response_cache = ResponseCache(**kwargs)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        if (
+            not self.response_cache.is_cacheable_request(request)
+            or "authorization" in request.headers
+            or "cookie" in request.headers
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        response = await self.response_cache.fetch(request)
+        if response is not None or request.method == "HEAD":
+            # Bodies of HEAD responses may be omitted by application, so they are not stored
+            await (response or self.app)(scope, receive, send)
+            return
+
+        start_message: Dict[str, Any] = {}
+        body_parts: List[bytes] = []
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal passthrough
+            if message["type"] == "http.response.start":
+                # Start message is held back, so that validators of stored response are sent
+                start_message.update(message)
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            more_body = message.get("more_body", False)
+            if not body_parts and not more_body:
+                response = await self._store(request, start_message, message.get("body", b""))
+                await response(scope, receive, send)
+                return
+
+            # Streaming responses are sent as is and stored once complete
+            body_parts.append(message.get("body", b""))
+            if len(body_parts) == 1:
+                await send(start_message)
+            await send(message)
+
+            if not more_body:
+                passthrough = True
+                await self._store(request, start_message, b"".join(body_parts))
+            elif sum(len(part) for part in body_parts) > self.response_cache.max_size:
+                passthrough = True
+                body_parts.clear()
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _store(self, request: Request, start_message: Message, body: bytes) -> Response:
+        response = Response(content=body, status_code=start_message.get("status", 200))
+        response.raw_headers = list(start_message.get("headers", []))
+        return await self.response_cache.store(request, response)
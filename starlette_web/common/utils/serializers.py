@@ -1,8 +1,20 @@
+import copy
 import json
 import pickle
-from typing import Any
+import zlib
+from typing import Any, Optional, Type
 
-from starlette_web.common.http.exceptions import BaseApplicationError
+from starlette_web.common.http.exceptions import BaseApplicationError, ImproperlyConfigured
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 
 class SerializerError(BaseApplicationError):
@@ -38,23 +50,103 @@ class BytesSerializer(BaseSerializer):
         return True
 
 
+class NoopSerializer(BaseSerializer):
+    # Passes objects by reference, for in-process storages only.
+    # Stored objects must not be mutated by caller afterwards.
+    def serialize(self, content: Any) -> Any:
+        return content
+
+    def deserialize(self, content: Any) -> Any:
+        return content
+
+
+class ShallowCopySerializer(BaseSerializer):
+    # Copies top-level container, for in-process storages only.
+    def serialize(self, content: Any) -> Any:
+        return copy.copy(content)
+
+    def deserialize(self, content: Any) -> Any:
+        return copy.copy(content)
+
+
 class JSONSerializer(BaseSerializer):
     encoder_class = json.JSONEncoder
     decoder_class = json.JSONDecoder
 
+    def __init__(self):
+        # Encoder and decoder are stateless, so they are created once per serializer
+        self._encoder = self.encoder_class()
+        self._decoder = self.decoder_class()
+
+    def __getstate__(self):
+        # Decoder holds C scanner, which cannot be pickled
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
     def serialize(self, content: Any) -> Any:
         try:
-            return self.encoder_class().encode(content)
+            return self._encoder.encode(content)
         except ValueError as exc:
             raise SerializeError from exc
 
     def deserialize(self, content: Any) -> Any:
         try:
-            return self.decoder_class().decode(content or "null")
+            return self._decoder.decode(content or "null")
         except ValueError as exc:
             raise DeserializeError from exc
 
 
+class OrjsonSerializer(BytesSerializer):
+    # Serializes to compact JSON bytes with orjson (extras "serializers"),
+    # falls back to standard json module, if orjson is not installed.
+    # Note, that orjson does not support integers beyond 64 bits.
+    def serialize(self, content: Any) -> Any:
+        try:
+            if orjson is not None:
+                return orjson.dumps(content)
+            return json.dumps(content, separators=(",", ":")).encode()
+        except (TypeError, ValueError) as exc:
+            raise SerializeError from exc
+
+    def deserialize(self, content: Any) -> Any:
+        if content is None:
+            return None
+
+        try:
+            if orjson is not None:
+                return orjson.loads(content)
+            return json.loads(content)
+        except ValueError as exc:
+            raise DeserializeError from exc
+
+
+class MsgpackSerializer(BytesSerializer):
+    # Requires msgpack (extras "serializers").
+    # There is no fallback, since other formats are not compatible with stored data.
+    def __init__(self):
+        if msgpack is None:
+            raise ImproperlyConfigured(
+                details="MsgpackSerializer requires msgpack to be installed"
+            )
+
+    def serialize(self, content: Any) -> Any:
+        try:
+            return msgpack.packb(content, use_bin_type=True)
+        except (TypeError, ValueError, OverflowError) as exc:
+            raise SerializeError from exc
+
+    def deserialize(self, content: Any) -> Any:
+        if content is None:
+            return None
+
+        try:
+            return msgpack.unpackb(content, raw=False, strict_map_key=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise DeserializeError from exc
+
+
 class PickleSerializer(BytesSerializer):
     # TODO: maybe add option to use dill ?
     def serialize(self, content: Any) -> Any:
@@ -71,3 +163,63 @@ class PickleSerializer(BytesSerializer):
             return pickle.loads(content)
         except pickle.UnpicklingError as exc:
             raise DeserializeError from exc
+
+
+class CompressedSerializer(BytesSerializer):
+    """
+    Compresses output of another BytesSerializer with zlib,
+    if serialized value is not shorter than min_length.
+
+    Each value is prefixed with a single byte, telling whether it has been compressed.
+    Chain with other serializer by subclassing, i.e.
+
+    class CompressedOrjsonSerializer(CompressedSerializer):
+        serializer_class = OrjsonSerializer
+    """
+
+    serializer_class: Type[BytesSerializer] = PickleSerializer
+    min_length = 1024
+    level = 6
+    _plain_header = b"\x00"
+    _zlib_header = b"\x01"
+
+    def __init__(
+        self,
+        serializer: Optional[BytesSerializer] = None,
+        min_length: Optional[int] = None,
+        level: Optional[int] = None,
+    ):
+        self.serializer = serializer or self.serializer_class()
+        if not self.serializer.serializes_to_bytes():
+            raise ImproperlyConfigured(
+                details="CompressedSerializer may only wrap instance of BytesSerializer"
+            )
+
+        self.min_length = self.min_length if min_length is None else min_length
+        self.level = self.level if level is None else level
+
+    def serialize(self, content: Any) -> Any:
+        data = self.serializer.serialize(content)
+        if len(data) < self.min_length:
+            return self._plain_header + data
+
+        try:
+            return self._zlib_header + zlib.compress(data, self.level)
+        except zlib.error as exc:
+            raise SerializeError from exc
+
+    def deserialize(self, content: Any) -> Any:
+        if content is None:
+            return None
+
+        header, data = content[:1], content[1:]
+        if header == self._plain_header:
+            return self.serializer.deserialize(data)
+
+        if header == self._zlib_header:
+            try:
+                return self.serializer.deserialize(zlib.decompress(data))
+            except zlib.error as exc:
+                raise DeserializeError from exc
+
+        raise DeserializeError(details="Unknown header of compressed value")
@@ -16,6 +16,9 @@ from starlette_web.common.authorization.backends import (
 )
 from starlette_web.common.authorization.base_user import BaseUserMixin, AnonymousUser
 from starlette_web.common.authorization.permissions import PermissionType
+from starlette_web.common.conf import settings
+from starlette_web.common.database import LazySession
+from starlette_web.common.database.profiler import profile_queries
 from starlette_web.common.http.exceptions import (
     PermissionDeniedError,
     AuthenticationFailedError,
@@ -46,7 +49,7 @@ class BaseWSEndpoint(WebSocketEndpoint):
 
     async def on_connect(self, websocket: WebSocket) -> None:
         try:
-            async with self.app.session_maker() as db_session:
+            async with LazySession(self.app.session_maker) as db_session:
                 websocket.state.db_session = db_session
                 self.user = await self._authenticate(websocket)
                 permitted, reason = await self._check_permissions(websocket)
@@ -85,7 +88,11 @@ class BaseWSEndpoint(WebSocketEndpoint):
 
         try:
             await self._register_background_task(task_id, websocket, data)
-            task_result = await self._background_handler(task_id, websocket, data)
+            if settings.DB_PROFILE_QUERIES:
+                with profile_queries(f"{self.__class__.__name__} task {task_id}"):
+                    task_result = await self._background_handler(task_id, websocket, data)
+            else:
+                task_result = await self._background_handler(task_id, websocket, data)
         except anyio.get_cancelled_exc_class() as exc:
             logger.debug(f"Background task {task_id} has been cancelled.")
             # As per anyio documentation, CancelError must be always re-raised
@@ -2,6 +2,7 @@ import datetime
 import jwt
 from functools import partial
 
+from sqlalchemy.orm import sessionmaker
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.datastructures import MutableHeaders
 from starlette.requests import HTTPConnection, Request
@@ -9,19 +10,25 @@ from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from starlette.responses import Response
 
 from starlette_web.common.conf import settings
-from starlette_web.common.database.session_maker import make_session_maker
+from starlette_web.common.database.session_maker import get_session_maker
 from starlette_web.contrib.auth.backend import SessionJWTAuthenticationBackend
 from starlette_web.contrib.auth.models import UserSession
 from starlette_web.contrib.auth.utils import decode_jwt
 
 
+def get_app_session_maker(scope: Scope) -> sessionmaker:
+    # Engine of app's endpoints. Mounted sub-apps (i.e. admin) use defaults of registry,
+    # configured by the main app
+    session_maker = getattr(scope.get("app"), "session_maker", None)
+    return session_maker or get_session_maker()
+
+
 class DBSessionMiddleware(BaseHTTPMiddleware):
     def __init__(self, app: ASGIApp) -> None:
         super().__init__(app)
-        self.session_maker = make_session_maker(use_pool=False)
 
     async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        async with self.session_maker() as session:
+        async with get_app_session_maker(request.scope)() as session:
             try:
                 request.state.session = session
                 request.state.db_session = session
@@ -41,7 +48,6 @@ class AdminSessionMiddleware:
         self.session_cookie = SessionJWTAuthenticationBackend.cookie_name
         self.max_age = settings.AUTH_JWT_REFRESH_EXPIRES_IN
         self.path = "/"
-        self.session_maker = make_session_maker(use_pool=False)
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         if scope["type"] not in ("http", "websocket"):  # pragma: no cover
@@ -83,7 +89,7 @@ class AdminSessionMiddleware:
 
         if message["type"] == "http.response.start":
             if scope.get("session", {}) and scope["session"].get("token"):
-                async with self.session_maker() as db_session:
+                async with get_app_session_maker(scope)() as db_session:
                     user_session = await UserSession.async_get(
                         db_session=db_session,
                         refresh_token=scope["session"]["token"],
@@ -1,8 +1,11 @@
 import logging
-from typing import Tuple
+from typing import Optional, Tuple
 
 from jwt import InvalidTokenError, ExpiredSignatureError
+from sqlalchemy import select
 
+from starlette_web.common.conf import settings
+from starlette_web.contrib.auth.identity_cache import get_auth_identity_cache
 from starlette_web.contrib.auth.models import User, UserSession
 from starlette_web.contrib.auth.utils import decode_jwt, TOKEN_TYPE_ACCESS
 from starlette_web.common.authorization.backends import BaseAuthenticationBackend
@@ -74,6 +77,37 @@ class JWTAuthenticationBackend(BaseAuthenticationBackend):
         jwt_payload = self._parse_jwt_payload(jwt_token, token_type)
 
         user_id = jwt_payload.get("user_id")
+        session_id = jwt_payload.get("session_id")
+
+        identity_cache = get_auth_identity_cache()
+        if not (identity_cache and session_id):
+            user = await self._get_active_user(user_id, session_id)
+            return user, jwt_payload, session_id
+
+        # Version of user is read before user is loaded, so that concurrent invalidation
+        # makes the stored entry stale
+        user, version = await identity_cache.get_user(self.db_session, user_id, session_id)
+        if user is None:
+            user = await self._get_active_user(user_id, session_id)
+            await identity_cache.set_user(user, session_id, version)
+
+        return user, jwt_payload, session_id
+
+    async def _get_active_user(self, user_id: int, session_id: Optional[str]) -> User:
+        if settings.AUTH_JOINED_QUERY and session_id:
+            user = await self.db_session.scalar(
+                select(User)
+                .join(UserSession, UserSession.user_id == User.id)
+                .where(
+                    User.id == user_id,
+                    User.is_active.is_(True),
+                    UserSession.public_id == session_id,
+                    UserSession.is_active.is_(True),
+                )
+            )
+            # Otherwise, separate lookups tell, which of them has failed
+            if user is not None:
+                return user
 
         user = await User.get_active(self.db_session, user_id)
         if not user:
@@ -81,7 +115,6 @@ class JWTAuthenticationBackend(BaseAuthenticationBackend):
             logger.warning(msg, user_id)
             raise AuthenticationFailedError(details=(msg % (user_id,)))
 
-        session_id = jwt_payload.get("session_id")
         if not session_id:
             raise AuthenticationFailedError("Incorrect data in JWT: session_id is missed")
 
@@ -95,7 +128,7 @@ class JWTAuthenticationBackend(BaseAuthenticationBackend):
                 f"Couldn't found active session: {user_id=} | {session_id=}."
             )
 
-        return user, jwt_payload, session_id
+        return user
 
 
 class SessionJWTAuthenticationBackend(JWTAuthenticationBackend):
@@ -0,0 +1,121 @@
+import functools
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.inspection import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from starlette_web.common.caches import caches
+from starlette_web.common.caches.base import BaseCache
+from starlette_web.common.conf import settings
+from starlette_web.common.database.session import on_commit
+from starlette_web.contrib.auth.models import User
+
+
+class AuthIdentityCache:
+    """
+    Caches active users of active sessions, found by JWT authentication,
+    so that authenticated requests do not query database.
+
+    Entries are keyed by public id of session and store column values of user
+    with version of user, so that changes of user invalidate all of its sessions.
+    Excluded fields (password hash) are not stored, so that they don't leak into shared cache.
+    Cached users don't have them loaded: code, which needs them, should load them explicitly,
+    i.e. await db_session.refresh(user, ["password"]).
+    """
+
+    key_prefix = "auth_identity:"
+    excluded_fields = ("password",)
+
+    def __init__(self, alias: str = "default", timeout: Optional[float] = 30):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self) -> BaseCache:
+        return caches[self.alias]
+
+    async def get_user(
+        self,
+        db_session: AsyncSession,
+        user_id: int,
+        session_id: str,
+    ) -> Tuple[Optional[User], int]:
+        """
+        Returns cached user of session (None, if it is not cached) and current version of user.
+        On a miss, version must be passed to set_user, once user is loaded from database,
+        so that invalidations, which happen meanwhile, make the stored entry stale.
+        """
+        session_key, user_key = self._get_session_key(session_id), self._get_user_key(user_id)
+        values = await self.cache.async_get_many([session_key, user_key])
+        entry, version = values[session_key], values[user_key]
+        if version is None:
+            version = await self.cache.async_get_version(user_key)
+        if entry is None or entry["user_id"] != user_id or entry["version"] != version:
+            return None, version
+
+        # Cached user is attached to session without a query
+        user = User(**entry["user"])
+        make_transient_to_detached(user)
+        return await db_session.merge(user, load=False), version
+
+    async def set_user(self, user: User, session_id: str, version: int) -> None:
+        entry = {"user_id": user.id, "version": version, "user": self._get_user_values(user)}
+        await self.cache.async_set(self._get_session_key(session_id), entry, timeout=self.timeout)
+
+    async def invalidate_session(self, session_id: str) -> None:
+        await self.cache.async_delete(self._get_session_key(session_id))
+
+    async def invalidate_user(self, user_id: int) -> None:
+        # Bumps version of user, so that entries of all its sessions become stale
+        await self.cache.async_bump_version(self._get_user_key(user_id))
+
+    def _get_session_key(self, session_id: str) -> str:
+        return f"{self.key_prefix}session:{session_id}"
+
+    def _get_user_key(self, user_id: int) -> str:
+        return f"{self.key_prefix}user:{user_id}"
+
+    def _get_user_values(self, user: User) -> Dict[str, Any]:
+        return {
+            attribute.key: getattr(user, attribute.key)
+            for attribute in inspect(User).column_attrs
+            if attribute.key not in self.excluded_fields
+        }
+
+
+def get_auth_identity_cache() -> Optional[AuthIdentityCache]:
+    if settings.AUTH_IDENTITY_CACHE is None:
+        return None
+    return AuthIdentityCache(settings.AUTH_IDENTITY_CACHE, settings.AUTH_IDENTITY_CACHE_TIMEOUT)
+
+
+async def invalidate_auth_session(
+    session_id: str,
+    db_session: Optional[AsyncSession] = None,
+) -> None:
+    """
+    Invalidates cached user of session at once and, if db_session is passed,
+    once again after its transaction is committed, so that concurrent requests,
+    which have read not yet committed session, don't leave it in cache.
+    """
+    if identity_cache := get_auth_identity_cache():
+        await identity_cache.invalidate_session(session_id)
+        if db_session is not None:
+            await on_commit(
+                db_session,
+                functools.partial(identity_cache.invalidate_session, session_id),
+                key=(identity_cache.key_prefix, "session", session_id),
+            )
+
+
+async def invalidate_auth_user(user_id: int, db_session: Optional[AsyncSession] = None) -> None:
+    # Same as invalidate_auth_session, but for all sessions of user
+    if identity_cache := get_auth_identity_cache():
+        await identity_cache.invalidate_user(user_id)
+        if db_session is not None:
+            await on_commit(
+                db_session,
+                functools.partial(identity_cache.invalidate_user, user_id),
+                key=(identity_cache.key_prefix, "user", user_id),
+            )
@@ -21,6 +21,7 @@ from starlette_web.common.http.exceptions import (
 from starlette_web.common.utils import get_random_string
 from starlette_web.contrib.auth.models import User, UserSession, UserInvite
 from starlette_web.contrib.auth.backend import JWTAuthenticationBackend
+from starlette_web.contrib.auth.identity_cache import invalidate_auth_session, invalidate_auth_user
 from starlette_web.contrib.auth.permissions import IsSuperuserPermission
 from starlette_web.contrib.auth.utils import (
     encode_jwt,
@@ -241,6 +242,7 @@ class SignOutAPIView(BaseHTTPEndpoint):
             logger.info("Session %s exists and active. It will be updated.", user_session)
             user_session.is_active = False
             await self.db_session.flush()
+            await invalidate_auth_session(user_session.public_id, self.db_session)
 
         else:
             logger.info("Not found active sessions for user %s. Skip sign-out.", user)
@@ -290,6 +292,7 @@ class RefreshTokenAPIView(JWTSessionMixin, BaseHTTPEndpoint):
             raise AuthenticationFailedError("Refresh token does not match with user session.")
 
         token_collection = await self._update_session(user, session_id)
+        await invalidate_auth_session(session_id, self.db_session)
         return self._response(token_collection)
 
     async def _validate(self, request, *args, **kwargs) -> Tuple[User, str, Optional[str]]:
@@ -484,6 +487,7 @@ class ChangePasswordAPIView(JWTSessionMixin, BaseHTTPEndpoint):
         )
         new_password = User.make_password(cleaned_data["password_1"])
         await user.update(self.db_session, password=new_password)
+        await invalidate_auth_user(user.id, self.db_session)
 
         token_collection = await self._create_session(user)
         return self._response(token_collection)
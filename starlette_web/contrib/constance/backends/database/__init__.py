@@ -2,18 +2,16 @@ from typing import Dict, Any, List
 
 from sqlalchemy.orm import sessionmaker
 
-from starlette_web.common.database import make_session_maker
+from starlette_web.common.database import get_session_maker
 from starlette_web.contrib.constance.backends.base import BaseConstanceBackend
 from starlette_web.contrib.constance.backends.database.models import Constance
 
 
 class DatabaseBackend(BaseConstanceBackend):
-    session_maker: sessionmaker
-
-    def __init__(self):
-        super().__init__()
-        # Disable connection pooling to avoid creating persistent open connections
-        self.session_maker = make_session_maker(use_pool=False)
+    @property
+    def session_maker(self) -> sessionmaker:
+        # Shares engine of application (without pool for management commands, if configured)
+        return get_session_maker()
 
     async def mget(self, keys: List[str]) -> Dict[str, Any]:
         async with self.session_maker() as session:
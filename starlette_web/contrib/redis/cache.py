@@ -1,4 +1,14 @@
-from typing import Sequence, Any, List, Dict, Type, Optional, AsyncContextManager, Union
+from typing import (
+    Sequence,
+    Any,
+    List,
+    Dict,
+    Type,
+    Optional,
+    AsyncContextManager,
+    AsyncIterator,
+    Union,
+)
 
 from redis import asyncio as aioredis
 
@@ -8,6 +18,18 @@ from starlette_web.common.utils.serializers import BytesSerializer, PickleSerial
 from starlette_web.contrib.redis.redislock import RedisLock
 
 
+# Creates missing key with expiration in the same round trip, as INCRBY,
+# since EXPIRE with NX flag is only available since redis 7.0
+INCR_SCRIPT = """
+local created = redis.call("EXISTS", KEYS[1]) == 0
+local value = redis.call("INCRBY", KEYS[1], ARGV[1])
+if created then
+    redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return value
+"""
+
+
 def reraise_exception(func):
     async def wrapped(*args, **kwargs):
         try:
@@ -20,69 +42,199 @@ def reraise_exception(func):
     return wrapped
 
 
+class RedisSerializer(BytesSerializer):
+    # Integers are stored as is, so that they can be modified with INCRBY,
+    # other values are serialized with wrapped serializer (PickleSerializer by default)
+    # Adapted from https://github.com/django/django/blob/main/django/core/cache/backends/redis.py
+    serializer_class: Type[BytesSerializer] = PickleSerializer
+
+    def __init__(self, serializer: Optional[BytesSerializer] = None):
+        self.serializer = serializer or self.serializer_class()
+
+    def serialize(self, content: Any) -> Any:
+        if type(content) is int:
+            return content
+        return self.serializer.serialize(content)
+
+    def deserialize(self, content: Any) -> Any:
+        try:
+            return int(content)
+        except (TypeError, ValueError):
+            return self.serializer.deserialize(content)
+
+
 class RedisCache(BaseCache):
+    """
+    Lowercase options are passed to redis.asyncio.Redis as is.
+    Uppercase options configure cache itself:
+    - SCAN_COUNT - hint for number of keys, returned by a single SCAN call (1000 by default)
+    """
+
     redis: aioredis.Redis
-    serializer_class: Type[BytesSerializer] = PickleSerializer
+    serializer_class: Type[BytesSerializer] = RedisSerializer
     lock_class = RedisLock
+    default_scan_count = 1000
 
     def __init__(self, options: Dict[str, Any]):
         super().__init__(options)
-        self.redis = aioredis.Redis(**options)
+        if not isinstance(self.serializer, RedisSerializer):
+            self.serializer = RedisSerializer(self.serializer)
+
+        self.scan_count: int = options.get("SCAN_COUNT", self.default_scan_count)
+        self.redis = aioredis.Redis(
+            **{key: value for key, value in options.items() if not key.isupper()}
+        )
+        self._incr_script = self.redis.register_script(INCR_SCRIPT)
 
     @reraise_exception
-    async def async_get(self, key: str) -> Any:
-        value = await self.redis.get(key)
+    async def async_get(self, key: str, version: Optional[int] = None) -> Any:
+        value = await self.redis.get(self.make_key(key, version=version))
         return self.serializer.deserialize(value)
 
     @reraise_exception
-    async def async_set(self, key: str, value, timeout: Optional[float] = 120):
+    async def async_set(
+        self,
+        key: str,
+        value,
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ):
         await self.redis.set(
-            key,
+            self.make_key(key, version=version),
             self.serializer.serialize(value),
             px=int(timeout * 1000) if timeout is not None else None,
         )
 
     @reraise_exception
-    async def async_delete(self, key: str) -> None:
-        await self.redis.delete(key)
+    async def async_delete(self, key: str, version: Optional[int] = None) -> None:
+        await self.redis.delete(self.make_key(key, version=version))
+
+    @reraise_exception
+    async def async_incr(
+        self,
+        key: str,
+        delta: int = 1,
+        timeout: Optional[float] = None,
+        version: Optional[int] = None,
+    ) -> int:
+        key = self.make_key(key, version=version)
+        if timeout is None:
+            return await self.redis.incrby(key, delta)
+
+        return await self._incr_script(keys=[key], args=[delta, int(timeout * 1000)])
 
     @reraise_exception
-    async def async_keys(self, pattern: str) -> List[str]:
-        # Using KEYS is not recommended in production with high-load,
-        # since it's a redis-blocking operation
-        # If you have millions of keys, consider using redis.scan_iter instead
-        return [self._force_str(key) for key in (await self.redis.keys(pattern))]
+    async def async_touch(
+        self,
+        key: str,
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> bool:
+        key = self.make_key(key, version=version)
+        if timeout is None:
+            # PERSIST returns 0 for keys without expiration as well
+            return bool(await self.redis.persist(key)) or bool(await self.redis.exists(key))
+
+        return bool(await self.redis.pexpire(key, int(timeout * 1000)))
 
     @reraise_exception
-    async def async_get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+    async def async_ttl(self, key: str, version: Optional[int] = None) -> Optional[float]:
+        ttl = await self.redis.pttl(self.make_key(key, version=version))
+        if ttl == -2:
+            return 0
+        if ttl == -1:
+            return None
+        return ttl / 1000
+
+    @reraise_exception
+    async def async_keys(self, pattern: str, version: Optional[int] = None) -> List[str]:
+        # SCAN may return the same key several times, so keys are deduplicated
+        keys = {}
+        async for key in self.async_iter_keys(pattern, version=version):
+            keys[key] = None
+        return list(keys)
+
+    async def async_iter_keys(
+        self,
+        pattern: str,
+        count: Optional[int] = None,
+        version: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Iterates over keys, matching redis-like pattern, with SCAN command.
+        Unlike KEYS, it does not block redis, but may yield the same key several times.
+        """
+        try:
+            async for key in self.redis.scan_iter(
+                match=self.make_key(pattern, version=version),
+                count=count or self.scan_count,
+            ):
+                yield self._reverse_key(self._force_str(key), version=version)
+        except aioredis.RedisError as exc:
+            raise CacheError from exc
+
+    @reraise_exception
+    async def async_delete_pattern(self, pattern: str, version: Optional[int] = None) -> None:
+        await self._delete_raw_pattern(self.make_key(pattern, version=version))
+
+    async def _delete_raw_pattern(self, raw_pattern: str) -> None:
+        # Keys are unlinked in batches, while iterating with SCAN.
+        # UNLINK frees memory in background thread of redis, unlike DEL.
+        batch = []
+        async for key in self.redis.scan_iter(match=raw_pattern, count=self.scan_count):
+            batch.append(key)
+            if len(batch) >= self.scan_count:
+                await self.redis.unlink(*batch)
+                batch = []
+
+        if batch:
+            await self.redis.unlink(*batch)
+
+    @reraise_exception
+    async def async_get_many(
+        self,
+        keys: Sequence[str],
+        version: Optional[int] = None,
+    ) -> Dict[str, Any]:
         result = dict()
+        if not keys:
+            return result
+
         key_idx = 0
 
         # redis.mget returns a simple list
-        for value in await self.redis.mget(keys):
+        for value in await self.redis.mget([self.make_key(key, version=version) for key in keys]):
             result[keys[key_idx]] = self.serializer.deserialize(value)
             key_idx += 1
 
         return result
 
     @reraise_exception
-    async def async_has_key(self, key: str) -> bool:
-        return bool(await self.redis.exists(key))
+    async def async_has_key(self, key: str, version: Optional[int] = None) -> bool:
+        return bool(await self.redis.exists(self.make_key(key, version=version)))
 
     @reraise_exception
-    async def async_set_many(self, data: Dict[str, Any], timeout: Optional[float] = 120) -> None:
+    async def async_set_many(
+        self,
+        data: Dict[str, Any],
+        timeout: Optional[float] = 120,
+        version: Optional[int] = None,
+    ) -> None:
         """
         Set multiple key-values with timeout.
         Note, that redis does not support setting timeout in MSET,
         which is why commands need to be wrapped with multi-exec block (provided by pipelines)
         """
 
-        if len(data) < 2:
-            await super().async_set_many(data, timeout)
+        if not data:
+            return
 
         elif timeout is None:
             await self.redis.mset(
-                {key: self.serializer.serialize(value) for key, value in data.items()}
+                {
+                    self.make_key(key, version=version): self.serializer.serialize(value)
+                    for key, value in data.items()
+                }
             )
 
         else:
@@ -95,7 +247,7 @@ class RedisCache(BaseCache):
                 for key, value in data.items():
                     pipeline.execute_command(
                         "SET",
-                        key,
+                        self.make_key(key, version=version),
                         self.serializer.serialize(value),
                         "PX",
                         int(timeout * 1000),
@@ -103,12 +255,17 @@ class RedisCache(BaseCache):
                 await pipeline.execute(raise_on_error=True)
 
     @reraise_exception
-    async def async_delete_many(self, keys: Sequence[str]) -> None:
-        await self.redis.delete(*keys)
+    async def async_delete_many(self, keys: Sequence[str], version: Optional[int] = None) -> None:
+        if keys:
+            await self.redis.delete(*[self.make_key(key, version=version) for key in keys])
 
     @reraise_exception
     async def async_clear(self) -> None:
-        await self.redis.flushdb()
+        if self.key_prefix:
+            # Database may be shared with caches with other prefixes
+            await self._delete_raw_pattern(self._get_clear_pattern())
+        else:
+            await self.redis.flushdb()
 
     def lock(
         self,
@@ -122,7 +279,7 @@ class RedisCache(BaseCache):
         kwargs.pop("sleep", 0)
 
         return self.redis.lock(
-            name,
+            self.make_key(name),
             timeout=timeout,
             blocking_timeout=blocking_timeout,
             lock_class=self.lock_class,
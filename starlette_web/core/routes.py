@@ -8,6 +8,7 @@ from starlette_web.contrib.admin import admin, AdminMount
 from starlette_web.tests.views import (
     HealthCheckAPIView,
     SentryCheckAPIView,
+    ResponseCacheTestAPIView,
     BaseWebsocketTestEndpoint,
     CancellationWebsocketTestEndpoint,
     AuthenticationWebsocketTestEndpoint,
@@ -25,6 +26,7 @@ routes = [
     Mount("/static", app=StaticFiles(directory=settings.STATIC["ROOT_DIR"]), name="static"),
     Route("/health_check/", HealthCheckAPIView),
     Route("/sentry_check/", SentryCheckAPIView),
+    Route("/response_cache/{item_id}/", ResponseCacheTestAPIView),
     WebSocketRoute("/ws/test_websocket_base", BaseWebsocketTestEndpoint),
     WebSocketRoute("/ws/test_websocket_cancel", CancellationWebsocketTestEndpoint),
     WebSocketRoute("/ws/test_websocket_auth", AuthenticationWebsocketTestEndpoint),
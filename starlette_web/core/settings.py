@@ -27,6 +27,8 @@ INSTALLED_APPS = [
 ]
 
 DB_ECHO = config("DB_ECHO", cast=bool, default=False)
+DB_PROFILE_QUERIES = config("DB_PROFILE_QUERIES", cast=bool, default=TEST_MODE)
+DB_PROFILER_SERVER_TIMING = config("DB_PROFILER_SERVER_TIMING", cast=bool, default=TEST_MODE)
 DB_NAME = config("DB_NAME", default="web_project")
 if TEST_MODE:
     DB_NAME = config("DB_NAME_TEST", default="web_project_test")
@@ -72,6 +74,7 @@ CACHES = {
         "OPTIONS": {
             "name": "locmem",
         },
+        "INSTRUMENT": True,
     },
     "files": {
         "BACKEND": "starlette_web.common.files.cache.FileCache",
@@ -310,6 +310,15 @@ class TestSignOutAPIView(BaseTestAPIView):
         user_session = await_(UserSession.async_get(dbs, id=user_session.id))
         assert user_session.is_active is False
 
+    def test_sign_out__identity_cache_invalidated(self, client, user, monkeypatch):
+        monkeypatch.setattr(settings, "AUTH_IDENTITY_CACHE", "locmem")
+        client.login(user)
+        assert client.get("/api/auth/me/").status_code == 200
+
+        response = client.delete(self.url)
+        assert response.status_code == 200
+        assert client.get("/api/auth/me/").status_code == 401
+
     def test_sign_out__user_session_not_found__ok(self, client, user):
         client.login(user)
         response = client.delete(self.url)
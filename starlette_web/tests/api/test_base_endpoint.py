@@ -0,0 +1,27 @@
+import json
+from types import MappingProxyType
+
+from marshmallow import Schema, fields
+
+from starlette_web.common.http.base_endpoint import BaseHTTPEndpoint
+
+
+class ItemSchema(Schema):
+    id = fields.Int()
+    email = fields.Str()
+
+
+class ItemAPIView(BaseHTTPEndpoint):
+    response_schema = ItemSchema
+
+
+def test_response__mapping():
+    endpoint = ItemAPIView.__new__(ItemAPIView)
+
+    # Mapping (i.e. row of ModelMixin.async_get with fields) is dumped as a single object
+    row = MappingProxyType({"id": 1, "email": "user@test.com", "password": "***"})
+    response = endpoint._response(data=row)
+    assert json.loads(response.body)["payload"] == {"id": 1, "email": "user@test.com"}
+
+    response = endpoint._response(data=[{"id": 1}, {"id": 2}])
+    assert json.loads(response.body)["payload"] == [{"id": 1}, {"id": 2}]
@@ -0,0 +1,129 @@
+import uuid
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from starlette_web.common.caches import caches
+from starlette_web.common.http.response_cache import (
+    TAG_KEY_PREFIX,
+    ResponseCacheMiddleware,
+    invalidate_response_cache_tags,
+)
+from starlette_web.tests.api.test_base import BaseTestAPIView
+from starlette_web.tests.views import ResponseCacheTestAPIView
+
+
+class TestResponseCacheAPIView(BaseTestAPIView):
+    @staticmethod
+    def _get_url():
+        return f"/response_cache/{uuid.uuid4().hex}/"
+
+    def test_response_cache__hit(self, client):
+        url = self._get_url()
+        response = client.get(url)
+        calls = self.assert_ok_response(response)["calls"]
+        assert response.headers["etag"]
+        assert response.headers["last-modified"]
+        assert "accept" in response.headers["vary"]
+
+        cached_response = client.get(url)
+        assert self.assert_ok_response(cached_response)["calls"] == calls
+        assert cached_response.headers["etag"] == response.headers["etag"]
+        assert ResponseCacheTestAPIView.calls == calls
+
+        # Query is a part of cache key
+        response = client.get(url, params={"page": 2})
+        assert self.assert_ok_response(response)["calls"] == calls + 1
+
+    def test_response_cache__not_modified(self, client):
+        url = self._get_url()
+        response = client.get(url)
+        etag = response.headers["etag"]
+        calls = ResponseCacheTestAPIView.calls
+
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+        response = client.get(url, headers={"If-None-Match": '"other"'})
+        assert response.status_code == 200
+        assert ResponseCacheTestAPIView.calls == calls
+
+    def test_response_cache__invalidate_tags(self, client, loop):
+        item_id = uuid.uuid4().hex
+        url = f"/response_cache/{item_id}/"
+        calls = self.assert_ok_response(client.get(url))["calls"]
+
+        loop.run_until_complete(
+            invalidate_response_cache_tags(f"items:{uuid.uuid4().hex}", alias="locmem")
+        )
+        assert self.assert_ok_response(client.get(url))["calls"] == calls
+
+        loop.run_until_complete(invalidate_response_cache_tags(f"items:{item_id}", alias="locmem"))
+        assert self.assert_ok_response(client.get(url))["calls"] == calls + 1
+        assert self.assert_ok_response(client.get(url))["calls"] == calls + 1
+
+    def test_response_cache__invalidate_evicted_tags(self, client, loop):
+        item_id = uuid.uuid4().hex
+        url = f"/response_cache/{item_id}/"
+        tag_key = f"{TAG_KEY_PREFIX}items:{item_id}"
+        calls = self.assert_ok_response(client.get(url))["calls"]
+
+        for _ in range(2):
+            # Evicted tags are not restarted from 1, so stale responses never match
+            loop.run_until_complete(caches["locmem"].async_delete(tag_key))
+            loop.run_until_complete(
+                invalidate_response_cache_tags(f"items:{item_id}", alias="locmem")
+            )
+            calls += 1
+            assert self.assert_ok_response(client.get(url))["calls"] == calls
+
+
+class TestResponseCacheMiddleware:
+    @staticmethod
+    def _get_client():
+        calls = []
+
+        async def endpoint(request):
+            calls.append(request.method)
+            return JSONResponse({"calls": len(calls)})
+
+        async def private_endpoint(request):
+            calls.append(request.method)
+            return JSONResponse({"calls": len(calls)}, headers={"Cache-Control": "private"})
+
+        app = Starlette(
+            routes=[
+                Route("/items/", endpoint, methods=["GET", "POST"]),
+                Route("/private/", private_endpoint),
+            ],
+            middleware=[
+                Middleware(ResponseCacheMiddleware, alias="locmem", key_prefix=uuid.uuid4().hex)
+            ],
+        )
+        return TestClient(app), calls
+
+    def test_middleware__hit(self):
+        client, calls = self._get_client()
+        response = client.get("/items/")
+        assert response.json() == {"calls": 1}
+        etag = response.headers["etag"]
+
+        assert client.get("/items/").json() == {"calls": 1}
+        assert client.get("/items/", headers={"If-None-Match": etag}).status_code == 304
+        assert client.head("/items/").status_code == 200
+        assert calls == ["GET"]
+
+    def test_middleware__skip(self):
+        client, calls = self._get_client()
+        assert client.post("/items/").json() == {"calls": 1}
+        assert client.post("/items/").json() == {"calls": 2}
+        assert client.get("/items/", headers={"Authorization": "Bearer token"}).json() == {
+            "calls": 3
+        }
+        assert client.get("/private/").json() == {"calls": 4}
+        assert client.get("/private/").json() == {"calls": 5}
@@ -285,6 +285,30 @@ REFERENCE_SCHEMA = {
                 "tags": ["Health check"],
             }
         },
+        "/response_cache/{item_id}/": {
+            "get": {
+                "description": "Cached response with number of handler calls",
+                "parameters": [
+                    {
+                        "name": "item_id",
+                        "in": "path",
+                        "required": True,
+                        "schema": {"type": "string"},
+                    }
+                ],
+                "responses": {
+                    "200": {
+                        "description": "Item with number of calls",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/ResponseCacheTest"}
+                            }
+                        },
+                    },
+                },
+                "tags": ["Health check"],
+            }
+        },
     },
     "openapi": "3.0.2",
     "components": {
@@ -393,6 +417,10 @@ REFERENCE_SCHEMA = {
                     "services": {"$ref": "#/components/schemas/ServicesCheck"},
                 },
             },
+            "ResponseCacheTest": {
+                "type": "object",
+                "properties": {"calls": {"type": "integer"}, "item_id": {"type": "string"}},
+            },
         },
         "securitySchemes": {"JWTAuth": {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"}},
     },
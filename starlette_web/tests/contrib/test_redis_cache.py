@@ -1,5 +1,18 @@
+import json
+from unittest.mock import patch
+
+import anyio
+import pytest
+
 from starlette_web.common.caches import caches
+from starlette_web.common.caches import tiered
+from starlette_web.common.caches.tiered import TieredCache
+from starlette_web.common.channels.exceptions import ListenerClosed
+from starlette_web.common.conf import settings
+from starlette_web.common.http.exceptions import ImproperlyConfigured
+from starlette_web.contrib.redis import RedisCache
 from starlette_web.tests.core.helpers.base_cache_tester import BaseCacheTester
+from starlette_web.tests.helpers import await_
 
 
 class TestRedisCache(BaseCacheTester):
@@ -9,6 +22,64 @@ class TestRedisCache(BaseCacheTester):
     def test_redis_cache_many_ops(self):
         self._run_cache_many_ops_test(caches["default"])
 
+    def test_redis_cache_get_or_set(self):
+        self._run_cache_get_or_set_test(caches["default"])
+        self._run_cache_get_or_set_test(caches["default"], use_lock=True)
+
+    def test_redis_cache_versioning(self):
+        options = settings.CACHES["default"]["OPTIONS"]
+        self._run_cache_versioning_test(
+            RedisCache({**options, "KEY_PREFIX": "test_prefix", "VERSION": 2}),
+            RedisCache({**options, "KEY_PREFIX": "test_other_prefix"}),
+        )
+
+    def test_redis_cache_counters(self):
+        self._run_cache_counters_test(caches["default"])
+
+    def test_redis_cache_custom_serializer(self):
+        cache = RedisCache(
+            {
+                **settings.CACHES["default"]["OPTIONS"],
+                "KEY_PREFIX": "test_compressed",
+                "SERIALIZER": "starlette_web.common.utils.serializers.CompressedSerializer",
+            }
+        )
+        self._run_base_cache_test(cache)
+        self._run_cache_counters_test(cache)
+
+        value = {"items": ["x" * 100] * 100}
+        await_(cache.async_set("compressed", value, timeout=10))
+        assert await_(cache.async_get("compressed")) == value
+        assert len(await_(cache.redis.get(cache.make_key("compressed")))) < 1000
+        await_(cache.async_clear())
+
+    def test_redis_cache_scan_ops(self):
+        cache = caches["default"]
+        prefix = "b1e2c3d4-scan-ops"
+        await_(cache.async_set_many({f"{prefix}:{i}": i for i in range(25)}, timeout=None))
+        await_(cache.async_set_many({f"{prefix}:single": 1}, timeout=10))
+
+        async def collect_keys():
+            return [key async for key in cache.async_iter_keys(f"{prefix}:*", count=5)]
+
+        assert set(await_(collect_keys())) == {f"{prefix}:{i}" for i in range(25)} | {
+            f"{prefix}:single"
+        }
+        assert len(await_(cache.async_keys(f"{prefix}:*"))) == 26
+
+        cache.scan_count = 4
+        try:
+            await_(cache.async_delete_pattern(f"{prefix}:1*"))
+        finally:
+            cache.scan_count = cache.default_scan_count
+
+        keys = await_(cache.async_keys(f"{prefix}:*"))
+        assert len(keys) == 15
+        assert all(not key.startswith(f"{prefix}:1") for key in keys)
+
+        await_(cache.async_delete_pattern(f"{prefix}:*"))
+        assert await_(cache.async_keys(f"{prefix}:*")) == []
+
     def test_redis_lock(self):
         self._run_cache_lock_test(caches["default"])
 
@@ -17,3 +88,172 @@ class TestRedisCache(BaseCacheTester):
 
     def test_redis_lock_correct_task_blocking(self):
         self._run_cache_timeouts_test(caches["default"])
+
+
+class TestTieredCache(BaseCacheTester):
+    def _get_tiered_cache(self, l1_name: str) -> TieredCache:
+        return TieredCache(
+            {
+                "L2": "default",
+                "L1": {
+                    "BACKEND": "starlette_web.common.caches.local_memory.LocalMemoryCache",
+                    "OPTIONS": {"name": l1_name, "MAX_ENTRIES": 16},
+                },
+                "L1_TIMEOUT": 10,
+                "CHANNEL_LAYER": settings.CHANNEL_LAYERS["redispubsub"],
+            }
+        )
+
+    def test_tiered_cache_base_ops(self):
+        self._run_base_cache_test(self._get_tiered_cache("tiered_base_ops"))
+
+    def test_tiered_cache_many_ops(self):
+        self._run_cache_many_ops_test(self._get_tiered_cache("tiered_many_ops"))
+
+    def test_tiered_cache_counters(self):
+        test_key = "5d2b7f0e-tiered-counter"
+        cache = self._get_tiered_cache("tiered_counters")
+        await_(cache.async_delete(test_key))
+
+        assert await_(cache.async_incr(test_key, timeout=10)) == 1
+        assert await_(cache.async_get(test_key)) == 1
+        assert await_(cache.async_incr(test_key, 2)) == 3
+        assert await_(cache.l1.async_get(test_key)) is None
+        assert await_(cache.async_get(test_key)) == 3
+        assert 9 < await_(cache.async_ttl(test_key)) <= 10
+        await_(cache.async_delete(test_key))
+
+    def test_tiered_cache_invalidation(self):
+        test_key = "0e3a5c4e-8a3c-4b59-a6d2-6b14d2a4a2a1"
+        cache_1 = self._get_tiered_cache("tiered_invalidation_1")
+        cache_2 = self._get_tiered_cache("tiered_invalidation_2")
+
+        async def scenario():
+            await cache_1.async_connect()
+            await cache_2.async_connect()
+
+            try:
+                await cache_1.async_set(test_key, 1)
+                assert await cache_2.async_get(test_key) == 1
+                assert await cache_2.l1.async_get(test_key) == 1
+
+                await cache_1.async_set(test_key, 2)
+                with anyio.fail_after(2):
+                    while await cache_2.l1.async_has_key(test_key):
+                        await anyio.sleep(0.01)
+
+                assert await cache_2.async_get(test_key) == 2
+                assert await cache_1.l1.async_get(test_key) == 2
+            finally:
+                await cache_2.async_disconnect()
+                await cache_1.async_disconnect()
+                await cache_1.async_delete(test_key)
+
+        await_(scenario())
+
+    def test_tiered_cache_key_options_rejected(self):
+        with pytest.raises(ImproperlyConfigured):
+            TieredCache({"L2": "default", "VERSION": 2})
+
+    def test_tiered_cache_incr_version(self):
+        test_key = "9c1f6b2e-tiered-incr-version"
+        cache = self._get_tiered_cache("tiered_incr_version")
+
+        await_(cache.async_set(test_key, "value", timeout=10))
+        assert await_(cache.async_incr_version(test_key)) == 1
+        assert await_(cache.async_get(test_key)) is None
+        assert await_(cache.l1.async_get(test_key)) is None
+        assert await_(cache.async_get(test_key, version=1)) == "value"
+        await_(cache.async_delete(test_key, version=1))
+
+    def test_tiered_cache_default_version(self, monkeypatch):
+        test_key = "b4e1d7a2-tiered-default-version"
+        cache = self._get_tiered_cache("tiered_default_version")
+        monkeypatch.setattr(cache.l2, "version", 3)
+
+        await_(cache.async_set(test_key, "value", timeout=10))
+        assert await_(cache.l1.async_get(test_key, version=3)) == "value"
+        assert await_(cache.async_get(test_key, version=3)) == "value"
+
+        await_(cache.async_delete(test_key, version=3))
+        assert await_(cache.async_get(test_key)) is None
+
+    def test_tiered_cache_invalid_messages(self):
+        test_key = "3f6d9a1b-tiered-invalid-messages"
+        cache_1 = self._get_tiered_cache("tiered_invalid_messages_1")
+        cache_2 = self._get_tiered_cache("tiered_invalid_messages_2")
+
+        async def scenario():
+            await cache_1.async_connect()
+            await cache_2.async_connect()
+
+            try:
+                await cache_1.async_set(test_key, 1)
+                assert await cache_2.async_get(test_key) == 1
+
+                for message in ("not json", "[1]", json.dumps({"keys": 5})):
+                    await cache_1._channel.publish(cache_1.invalidation_group, message)
+
+                await cache_1.async_set(test_key, 2)
+                # Invalidation of the first set may be received before invalid messages
+                with anyio.fail_after(2):
+                    while (
+                        await cache_2.l1.async_has_key(test_key)
+                        or log_warning.call_count < 2
+                        or not log_exception.called
+                    ):
+                        await anyio.sleep(0.01)
+            finally:
+                await cache_2.async_disconnect()
+                await cache_1.async_disconnect()
+                await cache_1.async_delete(test_key)
+
+        with patch.object(tiered.logger, "warning") as log_warning, patch.object(
+            tiered.logger, "exception"
+        ) as log_exception:
+            await_(scenario())
+
+        # Messages are received by listeners of both caches
+        assert log_warning.call_count >= 2
+        assert log_exception.called
+
+    @pytest.mark.parametrize("error", [ListenerClosed, RuntimeError])
+    def test_tiered_cache_listener_reconnects(self, error):
+        test_key = "7a2e4c8d-tiered-reconnect"
+        cache_1 = self._get_tiered_cache("tiered_reconnect_1")
+        cache_2 = self._get_tiered_cache("tiered_reconnect_2")
+        cache_2.min_reconnect_delay = 0.01
+
+        layer = cache_2._channel_layer
+        next_published = layer.next_published
+        errors = [error()]
+
+        async def failing_next_published():
+            if errors:
+                raise errors.pop()
+            return await next_published()
+
+        async def scenario():
+            await cache_1.async_connect()
+            await cache_2.async_connect()
+
+            try:
+                with anyio.fail_after(2):
+                    while errors or cache_2._channel is None:
+                        await anyio.sleep(0.01)
+
+                await cache_1.async_set(test_key, 1)
+                assert await cache_2.async_get(test_key) == 1
+                await cache_1.async_set(test_key, 2)
+                with anyio.fail_after(2):
+                    while await cache_2.l1.async_has_key(test_key):
+                        await anyio.sleep(0.01)
+            finally:
+                await cache_2.async_disconnect()
+                await cache_1.async_disconnect()
+                await cache_1.async_delete(test_key)
+
+        with patch.object(layer, "next_published", failing_next_published), patch.object(
+            tiered.logger, "warning"
+        ), patch.object(tiered.logger, "exception"):
+            await_(scenario())
@@ -5,7 +5,7 @@ import pytest
 
 from starlette_web.common.caches.base import BaseCache
 from starlette_web.tests.helpers import await_
-from starlette_web.common.caches.base import CacheLockError
+from starlette_web.common.caches.base import CacheError, CacheLockError
 
 
 class BaseCacheTester:
@@ -70,6 +70,42 @@ class BaseCacheTester:
         keys = await_(cache.async_keys("2a8006ac-e296-486e-8044-b27517*"))
         assert len(keys) == 1
 
+    def _run_cache_get_or_set_test(self, cache: BaseCache, use_lock: bool = False):
+        test_key = "5d0b6a8e-1ba4-4ae0-9d36-4fb7a5a1c3e0"
+        await_(cache.async_delete(test_key))
+        factory_calls = []
+        results = []
+
+        async def factory():
+            factory_calls.append(1)
+            await anyio.sleep(0.1)
+            return len(factory_calls)
+
+        async def get_or_set():
+            results.append(
+                await cache.async_get_or_set(test_key, factory, timeout=2, use_lock=use_lock)
+            )
+
+        async def gather_coroutines():
+            async with anyio.create_task_group() as nursery:
+                for _ in range(5):
+                    nursery.start_soon(get_or_set)
+
+        await_(gather_coroutines())
+        assert len(factory_calls) == 1
+        assert results == [1] * 5
+        assert await_(cache.async_get(test_key)) == 1
+
+        # Probabilistic early refresh with high beta recomputes value almost certainly
+        await_(cache.async_delete(test_key))
+        await_(cache.async_get_or_set(test_key, factory, timeout=2, early_refresh_beta=1.0))
+        value = await_(
+            cache.async_get_or_set(test_key, factory, timeout=2, early_refresh_beta=1e9)
+        )
+        assert value == 3
+        assert len(factory_calls) == 3
+        await_(cache.async_delete(test_key))
+
     def _run_cache_lock_test(self, cache: BaseCache):
         async def lock_checker():
             async with cache.lock("test_lock", timeout=0.5):
@@ -108,3 +144,77 @@ class BaseCacheTester:
 
         expected_runtime = (sleep_time + (number_of_tests - 1) * timeout)
         assert abs(run_time - expected_runtime) < 0.2
+
+    def _run_cache_versioning_test(self, cache: BaseCache, other_cache: BaseCache):
+        # other_cache shares storage with cache, but has a different KEY_PREFIX
+        test_key = "5c1f0e52-versioning"
+        await_(cache.async_clear())
+        await_(other_cache.async_clear())
+
+        await_(cache.async_set(test_key, 1, timeout=10))
+        await_(cache.async_set(test_key, 2, timeout=10, version=7))
+        await_(other_cache.async_set(test_key, 3, timeout=10))
+
+        assert await_(cache.async_get(test_key)) == 1
+        assert await_(cache.async_get(test_key, version=7)) == 2
+        assert await_(other_cache.async_get(test_key)) == 3
+        assert await_(cache.async_keys("5c1f0e52-*")) == [test_key]
+        assert await_(cache.async_get_many([test_key], version=7)) == {test_key: 2}
+
+        await_(cache.async_delete(test_key, version=7))
+        assert await_(cache.async_incr_version(test_key)) == (cache.version or 0) + 1
+        assert await_(cache.async_get(test_key)) is None
+        assert await_(cache.async_get(test_key, version=(cache.version or 0) + 1)) == 1
+
+        with pytest.raises(CacheError):
+            await_(cache.async_incr_version("5c1f0e52-missing"))
+
+        # Remaining timeout is kept, version 0 is the same as no version
+        await_(cache.async_set(test_key, 4, timeout=10, version=0))
+        assert await_(cache.async_get(test_key, version=0)) == 4
+        assert await_(cache.async_incr_version(test_key, version=0)) == 1
+        assert 9 < await_(cache.async_ttl(test_key, version=1)) <= 10
+        assert await_(cache.async_decr_version(test_key, version=1)) == 0
+        assert await_(cache.async_get(test_key, version=0)) == 4
+
+        await_(cache.async_clear())
+        assert not await_(cache.async_keys("*", version=(cache.version or 0) + 1))
+        assert await_(other_cache.async_get(test_key)) == 3
+        await_(other_cache.async_clear())
+
+    def _run_cache_counters_test(self, cache: BaseCache):
+        test_key = "0f9a3c2e-counter"
+        await_(cache.async_delete(test_key))
+        assert await_(cache.async_ttl(test_key)) == 0
+        assert not await_(cache.async_touch(test_key, timeout=10))
+
+        assert await_(cache.async_incr(test_key, timeout=0.5)) == 1
+        assert await_(cache.async_incr(test_key, 5)) == 6
+        assert await_(cache.async_decr(test_key, 2)) == 4
+        assert await_(cache.async_get(test_key)) == 4
+        assert 0 < await_(cache.async_ttl(test_key)) <= 0.5
+
+        # Expiration of existing key is not reset by increment
+        time.sleep(0.6)
+        assert await_(cache.async_get(test_key)) is None
+        assert await_(cache.async_incr(test_key)) == 1
+        assert await_(cache.async_ttl(test_key)) is None
+
+        assert await_(cache.async_touch(test_key, timeout=10))
+        assert 9 < await_(cache.async_ttl(test_key)) <= 10
+        assert await_(cache.async_touch(test_key, timeout=None))
+        assert await_(cache.async_ttl(test_key)) is None
+
+        await_(cache.async_set(test_key, "value", timeout=10))
+        with pytest.raises(CacheError):
+            await_(cache.async_incr(test_key))
+        await_(cache.async_delete(test_key))
+
+        # Version counters start from current time, both on read and on bump
+        version = await_(cache.async_get_version(test_key))
+        assert version > 1
+        assert await_(cache.async_get_version(test_key)) == version
+        assert await_(cache.async_bump_version(test_key)) == version + 1
+        await_(cache.async_delete(test_key))
+        assert await_(cache.async_bump_version(test_key)) > version + 1
+        await_(cache.async_delete(test_key))
@@ -1,13 +1,23 @@
+from typing import Tuple
+
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.requests import Request
 
+from starlette_web.common.conf import settings
+from starlette_web.common.database import make_session_maker
+from starlette_web.common.database.profiler import profile_queries
 from starlette_web.common.http.exceptions import (
     AuthenticationRequiredError,
     AuthenticationFailedError,
     PermissionDeniedError,
 )
 from starlette_web.contrib.auth.backend import JWTAuthenticationBackend
+from starlette_web.contrib.auth.identity_cache import (
+    get_auth_identity_cache,
+    invalidate_auth_session,
+    invalidate_auth_user,
+)
 from starlette_web.contrib.auth.models import User, UserSession
 from starlette_web.contrib.auth.permissions import IsSuperuserPermission
 from starlette_web.contrib.auth.utils import (
@@ -121,3 +131,124 @@ class TestBackendAuth:
             await_(IsSuperuserPermission().has_permission(request, scope))
 
         assert err.value.details == "You don't have an admin privileges."
+
+    def _authenticate(self, user: User, user_session: UserSession) -> Tuple[User, int]:
+        session_maker = make_session_maker(use_pool=False)
+
+        async def authenticate():
+            async with session_maker() as db_session:
+                request, scope = self._prepare_request(db_session, user, user_session)
+                with profile_queries() as profile:
+                    backend = JWTAuthenticationBackend(request, scope)
+                    authenticated_user = await backend.authenticate()
+                return authenticated_user, profile.count
+
+        return await_(authenticate())
+
+    def test_check_auth__identity_cache(self, client, user, user_session, monkeypatch):
+        monkeypatch.setattr(settings, "AUTH_IDENTITY_CACHE", "locmem")
+
+        authenticated_user, count = self._authenticate(user, user_session)
+        assert (authenticated_user.email, count) == (user.email, 2)
+        authenticated_user, count = self._authenticate(user, user_session)
+        assert (authenticated_user.email, count) == (user.email, 0)
+
+        await_(invalidate_auth_user(user.id))
+        _, count = self._authenticate(user, user_session)
+        assert count == 2
+
+        await_(invalidate_auth_session(user_session.public_id))
+        _, count = self._authenticate(user, user_session)
+        assert count == 2
+
+    def test_check_auth__identity_cache__no_password(self, client, user, user_session, monkeypatch):
+        monkeypatch.setattr(settings, "AUTH_IDENTITY_CACHE", "locmem")
+        self._authenticate(user, user_session)
+
+        cache = get_auth_identity_cache()
+        entry = await_(cache.cache.async_get(cache._get_session_key(user_session.public_id)))
+        assert entry["user"]["email"] == user.email
+        assert "password" not in entry["user"]
+
+        session_maker = make_session_maker(use_pool=False)
+
+        async def load_password():
+            async with session_maker() as db_session:
+                request, scope = self._prepare_request(db_session, user, user_session)
+                cached_user = await JWTAuthenticationBackend(request, scope).authenticate()
+                assert "password" not in cached_user.__dict__
+                await db_session.refresh(cached_user, ["password"])
+                return cached_user.password
+
+        assert await_(load_password()) == user.password
+
+    def test_check_auth__identity_cache__invalidated_after_commit(
+        self, client, user, user_session, monkeypatch
+    ):
+        monkeypatch.setattr(settings, "AUTH_IDENTITY_CACHE", "locmem")
+        session_maker = make_session_maker(use_pool=False)
+
+        async def sign_out():
+            async with session_maker() as db_session:
+                await UserSession.async_update(
+                    db_session,
+                    filter_kwargs={"id": user_session.id},
+                    update_data={"is_active": False},
+                )
+                await invalidate_auth_session(user_session.public_id, db_session)
+                # Concurrent request caches session, which is still active before commit
+                async with session_maker() as other_db_session:
+                    request, scope = self._prepare_request(other_db_session, user, user_session)
+                    await JWTAuthenticationBackend(request, scope).authenticate()
+                await db_session.commit()
+
+        await_(sign_out())
+        with pytest.raises(AuthenticationFailedError):
+            self._authenticate(user, user_session)
+
+    def test_check_auth__identity_cache__invalidated_during_load(
+        self, client, user, user_session, monkeypatch
+    ):
+        monkeypatch.setattr(settings, "AUTH_IDENTITY_CACHE", "locmem")
+        get_active_user = JWTAuthenticationBackend._get_active_user
+
+        async def get_invalidated_user(backend, user_id, session_id):
+            active_user = await get_active_user(backend, user_id, session_id)
+            # Concurrent request invalidates user, after it is loaded and before it is cached
+            await invalidate_auth_user(user_id)
+            return active_user
+
+        monkeypatch.setattr(JWTAuthenticationBackend, "_get_active_user", get_invalidated_user)
+        self._authenticate(user, user_session)
+
+        monkeypatch.setattr(JWTAuthenticationBackend, "_get_active_user", get_active_user)
+        _, count = self._authenticate(user, user_session)
+        assert count == 2
+
+    def test_check_auth__identity_cache__evicted_version(
+        self, client, user, user_session, monkeypatch
+    ):
+        monkeypatch.setattr(settings, "AUTH_IDENTITY_CACHE", "locmem")
+        self._authenticate(user, user_session)
+
+        cache = get_auth_identity_cache()
+        await_(cache.cache.async_delete(cache._get_user_key(user.id)))
+        await_(invalidate_auth_user(user.id))
+        _, count = self._authenticate(user, user_session)
+        assert count == 2
+
+    def test_check_auth__joined_query(self, client, user, user_session, dbs, monkeypatch):
+        monkeypatch.setattr(settings, "AUTH_JOINED_QUERY", True)
+
+        authenticated_user, count = self._authenticate(user, user_session)
+        assert (authenticated_user.id, count) == (user.id, 1)
+
+        await_(user_session.update(dbs, is_active=False))
+        await_(dbs.commit())
+        with pytest.raises(AuthenticationFailedError) as err:
+            self._authenticate(user, user_session)
+
+        assert err.value.details == (
+            f"Couldn't found active session: user_id={user.id} | "
+            f"session_id='{user_session.public_id}'."
+        )
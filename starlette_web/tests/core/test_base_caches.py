@@ -1,5 +1,22 @@
+import fcntl
+import multiprocessing
+import os
+import tempfile
+import time
+
+import anyio
+import pytest
+
 from starlette_web.common.caches import caches
+from starlette_web.common.caches.base import CacheError, default_key_func
+from starlette_web.common.caches.local_memory import LocalMemoryCache
+from starlette_web.common.caches.shared_memory import SharedMemoryCache
+from starlette_web.common.conf import settings
+from starlette_web.common.files.cache import FileCache
+from starlette_web.common.files.sharded_cache import ShardedFileCache
+from starlette_web.common.http.exceptions import ImproperlyConfigured
 from starlette_web.tests.core.helpers.base_cache_tester import BaseCacheTester
+from starlette_web.tests.helpers import await_
 
 
 class TestFileCache(BaseCacheTester):
@@ -9,6 +26,19 @@ class TestFileCache(BaseCacheTester):
     def test_file_cache_many_ops(self):
         self._run_cache_many_ops_test(caches["files"])
 
+    def test_file_cache_get_or_set(self):
+        self._run_cache_get_or_set_test(caches["files"], use_lock=True)
+
+    def test_file_cache_versioning(self):
+        options = {"CACHE_DIR": settings.CACHES["files"]["OPTIONS"]["CACHE_DIR"]}
+        self._run_cache_versioning_test(
+            FileCache({**options, "KEY_PREFIX": "test_prefix", "VERSION": 3}),
+            FileCache({**options, "KEY_PREFIX": "test_other_prefix"}),
+        )
+
+    def test_file_cache_counters(self):
+        self._run_cache_counters_test(caches["files"])
+
     def test_file_lock(self):
         self._run_cache_lock_test(caches["files"])
 
@@ -17,3 +47,332 @@ class TestFileCache(BaseCacheTester):
 
     def test_file_lock_correct_task_blocking(self):
         self._run_cache_timeouts_test(caches["files"])
+
+
+class TestShardedFileCache(BaseCacheTester):
+    def setup_method(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ShardedFileCache({"CACHE_DIR": self._tmp_dir.name})
+
+    def teardown_method(self):
+        self._tmp_dir.cleanup()
+
+    def test_sharded_file_cache_base_ops(self):
+        self._run_base_cache_test(self.cache)
+
+    def test_sharded_file_cache_many_ops(self):
+        self._run_cache_many_ops_test(self.cache)
+
+    def test_sharded_file_cache_get_or_set(self):
+        self._run_cache_get_or_set_test(self.cache, use_lock=True)
+
+    def test_sharded_file_cache_counters(self):
+        self._run_cache_counters_test(self.cache)
+
+    def test_sharded_file_cache_versioning(self):
+        self._run_cache_versioning_test(
+            ShardedFileCache({"CACHE_DIR": self._tmp_dir.name, "KEY_PREFIX": "test_prefix"}),
+            ShardedFileCache({"CACHE_DIR": self._tmp_dir.name, "KEY_PREFIX": "test_other_prefix"}),
+        )
+
+    def test_sharded_file_cache_layout(self):
+        key = "long_key_" * 100
+        await_(self.cache.async_set(key, 1, timeout=None))
+        path = self.cache._get_path(key)
+        assert path.is_file()
+        assert path.relative_to(self._tmp_dir.name).parts[:2] == (path.name[:2], path.name[2:4])
+        assert await_(self.cache.async_keys("long_key_*")) == [key]
+
+        # Index and files are shared between instances
+        cache = ShardedFileCache({"CACHE_DIR": self._tmp_dir.name})
+        assert await_(cache.async_get(key)) == 1
+
+        await_(self.cache.async_clear())
+        assert not path.exists()
+        assert await_(cache.async_keys("*")) == []
+
+    def test_sharded_file_cache_sweep(self):
+        await_(self.cache.async_set_many({f"key_{i}": i for i in range(10)}, timeout=0.05))
+        await_(self.cache.async_set("key_persistent", 1, timeout=None))
+        time.sleep(0.1)
+
+        # Entry, re-written after expiration, is not swept
+        await_(self.cache.async_set("key_0", 0, timeout=10))
+        assert await_(self.cache.async_sweep()) == 9
+        assert sorted(await_(self.cache.async_keys("key_*"))) == ["key_0", "key_persistent"]
+        assert await_(self.cache.async_get("key_0")) == 0
+        assert not self.cache._get_path("key_1").exists()
+
+    def test_sharded_file_cache_delete_waits_for_shard_lock(self):
+        await_(self.cache.async_set("key", 1, timeout=None))
+        path = self.cache._get_path("key")
+
+        async def delete():
+            async with anyio.create_task_group() as task_group:
+                async with self.cache._get_shard_lock("key"):
+                    task_group.start_soon(self.cache.async_delete, "key")
+                    await anyio.sleep(0.1)
+                    assert path.exists()
+                    assert await self.cache.async_keys("key") == ["key"]
+
+        await_(delete())
+        assert not path.exists()
+        assert await_(self.cache.async_keys("key")) == []
+
+    def test_sharded_file_cache_clear_keeps_other_files(self):
+        await_(self.cache.async_set("key", 1, timeout=None))
+        other_dir = os.path.join(self._tmp_dir.name, "static")
+        os.mkdir(other_dir)
+
+        await_(self.cache.async_clear())
+        assert os.path.isdir(other_dir)
+        assert not self.cache._get_path("key").parent.exists()
+
+    def test_sharded_file_cache_concurrent_writes(self):
+        key = "concurrent_key"
+
+        async def write():
+            async with anyio.create_task_group() as task_group:
+                for idx in range(10):
+                    task_group.start_soon(self.cache.async_incr, key, 1, 50)
+                    task_group.start_soon(self.cache.async_set, key, 0, 100 + idx)
+
+        await_(write())
+
+        # Index and file agree on deadline of key
+        (deadline,) = self.cache._get_connection().execute(
+            "SELECT deadline FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        assert abs(time.time() + await_(self.cache.async_ttl(key)) - deadline) < 0.5
+        assert not [
+            name for name in os.listdir(self.cache._get_path(key).parent)
+            if name.startswith(".tmp-")
+        ]
+
+
+def _set_in_shared_memory_cache(path: str, key: str, value: int):
+    cache = SharedMemoryCache({"name": "test_shm", "PATH": path, "SLOT_COUNT": 64})
+    await_(cache.async_set(key, value))
+    await_(cache.async_incr("counter"))
+
+
+def _hold_shared_memory_lock(path: str, locked, seconds: float):
+    with open(path, "r+b") as file:
+        fcntl.lockf(file.fileno(), fcntl.LOCK_EX)
+        locked.set()
+        time.sleep(seconds)
+        fcntl.lockf(file.fileno(), fcntl.LOCK_UN)
+
+
+class TestSharedMemoryCache(BaseCacheTester):
+    def setup_method(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp_dir.name, "test.cache")
+        self.cache = self._get_cache()
+
+    def teardown_method(self):
+        await_(self.cache.async_disconnect())
+        self._tmp_dir.cleanup()
+
+    def _get_cache(self, **options) -> SharedMemoryCache:
+        return SharedMemoryCache(
+            {"name": "test_shm", "PATH": self.path, "SLOT_COUNT": 64, **options}
+        )
+
+    def test_shared_memory_cache_base_ops(self):
+        self._run_base_cache_test(self.cache)
+
+    def test_shared_memory_cache_many_ops(self):
+        self._run_cache_many_ops_test(self.cache)
+
+    def test_shared_memory_cache_get_or_set(self):
+        self._run_cache_get_or_set_test(self.cache)
+
+    def test_shared_memory_cache_counters(self):
+        self._run_cache_counters_test(self.cache)
+
+    def test_shared_memory_cache_versioning(self):
+        self._run_cache_versioning_test(
+            self._get_cache(KEY_PREFIX="test_prefix"),
+            self._get_cache(KEY_PREFIX="test_other_prefix"),
+        )
+
+    def test_shared_memory_cache_is_shared_between_processes(self):
+        context = multiprocessing.get_context("fork")
+        processes = [
+            context.Process(target=_set_in_shared_memory_cache, args=(self.path, f"key_{i}", i))
+            for i in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            assert process.exitcode == 0
+
+        assert await_(self.cache.async_get_many([f"key_{i}" for i in range(4)])) == {
+            f"key_{i}": i for i in range(4)
+        }
+        assert await_(self.cache.async_get("counter")) == 4
+
+    def test_shared_memory_cache_lock_does_not_block_loop(self):
+        context = multiprocessing.get_context("fork")
+        locked = context.Event()
+        process = context.Process(target=_hold_shared_memory_lock, args=(self.path, locked, 0.3))
+        process.start()
+        assert locked.wait(5)
+
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(time.time())
+                await anyio.sleep(0.01)
+
+        async def scenario():
+            async with anyio.create_task_group() as task_group:
+                task_group.start_soon(tick)
+                await self.cache.async_set("key", 1)
+                task_group.cancel_scope.cancel()
+
+        await_(scenario())
+        process.join()
+
+        # Event loop has been running, while write was waiting for lock of another process
+        assert len(ticks) > 5
+        assert await_(self.cache.async_get("key")) == 1
+
+    def test_shared_memory_cache_disconnect(self):
+        await_(self.cache.async_set("key", 1, timeout=None))
+        mmap, fd = self.cache._mmap, self.cache._fd
+
+        await_(self.cache.async_disconnect())
+        assert mmap.closed
+        with pytest.raises(OSError):
+            os.fstat(fd)
+
+        await_(self.cache.async_connect())
+        assert await_(self.cache.async_get("key")) == 1
+
+    def test_shared_memory_cache_limits(self):
+        path = os.path.join(self._tmp_dir.name, "small.cache")
+        cache = self._get_cache(SLOT_COUNT=4, PROBE_LIMIT=4, PATH=path)
+        evicted = []
+        cache.eviction_callback = evicted.append
+
+        await_(cache.async_set("persistent", 0, timeout=None))
+        for i in range(4):
+            await_(cache.async_set(f"key_{i}", i, timeout=10 + i))
+
+        # Entry with the nearest deadline is evicted
+        assert evicted == [1]
+        assert await_(cache.async_get("key_0")) is None
+        assert await_(cache.async_get("persistent")) == 0
+
+        with pytest.raises(CacheError):
+            await_(cache.async_set("large", b"x" * 8192))
+
+        with pytest.raises(ImproperlyConfigured):
+            self._get_cache(SLOT_COUNT=8, PATH=path)
+
+
+class TestLocalMemoryCache(BaseCacheTester):
+    def test_locmem_cache_base_ops(self):
+        self._run_base_cache_test(caches["locmem"])
+
+    def test_locmem_cache_many_ops(self):
+        self._run_cache_many_ops_test(caches["locmem"])
+
+    def test_locmem_cache_get_or_set(self):
+        self._run_cache_get_or_set_test(caches["locmem"])
+
+    def test_locmem_cache_versioning(self):
+        self._run_cache_versioning_test(
+            LocalMemoryCache({"name": "test_versioning", "KEY_PREFIX": "test_prefix"}),
+            LocalMemoryCache({"name": "test_versioning", "KEY_PREFIX": "test_other_prefix"}),
+        )
+
+    def test_locmem_cache_counters(self):
+        self._run_cache_counters_test(caches["locmem"])
+
+    def test_locmem_lock_free_cache_ops(self):
+        cache = LocalMemoryCache({"name": "test_lock_free", "LOCK_FREE": True})
+        self._run_base_cache_test(cache)
+        self._run_cache_many_ops_test(cache)
+
+    def test_locmem_copy_strategies(self):
+        value = {"items": [1, 2, 3]}
+
+        cache = LocalMemoryCache({"name": "test_copy_none", "COPY_STRATEGY": "none"})
+        self._run_base_cache_test(cache)
+        await_(cache.async_set("key", value))
+        assert await_(cache.async_get("key")) is value
+
+        cache = LocalMemoryCache({"name": "test_copy_shallow", "COPY_STRATEGY": "shallow"})
+        self._run_base_cache_test(cache)
+        await_(cache.async_set("key", value))
+        cached_value = await_(cache.async_get("key"))
+        assert cached_value == value and cached_value is not value
+        assert cached_value["items"] is value["items"]
+
+        cache = LocalMemoryCache({"name": "test_copy_pickle", "COPY_STRATEGY": "pickle"})
+        await_(cache.async_set("key", value))
+        cached_value = await_(cache.async_get("key"))
+        assert cached_value == value and cached_value["items"] is not value["items"]
+
+    def test_locmem_lru_eviction(self):
+        cache = LocalMemoryCache({"name": "test_lru_eviction", "MAX_ENTRIES": 2})
+        await_(cache.async_set("key_1", 1))
+        await_(cache.async_set("key_2", 2))
+        assert await_(cache.async_get("key_1")) == 1
+
+        await_(cache.async_set("key_3", 3))
+        assert await_(cache.async_get_many(["key_1", "key_2", "key_3"])) == {
+            "key_1": 1,
+            "key_2": None,
+            "key_3": 3,
+        }
+
+    def test_locmem_lfu_eviction(self):
+        cache = LocalMemoryCache(
+            {"name": "test_lfu_eviction", "MAX_ENTRIES": 2, "EVICTION_POLICY": "lfu"}
+        )
+        await_(cache.async_set("key_1", 1))
+        await_(cache.async_set("key_2", 2))
+        for _ in range(3):
+            await_(cache.async_get("key_1"))
+        await_(cache.async_get("key_2"))
+
+        await_(cache.async_set("key_3", 3))
+        assert await_(cache.async_has_key("key_1"))
+        assert not await_(cache.async_has_key("key_2"))
+
+    def test_locmem_max_bytes_eviction(self):
+        cache = LocalMemoryCache({"name": "test_max_bytes_eviction", "MAX_BYTES": 2048})
+        for i in range(10):
+            await_(cache.async_set(f"key_{i}", b"x" * 512))
+
+        assert cache._get_total_size() <= 2048
+        assert await_(cache.async_has_key("key_9"))
+        assert not await_(cache.async_has_key("key_0"))
+
+    def test_locmem_expired_entries_are_swept(self):
+        cache = LocalMemoryCache({"name": "test_expired_sweep"})
+        for i in range(10):
+            await_(cache.async_set(f"key_{i}", i, timeout=0.05))
+
+        time.sleep(0.1)
+        await_(cache.async_set("key_persistent", 1, timeout=None))
+        assert list(cache._cache.keys()) == ["key_persistent"]
+        assert not cache._expire_heap
+
+
+def test_default_key_func():
+    assert default_key_func("key", "", None) == "key"
+    assert default_key_func("key", "", 0) == "key"
+    assert default_key_func("key", "", 2) == "2:key"
+    assert default_key_func("key", "prefix", 0) == "prefix:key"
+    assert default_key_func("key", "prefix", 2) == "prefix:2:key"
+
+    cache = LocalMemoryCache({"name": "test_key_func", "KEY_PREFIX": "prefix", "VERSION": 2})
+    assert cache.make_key("key") == "prefix:2:key"
+    assert cache.make_key("key", version=0) == "prefix:key"
@@ -0,0 +1,120 @@
+import pytest
+
+from starlette_web.common.caches import caches
+from starlette_web.common.caches.local_memory import LocalMemoryCache
+from starlette_web.common.caches.metrics import (
+    BaseCacheMetricsExporter,
+    CacheMetrics,
+    InstrumentedCache,
+)
+from starlette_web.tests.core.helpers.base_cache_tester import BaseCacheTester
+from starlette_web.tests.helpers import await_
+
+
+class ListExporter(BaseCacheMetricsExporter):
+    def __init__(self):
+        self.operations = []
+
+    def observe_operation(self, alias, operation, duration, hits=0, misses=0, error=False):
+        self.operations.append((alias, operation, hits, misses, error))
+
+
+class FailingExporter(BaseCacheMetricsExporter):
+    def observe_operation(self, *args, **kwargs):
+        raise RuntimeError
+
+
+class TestCacheMetrics(BaseCacheTester):
+    def _get_cache(self, name: str, **options) -> InstrumentedCache:
+        metrics = CacheMetrics()
+        metrics._exporters = []
+        return InstrumentedCache(LocalMemoryCache({"name": name, **options}), name, metrics)
+
+    def test_instrumented_cache_ops(self):
+        cache = self._get_cache("test_instrumented_ops")
+        self._run_base_cache_test(cache)
+        self._run_cache_many_ops_test(cache)
+        self._run_cache_get_or_set_test(cache)
+        self._run_cache_counters_test(cache)
+
+    def test_cache_metrics_snapshot(self):
+        cache = self._get_cache("test_metrics_snapshot", MAX_ENTRIES=2)
+        await_(cache.async_set("key_1", b"x" * 100))
+        await_(cache.async_get("key_1"))
+        await_(cache.async_get("key_2"))
+        await_(cache.async_get_many(["key_1", "key_2", "key_3"]))
+        await_(cache.async_set_many({"key_2": 2, "key_3": 3}))
+
+        async def factory():
+            return 1
+
+        await_(cache.async_get_or_set("key_4", factory))
+        await_(cache.async_get_or_set("key_4", factory))
+
+        snapshot = cache.metrics.snapshot()["test_metrics_snapshot"]
+        assert snapshot["hits"] == 3
+        assert snapshot["misses"] == 4
+        assert snapshot["evictions"] == 2
+        assert snapshot["bytes_out"] > 100
+        assert snapshot["bytes_in"] > 100
+
+        operations = snapshot["operations"]
+        assert operations["get"]["calls"] == 2
+        assert operations["get"]["hits"] == 1
+        assert operations["get_many"]["misses"] == 2
+        assert operations["set"]["calls"] == 1
+        assert operations["get_or_set"]["hits"] == 1
+        assert sum(operations["set_many"]["latency_buckets"].values()) == 1
+
+        cache.metrics.reset()
+        assert cache.metrics.snapshot() == {}
+
+    def test_instrumented_cache_versions(self):
+        cache = self._get_cache("test_instrumented_versions")
+        await_(cache.async_set("key", 1, timeout=10))
+        assert await_(cache.async_incr_version("key")) == 1
+        assert await_(cache.async_decr_version("key", version=1)) == 0
+        assert await_(cache.async_decr("key")) == 0
+
+        version = await_(cache.async_get_version("version_key"))
+        assert await_(cache.async_get_version("version_key")) == version
+        assert await_(cache.async_bump_version("version_key")) == version + 1
+
+        # Calls are forwarded to wrapped cache, so they are recorded once
+        operations = cache.metrics.snapshot()["test_instrumented_versions"]["operations"]
+        assert {
+            operation: metrics["calls"]
+            for operation, metrics in operations.items()
+            if operation != "set"
+        } == {
+            "incr_version": 1,
+            "decr_version": 1,
+            "decr": 1,
+            "get_version": 2,
+            "bump_version": 1,
+        }
+
+    def test_cache_metrics_exporters(self):
+        cache = self._get_cache("test_metrics_exporters")
+        exporter = ListExporter()
+        cache.metrics._exporters = [FailingExporter(), exporter]
+
+        await_(cache.async_set("key", 1))
+        await_(cache.async_get("key"))
+        await_(cache.async_set("text", "value"))
+        with pytest.raises(Exception):
+            await_(cache.async_incr("text"))
+
+        assert exporter.operations == [
+            ("test_metrics_exporters", "set", 0, 0, False),
+            ("test_metrics_exporters", "get", 1, 0, False),
+            ("test_metrics_exporters", "set", 0, 0, False),
+            ("test_metrics_exporters", "incr", 0, 0, True),
+        ]
+
+    def test_instrumented_alias(self):
+        cache = caches["locmem"]
+        assert isinstance(cache, InstrumentedCache)
+
+        await_(cache.async_get("6b1e2a55-instrumented-alias"))
+        assert caches.metrics.snapshot()["locmem"]["operations"]["get"]["misses"] >= 1
@@ -0,0 +1,91 @@
+import uuid
+
+import pytest
+from sqlalchemy import Column, ForeignKey, Integer, String, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import declarative_base, relationship
+
+from starlette_web.common.database import FilterOperator, ModelMixin, filter_operators
+from starlette_web.contrib.auth.models import User
+from starlette_web.tests.helpers import await_
+
+
+def _create_users(dbs: AsyncSession, emails):
+    password = User.make_password(str(uuid.uuid4()))
+    data = [{"email": email, "password": password} for email in emails]
+    return await_(User.async_bulk_create(db_session=dbs, data=data)), password
+
+
+def _filter_emails(dbs: AsyncSession, password, **filter_kwargs):
+    users = await_(User.async_filter(db_session=dbs, password=password, **filter_kwargs))
+    return sorted(user.email for user in users)
+
+
+def test_filter_operators__comparison(dbs: AsyncSession):
+    users, password = _create_users(dbs, [f"{uuid.uuid4().hex}@test.com" for _ in range(4)])
+    ids = [user.id for user in users]
+    emails = [user.email for user in users]
+
+    assert _filter_emails(dbs, password, id__gte=ids[2]) == sorted(emails[2:])
+    assert _filter_emails(dbs, password, id__lte=ids[1]) == sorted(emails[:2])
+    assert _filter_emails(dbs, password, id__range=(ids[1], ids[2])) == sorted(emails[1:3])
+    assert _filter_emails(dbs, password, id__notin=ids[1:]) == emails[:1]
+    assert _filter_emails(dbs, password, email__isnull=True) == []
+    assert _filter_emails(dbs, password, email__isnull=False) == sorted(emails)
+
+
+def test_filter_operators__like(dbs: AsyncSession):
+    prefix = uuid.uuid4().hex[:10]
+    emails = [f"{prefix}_a@test.com", f"{prefix}%b@test.com", f"{prefix.upper()}xc@test.com"]
+    _, password = _create_users(dbs, emails)
+
+    assert _filter_emails(dbs, password, email__startswith=prefix) == sorted(emails[:2])
+    # LIKE wildcards are escaped
+    assert _filter_emails(dbs, password, email__startswith=f"{prefix}%") == [emails[1]]
+    assert _filter_emails(dbs, password, email__istartswith=prefix) == sorted(emails)
+    assert _filter_emails(dbs, password, email__contains="_a@") == [emails[0]]
+    assert _filter_emails(dbs, password, email__icontains=f"{prefix}X") == [emails[2]]
+
+
+def test_filter_operators__register(dbs: AsyncSession):
+    users, password = _create_users(dbs, [f"{uuid.uuid4().hex}@test.com" for _ in range(2)])
+
+    with pytest.raises(NotImplementedError):
+        _filter_emails(dbs, password, email__endswith="@test.com")
+
+    filter_operators.register(
+        "endswith",
+        FilterOperator(
+            lambda column, value: column.like(value),
+            prepare=lambda value: f"%{value}",
+        ),
+    )
+    try:
+        assert len(_filter_emails(dbs, password, email__endswith=users[0].email[-12:])) == 1
+    finally:
+        filter_operators.unregister("endswith")
+
+    with pytest.raises(NotImplementedError):
+        _filter_emails(dbs, password, email__endswith="@test.com")
+
+
+def test_filter_operators__exists():
+    Base = declarative_base()
+
+    class Author(Base, ModelMixin):
+        __tablename__ = "test_authors"
+        id = Column(Integer, primary_key=True)
+        books = relationship("Book", back_populates="author")
+
+    class Book(Base, ModelMixin):
+        __tablename__ = "test_books"
+        id = Column(Integer, primary_key=True)
+        title = Column(String)
+        author_id = Column(Integer, ForeignKey("test_authors.id"))
+        author = relationship("Author", back_populates="books")
+
+    query = select(Author).where(Author._filter_criteria({"books__exists": True}))
+    assert "EXISTS (SELECT 1" in str(query)
+
+    query = select(Book).where(Book._filter_criteria({"author__exists": False}))
+    assert "NOT (EXISTS (SELECT 1" in str(query)
@@ -0,0 +1,64 @@
+from sqlalchemy import text
+
+from starlette_web.common.database import LazySession, make_session_maker, session_makers
+from starlette_web.tests.helpers import await_
+
+
+def test_lazy_session__not_created():
+    session_maker = make_session_maker(use_pool=False)
+    created = []
+
+    def _session_maker():
+        created.append(True)
+        return session_maker()
+
+    async def run_session():
+        async with LazySession(_session_maker) as session:
+            await session.commit()
+            await session.rollback()
+            assert not session.is_created
+
+    await_(run_session())
+    assert created == []
+
+
+def test_lazy_session__created_on_access():
+    session_maker = make_session_maker(use_pool=False)
+
+    async def run_session():
+        async with LazySession(session_maker) as session:
+            assert not session.is_created
+            result = await session.execute(text("SELECT 1"))
+            assert result.scalar() == 1
+            assert session.is_created
+
+            await session.commit()
+            await session.close()
+            assert not session.is_created
+
+            # Session is created again, once it is used after close
+            assert (await session.execute(text("SELECT 2"))).scalar() == 2
+            assert session.is_created
+
+        assert not session.is_created
+
+    await_(run_session())
+
+
+def test_lazy_session__endpoint_without_database(client, monkeypatch):
+    created = []
+
+    def _session_maker():
+        created.append(True)
+        return session_makers.get(use_pool=client.app.use_pool)()
+
+    # Overrides session maker of registry, see WebApp.session_maker
+    monkeypatch.setattr(client.app, "_session_maker", _session_maker)
+
+    response = client.get("/openapi/schema/")
+    assert response.status_code == 200
+    assert created == []
+
+    response = client.get("/health_check/")
+    assert response.status_code == 200
+    assert created == [True]
@@ -140,3 +140,199 @@ def test_async_get_or_create(dbs: AsyncSession):
     assert type(user) == User
     assert user.is_superuser
     assert user.id is not None
+
+
+def _get_bulk_data(count: int):
+    password = User.make_password(str(uuid.uuid4()))
+    return [
+        {"email": str(uuid.uuid4()).replace("-", "") + "@test.com", "password": password}
+        for _ in range(count)
+    ]
+
+
+def test_async_bulk_create(dbs: AsyncSession):
+    data = _get_bulk_data(5)
+    users = await_(User.async_bulk_create(db_session=dbs, data=data, batch_size=2))
+    assert [user.email for user in users] == [row["email"] for row in data]
+    assert all(type(user) == User and user.id is not None for user in users)
+
+    user = await_(User.async_get(db_session=dbs, email=data[-1]["email"]))
+    assert user.id == users[-1].id
+    assert await_(User.async_bulk_create(db_session=dbs, data=[])) == []
+
+
+def test_async_bulk_update(dbs: AsyncSession):
+    users = await_(User.async_bulk_create(db_session=dbs, data=_get_bulk_data(3)))
+    password = User.make_password(str(uuid.uuid4()))
+
+    await_(
+        User.async_bulk_update(
+            db_session=dbs,
+            data=[{"id": user.id, "password": password} for user in users[:2]],
+            batch_size=1,
+        )
+    )
+    users = (await_(User.async_filter(db_session=dbs, id__in=[user.id for user in users]))).all()
+    assert sorted(user.password == password for user in users) == [False, True, True]
+
+
+def test_async_bulk_upsert(dbs: AsyncSession):
+    users = await_(User.async_bulk_create(db_session=dbs, data=_get_bulk_data(2)))
+    password = User.make_password(str(uuid.uuid4()))
+
+    data = [{"email": users[1].email, "password": password}, *_get_bulk_data(2)]
+    upserted = await_(
+        User.async_bulk_upsert(
+            db_session=dbs,
+            data=data,
+            index_elements=["email"],
+            update_fields=["password"],
+            batch_size=2,
+        )
+    )
+    assert [user.email for user in upserted] == [row["email"] for row in data]
+    assert upserted[0].id == users[1].id
+    assert upserted[0].password == password
+    assert upserted[1].id is not None
+
+    user = await_(User.async_get(db_session=dbs, id=users[0].id))
+    assert user.password != password
+
+
+def test_async_bulk_upsert__fallback(dbs: AsyncSession, monkeypatch):
+    from starlette_web.common.database import model_mixin
+
+    monkeypatch.setattr(model_mixin, "UPSERT_DIALECTS", {})
+    users = await_(User.async_bulk_create(db_session=dbs, data=_get_bulk_data(1)))
+    password = User.make_password(str(uuid.uuid4()))
+
+    data = [*_get_bulk_data(1), {"email": users[0].email, "password": password}]
+    upserted = await_(
+        User.async_bulk_upsert(db_session=dbs, data=data, index_elements=["email"])
+    )
+    assert [user.email for user in upserted] == [row["email"] for row in data]
+    assert upserted[1].id == users[0].id
+
+    user = await_(User.async_get(db_session=dbs, id=users[0].id))
+    assert user.password == password
+
+
+def test_async_stream(dbs: AsyncSession):
+    data = _get_bulk_data(5)
+    users = await_(User.async_bulk_create(db_session=dbs, data=data))
+
+    async def stream_users():
+        return [
+            user
+            async for user in User.async_stream(
+                db_session=dbs, yield_per=2, password=data[0]["password"], order_by=("id",)
+            )
+        ]
+
+    assert [user.id for user in await_(stream_users())] == [user.id for user in users]
+
+
+def test_async_iter(dbs: AsyncSession):
+    data = _get_bulk_data(7)
+    for idx, row in enumerate(data):
+        row["is_active"] = idx % 2 == 0
+    users = await_(User.async_bulk_create(db_session=dbs, data=data))
+
+    async def iter_users(**kwargs):
+        return [
+            user
+            async for user in User.async_iter(
+                db_session=dbs, page_size=2, password=data[0]["password"], **kwargs
+            )
+        ]
+
+    expected = sorted(users, key=lambda user: user.id)
+    assert [user.id for user in await_(iter_users(order_by=("id",)))] == [
+        user.id for user in expected
+    ]
+
+    # Mixed directions, primary key is appended as a tie-breaker
+    expected = sorted(users, key=lambda user: (not user.is_active, user.id))
+    assert [user.id for user in await_(iter_users(order_by=("-is_active",)))] == [
+        user.id for user in expected
+    ]
+
+
+def test_prepare_query_with_params(dbs: AsyncSession):
+    users = await_(User.async_bulk_create(db_session=dbs, data=_get_bulk_data(3)))
+
+    query, params = User.prepare_query_with_params(email=users[0].email, is_active__is=True)
+    other_query, other_params = User.prepare_query_with_params(
+        email=users[1].email, is_active__is=True
+    )
+    assert query is other_query
+    assert params == {"filter_0": users[0].email}
+    assert other_params == {"filter_0": users[1].email}
+
+    # Values of literal criteria are a part of statement
+    query, _ = User.prepare_query_with_params(email=users[0].email, is_active__is=False)
+    assert query is not other_query
+    # ...as well as their types, since True == 1 == 1.0
+    query, _ = User.prepare_query_with_params(email=users[0].email, is_active__is=1)
+    assert query is not other_query
+
+    # Both bounds of range are bound parameters
+    query, params = User.prepare_query_with_params(id__range=(1, 2))
+    other_query, other_params = User.prepare_query_with_params(id__range=[3, 4])
+    assert query is other_query
+    assert params == {"filter_0_0": 1, "filter_0_1": 2}
+    assert other_params == {"filter_0_0": 3, "filter_0_1": 4}
+
+    user_ids = [user.id for user in users]
+    found = await_(
+        User.async_filter(db_session=dbs, id__in=user_ids[:2], email__icontains="@", limit=5)
+    ).all()
+    assert sorted(user.id for user in found) == user_ids[:2]
+
+    found = await_(User.async_filter(db_session=dbs, id__in=user_ids, limit=1, offset=2)).all()
+    assert [user.id for user in found] == user_ids[2:]
+
+    user = await_(User.async_get(db_session=dbs, id=user_ids[1], is_active__is=True))
+    assert user.id == user_ids[1]
+
+
+def test_async_filter__projections(dbs: AsyncSession):
+    users = await_(User.async_bulk_create(db_session=dbs, data=_get_bulk_data(3)))
+    user_ids = [user.id for user in users]
+
+    rows = await_(
+        User.async_filter(db_session=dbs, id__in=user_ids, fields=["id", "email"])
+    ).all()
+    assert sorted((dict(row) for row in rows), key=lambda row: row["id"]) == [
+        {"id": user.id, "email": user.email} for user in users
+    ]
+
+    row = await_(User.async_get(db_session=dbs, id=user_ids[0], fields=["email"]))
+    assert dict(row) == {"email": users[0].email}
+    assert await_(User.async_get(db_session=dbs, id=-1, fields=["email"])) is None
+
+    dbs.expunge_all()
+    user = await_(User.async_get(db_session=dbs, id=user_ids[0], defer=["password"]))
+    assert user.email == users[0].email
+    assert "password" not in user.to_dict()
+
+
+def test_async_iter__projections(dbs: AsyncSession):
+    data = _get_bulk_data(5)
+    users = await_(User.async_bulk_create(db_session=dbs, data=data))
+
+    async def iter_rows():
+        return [
+            row
+            async for row in User.async_iter(
+                db_session=dbs,
+                page_size=2,
+                order_by=("-id",),
+                fields=["email"],
+                password=data[0]["password"],
+            )
+        ]
+
+    assert [dict(row) for row in await_(iter_rows())] == [
+        {"email": user.email, "id": user.id} for user in reversed(users)
+    ]
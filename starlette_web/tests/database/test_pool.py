@@ -0,0 +1,83 @@
+from sqlalchemy import text
+
+from starlette_web.common.conf import settings
+from starlette_web.common.database.pool import (
+    AdaptiveOverflowPolicy,
+    ObservedAsyncQueuePool,
+    get_pool_metrics,
+    prewarm_pool,
+)
+from starlette_web.common.database.session_maker import make_engine
+from starlette_web.tests.helpers import await_
+
+
+def test_pool_metrics():
+    engine = make_engine(settings.DATABASE_DSN)
+
+    async def run_queries():
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            metrics = get_pool_metrics(engine)
+            assert metrics["checked_out"] == 1
+
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+        await engine.dispose()
+
+    await_(run_queries())
+
+    metrics = get_pool_metrics(engine)
+    assert metrics["alias"] == "default"
+    assert metrics["checked_out"] == 0
+    assert metrics["checkouts"] == 2
+    assert metrics["max_wait"] >= metrics["average_wait"] > 0
+    # Second checkout reuses connection of the first one
+    assert metrics["max_age"] > 0
+
+
+def test_pool_metrics__without_pool():
+    engine = make_engine(settings.DATABASE_DSN, use_pool=False)
+    assert get_pool_metrics(engine) is None
+
+
+def test_prewarm_pool(monkeypatch):
+    monkeypatch.setitem(settings.DATABASE, "pool_min_size", 3)
+    engine = make_engine(settings.DATABASE_DSN)
+
+    async def prewarm():
+        await prewarm_pool(engine, 5)
+        checked_in = engine.pool.checkedin()
+        await engine.dispose()
+        return checked_in
+
+    assert await_(prewarm()) == 3
+
+
+def test_adaptive_overflow_policy():
+    pool = ObservedAsyncQueuePool(lambda: None, pool_size=1, max_overflow=1)
+    policy = AdaptiveOverflowPolicy(max_overflow=3, target_wait=0.05, step=1)
+
+    for average_wait, peak_overflow, expected in (
+        (0.1, 0, 2),
+        (0.1, 2, 3),
+        (0.1, 3, 3),
+        # Overflow connections are in use, max_overflow is kept
+        (0.0, 3, 3),
+        (0.0, 0, 2),
+        (0.0, 0, 1),
+        (0.0, 0, 1),
+    ):
+        policy.adjust(pool, average_wait, peak_overflow)
+        assert pool._max_overflow == expected
+
+    # Engine.dispose() keeps adjusted value
+    policy.adjust(pool, 0.1, 0)
+    assert pool.recreate()._max_overflow == 2
+
+
+def test_adaptive_overflow_policy__from_options():
+    assert AdaptiveOverflowPolicy.from_options(None) is None
+
+    policy = AdaptiveOverflowPolicy.from_options({"MAX_OVERFLOW": 8, "WINDOW": 10})
+    assert (policy.max_overflow, policy.window, policy.step) == (8, 10, 1)
@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+from sqlalchemy import text
+
+from starlette_web.common.conf import settings
+from starlette_web.common.database import make_session_maker
+from starlette_web.common.database import profiler
+from starlette_web.common.database.profiler import (
+    QueryProfile,
+    get_current_query_profile,
+    profile_queries,
+)
+from starlette_web.contrib.auth.models import User
+from starlette_web.tests.helpers import await_
+
+
+def test_query_profile():
+    profile = QueryProfile(max_slowest=2)
+    profile.record("SELECT 1", 0.1)
+    profile.record("SELECT 2", 0.3)
+    profile.record("SELECT 1", 0.2)
+
+    assert profile.count == 3
+    assert abs(profile.total_time - 0.6) < 1e-9
+    assert profile.slowest == [("SELECT 2", 0.3), ("SELECT 1", 0.2)]
+    assert profile.get_repeated_statements(2) == {"SELECT 1": 2}
+    assert profile.get_server_timing() == 'db;dur=600.00;desc="3 queries"'
+
+
+def test_profile_queries(monkeypatch):
+    monkeypatch.setattr(settings, "DB_PROFILER_REPEATED_STATEMENTS", 3)
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_THRESHOLD", 0.05)
+    session_maker = make_session_maker(use_pool=False)
+
+    async def run_queries():
+        async with session_maker() as session:
+            for user_id in range(3):
+                await User.async_get(session, id=user_id)
+            await session.execute(text("SELECT pg_sleep(0.06)"))
+
+    with patch.object(profiler.logger, "warning") as mock_warning:
+        with profile_queries("test") as profile:
+            assert get_current_query_profile() is profile
+            await_(run_queries())
+
+    assert get_current_query_profile() is None
+    assert profile.count == 4
+    assert profile.slowest[0][0] == "SELECT pg_sleep(0.06)"
+    assert len(profile.get_repeated_statements(3)) == 1
+
+    messages = [call.args[0] % call.args[1:] for call in mock_warning.call_args_list]
+    assert any(message.startswith("Slow query") for message in messages)
+    assert any("executed 3 times in test" in message for message in messages)
+
+
+def test_profile_queries__endpoint(client, monkeypatch):
+    monkeypatch.setattr(settings, "DB_PROFILE_QUERIES", True)
+    monkeypatch.setattr(settings, "DB_PROFILER_SERVER_TIMING", True)
+    response = client.get("/health_check/")
+    assert response.status_code == 200
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert response.headers["server-timing"].endswith('desc="1 queries"')
@@ -0,0 +1,153 @@
+import uuid
+
+import pytest
+
+from starlette_web.common.caches import caches
+from starlette_web.common.caches.base import CacheError
+from starlette_web.common.database import make_session_maker
+from starlette_web.common.database.profiler import profile_queries
+from starlette_web.common.database.result_cache import _get_version_key, invalidate_result_cache
+from starlette_web.contrib.auth.models import User
+from starlette_web.tests.helpers import await_
+
+
+@pytest.fixture
+def cached_user_model(monkeypatch):
+    monkeypatch.setattr(User.Meta, "cache_ttl", 60, raising=False)
+    monkeypatch.setattr(User.Meta, "cache_alias", "locmem", raising=False)
+
+
+def _create_user(session_maker) -> User:
+    async def create_user():
+        async with session_maker() as session:
+            return await User.async_create(
+                session,
+                db_commit=True,
+                email=f"u_{uuid.uuid4().hex[:10]}@test.com",
+                password="password",
+            )
+
+    return await_(create_user())
+
+
+def _get_user(session_maker, **filter_kwargs):
+    async def get_user():
+        async with session_maker() as session:
+            with profile_queries() as profile:
+                user = await User.async_get(session, **filter_kwargs)
+            return user, profile.count
+
+    return await_(get_user())
+
+
+def test_result_cache(cached_user_model):
+    session_maker = make_session_maker(use_pool=False)
+    user = _create_user(session_maker)
+
+    cached_user, count = _get_user(session_maker, id=user.id)
+    assert (cached_user.email, count) == (user.email, 1)
+
+    cached_user, count = _get_user(session_maker, id=user.id)
+    assert (cached_user.email, count) == (user.email, 0)
+
+    # Values of parameters are part of key
+    _, count = _get_user(session_maker, id=user.id + 1)
+    assert count == 1
+
+    row, count = _get_user(session_maker, id=user.id, fields=["email"])
+    assert (row["email"], count) == (user.email, 1)
+    row, count = _get_user(session_maker, id=user.id, fields=["email"])
+    assert (row["email"], count) == (user.email, 0)
+
+
+def test_result_cache__invalidated_by_writes(cached_user_model):
+    session_maker = make_session_maker(use_pool=False)
+    user = _create_user(session_maker)
+    _get_user(session_maker, id=user.id)
+
+    async def update_user():
+        async with session_maker() as session:
+            await User.async_update(
+                session, filter_kwargs={"id": user.id}, update_data={"is_active": False}
+            )
+            # Session, which has written model, bypasses cache
+            with profile_queries() as profile:
+                updated_user = await User.async_get(session, id=user.id)
+            assert (updated_user.is_active, profile.count) == (False, 1)
+            await session.commit()
+
+    await_(update_user())
+
+    cached_user, count = _get_user(session_maker, id=user.id)
+    assert (cached_user.is_active, count) == (False, 1)
+
+    async def delete_user():
+        async with session_maker() as session:
+            instance = await User.async_get(session, id=user.id)
+            await instance.delete(session, db_commit=True)
+
+    await_(delete_user())
+
+    cached_user, count = _get_user(session_maker, id=user.id)
+    assert (cached_user, count) == (None, 1)
+
+
+def test_result_cache__disabled():
+    session_maker = make_session_maker(use_pool=False)
+    user = _create_user(session_maker)
+
+    _get_user(session_maker, id=user.id)
+    _, count = _get_user(session_maker, id=user.id)
+    assert count == 1
+
+
+def test_result_cache__invalidated_after_commit(cached_user_model):
+    session_maker = make_session_maker(use_pool=False)
+    user = _create_user(session_maker)
+    _get_user(session_maker, id=user.id)
+
+    session = session_maker()
+    instance = await_(User.async_get(session, id=user.id))
+    await_(instance.update(session, is_active=False))
+    _, count = _get_user(session_maker, id=user.id)
+    assert count == 0
+
+    await_(session.rollback())
+    _, count = _get_user(session_maker, id=user.id)
+    assert count == 0
+
+    # Instance is expired by rollback
+    instance = await_(User.async_get(session, id=user.id))
+    await_(instance.update(session, is_active=False))
+    await_(session.commit())
+    await_(session.close())
+    cached_user, count = _get_user(session_maker, id=user.id)
+    assert (cached_user.is_active, count) == (False, 1)
+
+
+def test_result_cache__unavailable_cache(cached_user_model, monkeypatch):
+    session_maker = make_session_maker(use_pool=False)
+    user = _create_user(session_maker)
+
+    async def get_many(*args, **kwargs):
+        raise CacheError("Cache is not available")
+
+    monkeypatch.setattr(caches["locmem"], "async_get_many", get_many)
+    cached_user, count = _get_user(session_maker, id=user.id)
+    assert (cached_user.email, count) == (user.email, 1)
+
+
+def test_result_cache__evicted_version(cached_user_model):
+    session_maker = make_session_maker(use_pool=False)
+    user = _create_user(session_maker)
+    version_key = _get_version_key(User)
+
+    for _ in range(2):
+        # Versions of evicted counters are not restarted from 1, so stale results never match
+        _get_user(session_maker, id=user.id)
+        await_(caches["locmem"].async_delete(version_key))
+        await_(invalidate_result_cache(User))
+        assert await_(caches["locmem"].async_get(version_key)) > 1
+
+        _, count = _get_user(session_maker, id=user.id)
+        assert count == 1
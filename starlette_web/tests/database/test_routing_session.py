@@ -0,0 +1,146 @@
+import uuid
+
+import anyio
+import pytest
+from sqlalchemy import select, text, update
+
+from starlette_web.common.conf import settings
+from starlette_web.common.database import RoutingSession, make_session_maker
+from starlette_web.common.http.exceptions import ImproperlyConfigured
+from starlette_web.contrib.auth.models import User
+from starlette_web.tests.helpers import await_
+
+
+@pytest.fixture
+def routing_session_maker(monkeypatch):
+    monkeypatch.setattr(
+        settings,
+        "DATABASES",
+        {
+            "replica_1": {"DSN": settings.DATABASE_DSN, "REPLICA": True},
+            "replica_2": {"DSN": settings.DATABASE_DSN, "REPLICA": True},
+            "analytics": {"DSN": settings.DATABASE_DSN},
+        },
+    )
+    monkeypatch.setattr(settings, "DB_REPLICA_STICKY_SECONDS", 0.2)
+    return make_session_maker(use_pool=False)
+
+
+def _get_alias(session, clause=None):
+    bind = session.sync_session.get_bind(clause=clause)
+    router = session.sync_session.router
+    return next(alias for alias, engine in router.engines.items() if engine.sync_engine is bind)
+
+
+def test_routing_session__reads_and_writes(routing_session_maker):
+    session = routing_session_maker()
+    assert isinstance(session.sync_session, RoutingSession)
+
+    # Replica is chosen once per session
+    assert _get_alias(session, select(User)) == "replica_1"
+    assert _get_alias(session, select(User)) == "replica_1"
+    # ...and rotated between sessions
+    assert _get_alias(routing_session_maker(), select(User)) == "replica_2"
+    assert _get_alias(routing_session_maker(), select(User)) == "replica_1"
+    assert _get_alias(session, select(User).with_for_update()) == "default"
+    assert _get_alias(session, text("SELECT 1")) == "default"
+
+    # Once session has written, it sticks to primary database
+    assert _get_alias(session, select(User)) == "default"
+
+    session = routing_session_maker()
+    assert _get_alias(session, update(User).values(is_active=True)) == "default"
+    assert _get_alias(session, select(User)) == "default"
+
+
+def test_routing_session__rollback_resets_writes(routing_session_maker):
+    async def rollback_write():
+        async with routing_session_maker() as session:
+            assert _get_alias(session, update(User).values(is_active=True)) == "default"
+            await session.rollback()
+            assert _get_alias(session, select(User)).startswith("replica_")
+            await session.commit()
+            assert not session.sync_session.router.is_sticky()
+
+    await_(rollback_write())
+
+
+def test_routing_session__forced_alias(routing_session_maker):
+    session = routing_session_maker()
+    assert _get_alias(session, select(User).execution_options(db_alias="default")) == "default"
+    assert _get_alias(session, select(User).execution_options(db_alias="analytics")) == "analytics"
+    assert _get_alias(session, select(User)) == "replica_1"
+
+    session = routing_session_maker(info={"db_alias": "analytics"})
+    assert _get_alias(session, select(User)) == "analytics"
+    assert _get_alias(session, update(User).values(is_active=True)) == "analytics"
+
+    session = routing_session_maker(info={"db_alias": "unknown"})
+    with pytest.raises(ImproperlyConfigured):
+        _get_alias(session, select(User))
+
+
+def test_routing_session__sticky_after_commit(routing_session_maker):
+    email = f"user_{uuid.uuid4().hex[:10]}@test.com"
+
+    async def create_user():
+        async with routing_session_maker() as session:
+            await User.async_create(
+                session,
+                db_commit=True,
+                email=email,
+                password=User.make_password("password"),
+            )
+
+    async def get_user():
+        async with routing_session_maker() as session:
+            user = await User.async_get(session, email=email)
+            return user, _get_alias(session, select(User))
+
+    async def create_and_get_user():
+        await create_user()
+        return await get_user()
+
+    user, alias = await_(create_and_get_user())
+    assert user.email == email
+    assert alias == "default"
+
+
+def test_routing_session__sticky_per_context(routing_session_maker):
+    async def write():
+        async with routing_session_maker() as session:
+            _get_alias(session, update(User).values(is_active=True))
+            await session.commit()
+
+    async def read():
+        async with routing_session_maker() as session:
+            return _get_alias(session, select(User))
+
+    async def write_and_read():
+        await write()
+        async with anyio.create_task_group() as task_group:
+            # Tasks, started by request, inherit its stickiness
+            task_group.start_soon(read_in_task)
+        assert await read() == "default"
+        await anyio.sleep(0.2)
+        assert (await read()).startswith("replica_")
+
+    async def read_in_task():
+        assert await read() == "default"
+
+    await_(write_and_read())
+    # Other requests (contexts) are not affected by commits of this one
+    await_(write())
+    assert await_(read()).startswith("replica_")
+
+
+def test_routing_session__least_connections(routing_session_maker, monkeypatch):
+    session = routing_session_maker()
+    router = session.sync_session.router
+    monkeypatch.setattr(router, "policy", "least_connections")
+    monkeypatch.setattr(
+        router,
+        "_get_checked_out_connections",
+        lambda alias: {"replica_1": 5, "replica_2": 2}[alias],
+    )
+    assert _get_alias(session, select(User)) == "replica_2"
@@ -0,0 +1,59 @@
+from unittest.mock import patch
+
+from starlette_web.common.database import AsyncSession, make_session_maker, on_commit
+from starlette_web.common.database import session as session_module
+from starlette_web.tests.helpers import await_
+
+
+def test_on_commit():
+    session_maker = make_session_maker(use_pool=False)
+    calls = []
+
+    def make_callback(name):
+        async def callback():
+            calls.append(name)
+
+        return callback
+
+    async def run_session():
+        async with session_maker() as session:
+            assert isinstance(session, AsyncSession)
+
+            await on_commit(session, make_callback("discarded"))
+            await session.rollback()
+
+            await on_commit(session, make_callback("first"), key="key")
+            await on_commit(session, make_callback("duplicate"), key="key")
+            await on_commit(session, make_callback("second"))
+            assert calls == []
+
+            await session.commit()
+            assert calls == ["first", "second"]
+
+            await session.commit()
+            assert calls == ["first", "second"]
+
+    await_(run_session())
+
+
+def test_on_commit__failed_callback():
+    session_maker = make_session_maker(use_pool=False)
+    calls = []
+
+    async def failed_callback():
+        raise ValueError("failed")
+
+    async def callback():
+        calls.append(True)
+
+    async def run_session():
+        async with session_maker() as session:
+            await on_commit(session, failed_callback)
+            await on_commit(session, callback)
+            await session.commit()
+
+    with patch.object(session_module.logger, "exception") as log_exception:
+        await_(run_session())
+
+    assert calls == [True]
+    log_exception.assert_called_once()
@@ -0,0 +1,111 @@
+import asyncio
+from unittest.mock import Mock
+
+from sqlalchemy import text
+
+from starlette_web.common.conf import settings
+from starlette_web.common.database.session_maker import (
+    SessionMakerRegistry,
+    get_engines,
+    session_makers,
+)
+from starlette_web.contrib.admin.middleware import get_app_session_maker
+from starlette_web.tests.helpers import await_
+
+
+def test_session_makers__shared():
+    registry = SessionMakerRegistry()
+
+    assert registry.get(use_pool=False) is registry.get(use_pool=False)
+    assert registry.get(use_pool=False) is not registry.get()
+    # Defaults are filled in
+    assert registry.get() is registry.get(use_pool=True, connect_args={"timeout": 20})
+
+    async def get_session_maker():
+        return registry.get()
+
+    # Pooled engines are bound to event loop
+    session_maker = await_(get_session_maker())
+    assert session_maker is await_(get_session_maker())
+    assert session_maker is not registry.get()
+
+
+def test_session_makers__keyed_by_configuration(monkeypatch):
+    registry = SessionMakerRegistry()
+    session_maker = registry.get(use_pool=False)
+
+    monkeypatch.setattr(settings, "DATABASES", {"analytics": {"DSN": settings.DATABASE_DSN}})
+    assert registry.get(use_pool=False) is not session_maker
+
+
+def test_session_makers__connect_disconnect():
+    registry = SessionMakerRegistry()
+
+    async def run_session():
+        await registry.async_connect()
+        async with registry.get()() as session:
+            await session.execute(text("SELECT 1"))
+
+        session_maker = registry.get()
+        engine = get_engines(session_maker)[0]
+        assert engine.pool.checkedin() == 1
+
+        await registry.async_disconnect()
+        assert engine.pool.checkedin() == 0
+        assert registry.get() is not session_maker
+
+        await registry.async_disconnect()
+
+    await_(run_session())
+
+
+def test_session_makers__configured_defaults():
+    registry = SessionMakerRegistry()
+    registry.configure(use_pool=False)
+    assert registry.get() is registry.get(use_pool=False)
+
+
+def test_session_makers__closed_loops_forgotten():
+    registry = SessionMakerRegistry()
+
+    async def get_session_maker():
+        return registry.get()
+
+    loop = asyncio.new_event_loop()
+    session_maker = loop.run_until_complete(get_session_maker())
+    loop.close()
+
+    registry.get(use_pool=False)
+    assert session_maker not in registry._session_makers.values()
+
+
+def test_session_makers__app_and_middleware_share_engine(client):
+    async def get_session_makers():
+        # As called by app's endpoints and by DBSessionMiddleware / AdminSessionMiddleware
+        return client.app.session_maker, get_app_session_maker({"app": client.app})
+
+    app_session_maker, middleware_session_maker = client.portal.call(get_session_makers)
+    assert get_engines(app_session_maker)[0] is get_engines(middleware_session_maker)[0]
+
+
+def test_session_makers__sub_app_uses_configured_defaults(client):
+    async def get_session_makers():
+        return client.app.session_maker, get_app_session_maker({"app": object()})
+
+    session_makers.configure(use_pool=client.app.use_pool)
+    app_session_maker, middleware_session_maker = client.portal.call(get_session_makers)
+    assert get_engines(app_session_maker)[0] is get_engines(middleware_session_maker)[0]
+
+
+def test_session_makers__app_resolves_once_per_loop(client, monkeypatch):
+    async def get_session_maker():
+        return client.app.session_maker
+
+    session_maker = client.portal.call(get_session_maker)
+    monkeypatch.setattr(session_makers, "get", Mock(side_effect=session_makers.get))
+    assert client.portal.call(get_session_maker) is session_maker
+    assert not session_makers.get.called
+
+    # Other loop gets its own session maker
+    assert await_(get_session_maker()) is not session_maker
+    assert session_makers.get.call_count == 1
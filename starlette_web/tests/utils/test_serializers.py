@@ -1,4 +1,17 @@
-from starlette_web.common.utils.serializers import JSONSerializer, PickleSerializer
+import pytest
+
+from starlette_web.common.http.exceptions import ImproperlyConfigured
+from starlette_web.common.utils import serializers
+from starlette_web.common.utils.serializers import (
+    JSONSerializer,
+    PickleSerializer,
+    NoopSerializer,
+    ShallowCopySerializer,
+    OrjsonSerializer,
+    MsgpackSerializer,
+    CompressedSerializer,
+    DeserializeError,
+)
 
 
 def test_json_serializer():
@@ -35,3 +48,67 @@ def test_pickle_serializer():
 
     decoded = serializer.deserialize(encoded)
     assert obj == decoded
+
+
+def test_in_process_serializers():
+    obj = {"list_1": [{"bool_key": True, "int_key": 1}]}
+
+    serializer = NoopSerializer()
+    assert serializer.deserialize(serializer.serialize(obj)) is obj
+
+    serializer = ShallowCopySerializer()
+    decoded = serializer.deserialize(serializer.serialize(obj))
+    assert decoded == obj
+    assert decoded is not obj
+    assert decoded["list_1"] is obj["list_1"]
+
+
+def test_orjson_serializer(monkeypatch):
+    obj = {"list_1": [{"bool_key": True, "int_key": 1}], "null_key": None}
+    serializer = OrjsonSerializer()
+
+    encoded = serializer.serialize(obj)
+    assert type(encoded) == bytes
+    assert serializer.deserialize(encoded) == obj
+    assert serializer.deserialize(None) is None
+
+    # Fallback to json module produces compatible output
+    monkeypatch.setattr(serializers, "orjson", None)
+    assert serializer.serialize(obj) == encoded
+    assert serializer.deserialize(encoded) == obj
+
+
+def test_msgpack_serializer(monkeypatch):
+    if serializers.msgpack is None:
+        with pytest.raises(ImproperlyConfigured):
+            MsgpackSerializer()
+        return
+
+    obj = {"list_1": [{"bool_key": True, "int_key": 1}], 1: b"bytes"}
+    serializer = MsgpackSerializer()
+    assert serializer.deserialize(serializer.serialize(obj)) == obj
+
+
+def test_compressed_serializer():
+    serializer = CompressedSerializer(min_length=64)
+
+    obj = {"short": 1}
+    encoded = serializer.serialize(obj)
+    assert encoded[:1] == b"\x00"
+    assert serializer.deserialize(encoded) == obj
+
+    obj = {"long": "x" * 4096}
+    encoded = serializer.serialize(obj)
+    assert encoded[:1] == b"\x01"
+    assert len(encoded) < 4096
+    assert serializer.deserialize(encoded) == obj
+    assert serializer.deserialize(None) is None
+
+    serializer = CompressedSerializer(OrjsonSerializer(), min_length=0)
+    assert serializer.deserialize(serializer.serialize(obj)) == obj
+
+    with pytest.raises(DeserializeError):
+        serializer.deserialize(b"\x02data")
+
+    with pytest.raises(ImproperlyConfigured):
+        CompressedSerializer(JSONSerializer())
@@ -1,6 +1,10 @@
 # flake8: noqa
 
-from starlette_web.tests.views.http import HealthCheckAPIView, SentryCheckAPIView
+from starlette_web.tests.views.http import (
+    HealthCheckAPIView,
+    SentryCheckAPIView,
+    ResponseCacheTestAPIView,
+)
 from starlette_web.tests.views.websocket import (
     BaseWebsocketTestEndpoint,
     CancellationWebsocketTestEndpoint,
@@ -5,6 +5,7 @@ from marshmallow import Schema, fields
 from starlette_web.contrib.auth.models import User
 from starlette_web.common.http.base_endpoint import BaseHTTPEndpoint
 from starlette_web.common.http.exceptions import BaseApplicationError
+from starlette_web.common.http.response_cache import ResponseCache
 from starlette_web.common.http.statuses import ResponseStatus
 
 
@@ -85,3 +86,39 @@ class SentryCheckAPIView(BaseHTTPEndpoint):
             logger.exception(f"Test exc for sentry: {err}")
 
         raise BaseApplicationError("Oops!")
+
+
+class ResponseCacheTestSchema(Schema):
+    item_id = fields.Str()
+    calls = fields.Int()
+
+
+class ResponseCacheTestAPIView(BaseHTTPEndpoint):
+    """Counts calls of handler, which result is cached and tagged with item_id."""
+
+    auth_backend = None
+    response_schema = ResponseCacheTestSchema
+    response_cache = ResponseCache(alias="locmem", timeout=60, tags=("items:{item_id}",))
+    calls = 0
+
+    async def get(self, request):  # noqa
+        """
+        description: Cached response with number of handler calls
+        parameters:
+          - name: item_id
+            in: path
+            required: true
+            schema:
+              type: string
+        responses:
+          200:
+            description: Item with number of calls
+            content:
+              application/json:
+                schema: ResponseCacheTestSchema
+        tags: ["Health check"]
+        """
+        ResponseCacheTestAPIView.calls += 1
+        return self._response(
+            data={"item_id": request.path_params["item_id"], "calls": self.calls}
+        )